@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+        ('jobs', '0003_job_name_job_worker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='workers', to='jobs.location'),
+        ),
+    ]
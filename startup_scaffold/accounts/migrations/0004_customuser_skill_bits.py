@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:54
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def build_skill_bits(apps, schema_editor):
+    Model = apps.get_model('accounts', 'CustomUser')
+    through = Model.skills.through
+    bits = defaultdict(int)
+    for owner_id, ordinal in through.objects.values_list('customuser_id', 'skill__ordinal'):
+        if ordinal is not None:
+            bits[owner_id] |= 1 << ordinal
+    objs = [
+        Model(pk=owner_id, skill_bits=value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+        for owner_id, value in bits.items()
+    ]
+    Model.objects.bulk_update(objs, ['skill_bits'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_skill_ordinal'),
+        ('accounts', '0003_customuser_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='skill_bits',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(build_skill_bits, migrations.RunPython.noop),
+    ]
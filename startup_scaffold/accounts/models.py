@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseU
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import uuid
+from core.models import DerivedFieldsModel
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -26,7 +27,7 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+class CustomUser(DerivedFieldsModel, AbstractBaseUser, PermissionsMixin):
     class Role(models.TextChoices):
         WORKER = 'worker', _('Worker')
         CLIENT = 'client', _('Client')
@@ -45,6 +46,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
     skills = models.ManyToManyField('services.Skill', blank=True)
+    # Packed bitset of skill ordinals, kept in sync by jobs.skill_bits
+    skill_bits = models.BinaryField(default=b'', editable=False)
+    location = models.ForeignKey('jobs.Location', on_delete=models.SET_NULL, null=True, blank=True, related_name='workers')
     availability = models.JSONField(blank=True, null=True)  
 
     is_verified = models.BooleanField(default=False)
@@ -61,5 +65,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    derived_fields = ('skill_bits',)
+
     def __str__(self):
         return self.email
@@ -43,5 +43,5 @@ class AIQueryTests(APITestCase):
         AIQuery.objects.create(user=self.user, query_text='My query')
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        for item in response.data:
+        for item in response.data['results']:
             self.assertEqual(item['user'], self.user.id)
@@ -0,0 +1,183 @@
+"""
+Columnar attendance analytics.
+
+``AttendanceColumns`` pulls the few columns attendance analytics need
+(user, check-in, check-out and shift start) out of the database in chunked
+``values_list`` batches into NumPy arrays. Distributions, heatmaps,
+percentiles and rolling averages are then vectorized array operations over
+all rows, instead of per-row Python loops or one query per figure.
+
+Timestamps are held as float seconds since the epoch, with NaN for a missing
+check-out or shift. Local times use the current time zone, resolved once per
+hour of the data rather than once per row.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import cached_property
+import numpy as np
+from django.utils import timezone
+
+DEFAULT_CHUNK_SIZE = 50000
+SECONDS_PER_DAY = 86400
+SECONDS_PER_HOUR = 3600
+# Lower bounds, in minutes, of the lateness buckets; the last one is open ended
+LATENESS_BUCKETS = (0, 5, 15, 30, 60)
+EPOCH = datetime(1970, 1, 1).date()
+
+
+def _timestamps(values):
+    return np.array([value.timestamp() if value else np.nan for value in values], dtype=float)
+
+
+def format_seconds(seconds):
+    """``HH:MM:SS`` of a number of seconds since midnight, ``None`` for NaN or ``None``."""
+    if seconds is None or np.isnan(seconds):
+        return None
+    return (datetime.min + timedelta(seconds=int(seconds))).time().strftime('%H:%M:%S')
+
+
+class AttendanceColumns:
+    """Attendance rows as parallel NumPy columns."""
+
+    def __init__(self, user_ids, user_index, check_in, check_out, shift_start):
+        self.user_ids = user_ids
+        self.user_index = user_index
+        self.check_in = check_in
+        self.check_out = check_out
+        self.shift_start = shift_start
+
+    @classmethod
+    def load(cls, queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Load the attendances of ``queryset``, ``chunk_size`` rows per fetch."""
+        codes = {}
+        user_index, check_in, check_out, shift_start = [], [], [], []
+        rows = queryset.order_by().values_list('user_id', 'check_in', 'check_out', 'shift__start_time')
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                cls._append(batch, codes, user_index, check_in, check_out, shift_start)
+                batch = []
+        if batch:
+            cls._append(batch, codes, user_index, check_in, check_out, shift_start)
+
+        def column(chunks, dtype):
+            return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+
+        return cls(
+            list(codes),
+            column(user_index, np.int32),
+            column(check_in, float),
+            column(check_out, float),
+            column(shift_start, float),
+        )
+
+    @staticmethod
+    def _append(batch, codes, user_index, check_in, check_out, shift_start):
+        users, ins, outs, starts = zip(*batch)
+        user_index.append(np.array([codes.setdefault(user_id, len(codes)) for user_id in users], dtype=np.int32))
+        check_in.append(_timestamps(ins))
+        check_out.append(_timestamps(outs))
+        shift_start.append(_timestamps(starts))
+
+    def __len__(self):
+        return len(self.check_in)
+
+    @cached_property
+    def local_check_in(self):
+        """Check-ins as seconds since the epoch in local wall-clock time."""
+        if not len(self):
+            return self.check_in
+        # UTC offsets change on the hour, so each UTC hour has a single offset
+        hours, inverse = np.unique(np.floor_divide(self.check_in, SECONDS_PER_HOUR), return_inverse=True)
+        tz = timezone.get_current_timezone()
+        offsets = np.array([
+            datetime.fromtimestamp(hour * SECONDS_PER_HOUR, tz=dt_timezone.utc)
+            .astimezone(tz).utcoffset().total_seconds()
+            for hour in hours
+        ])
+        return self.check_in + offsets[inverse]
+
+    @cached_property
+    def local_days(self):
+        """Local date of each check-in, as days since the epoch."""
+        return np.floor_divide(self.local_check_in, SECONDS_PER_DAY).astype(np.int64)
+
+    @cached_property
+    def check_in_seconds(self):
+        """Local time of day of each check-in, in seconds since midnight."""
+        return np.mod(self.local_check_in, SECONDS_PER_DAY)
+
+    @cached_property
+    def worked_hours(self):
+        """Hours worked per attendance, NaN while not checked out."""
+        return (self.check_out - self.check_in) / 3600
+
+    @cached_property
+    def lateness_minutes(self):
+        """Minutes between shift start and check-in (negative when early), NaN without a shift."""
+        return (self.check_in - self.shift_start) / 60
+
+    @cached_property
+    def late(self):
+        with np.errstate(invalid='ignore'):
+            return self.lateness_minutes > 0
+
+    @property
+    def on_shift(self):
+        return ~np.isnan(self.shift_start)
+
+    def average_check_in_seconds(self):
+        return float(self.check_in_seconds.mean()) if len(self) else None
+
+    def check_in_percentiles(self, percentiles=(50, 90, 95)):
+        """``{percentile: seconds since midnight}`` of the check-in times."""
+        if not len(self):
+            return {percentile: None for percentile in percentiles}
+        values = np.percentile(self.check_in_seconds, percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    def lateness_distribution(self, buckets=LATENESS_BUCKETS):
+        """
+        Number of late check-ins per lateness bucket, as ``[(from, to, count)]``
+        in minutes; a bucket holds ``from`` up to but not including ``to``.
+        """
+        lateness = self.lateness_minutes[self.late]
+        edges = np.asarray(buckets, dtype=float)
+        counts = np.bincount(np.searchsorted(edges, lateness, side='right') - 1, minlength=len(edges))
+        upper = list(buckets[1:]) + [None]
+        return list(zip(buckets, upper, counts.tolist()))
+
+    def hourly_heatmap(self):
+        """7x24 check-in counts by local weekday (Monday first) and hour."""
+        weekday = (self.local_days + 3) % 7  # 1970-01-01 was a Thursday
+        hour = (self.check_in_seconds // 3600).astype(np.int64)
+        return np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+
+    def daily_worked_hours(self):
+        """``(first_day, hours)``: hours worked on every local day from the first check-in to the last."""
+        if not len(self):
+            return None, np.empty(0)
+        first = self.local_days.min()
+        hours = np.bincount(self.local_days - first, weights=np.nan_to_num(self.worked_hours))
+        return EPOCH + timedelta(days=int(first)), hours
+
+    def rolling_average(self, values, window=7):
+        """Trailing ``window`` mean of a daily series; shorter than ``values`` by ``window - 1``."""
+        if len(values) < window:
+            return np.empty(0)
+        return np.convolve(values, np.ones(window) / window, mode='valid')
+
+    def punctuality(self):
+        """Share of check-ins on a shift that were on time, ``None`` without any."""
+        on_shift = self.on_shift.sum()
+        return float(1 - self.late.sum() / on_shift) if on_shift else None
+
+    def active_users(self):
+        return int(np.unique(self.user_index).size)
+
+    def user_totals(self):
+        """``{user_id: (hours_worked, late_count)}``."""
+        users = len(self.user_ids)
+        hours = np.bincount(self.user_index, weights=np.nan_to_num(self.worked_hours), minlength=users)
+        late = np.bincount(self.user_index, weights=self.late, minlength=users).astype(np.int64)
+        return {user_id: (hours[i], int(late[i])) for i, user_id in enumerate(self.user_ids)}
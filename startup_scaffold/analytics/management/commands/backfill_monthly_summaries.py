@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from analytics.summaries import generate_monthly_summaries, parse_month
+from analytics.tasks import backfill_monthly_attendance_summaries
+
+
+class Command(BaseCommand):
+    help = 'Roll up monthly attendance summaries from the daily reports for a range of months'
+
+    def add_arguments(self, parser):
+        parser.add_argument('first', help='First month, YYYY-MM')
+        parser.add_argument('last', nargs='?', help='Last month, YYYY-MM (default: the first month)')
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Roll up in this process instead of dispatching one Celery task per month'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            first = parse_month(options['first'])
+            last = parse_month(options['last'] or options['first'])
+        except ValueError as exc:
+            raise CommandError(f'Invalid month: {exc}')
+        if last < first:
+            raise CommandError('The last month is before the first month.')
+
+        if options['sync']:
+            written = generate_monthly_summaries(first, last)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} monthly summaries.'))
+            return
+
+        count = backfill_monthly_attendance_summaries(first.isoformat(), last.isoformat())
+        self.stdout.write(self.style.SUCCESS(f'Dispatched {count} monthly rollup tasks.'))
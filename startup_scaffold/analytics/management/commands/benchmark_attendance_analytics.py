@@ -0,0 +1,123 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractHour, ExtractWeekDay
+from django.utils import timezone
+from analytics.columnar import LATENESS_BUCKETS, AttendanceColumns
+from attendance.models import Attendance, seconds_since_midnight
+from jobs.models import Job
+from shifts.models import Shift
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare ORM aggregation with NumPy columnar aggregation of attendance analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help='Insert this many synthetic attendances first; they are rolled back afterwards (default: 0)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Rows per values_list fetch and per synthetic insert batch (default: 50000)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['rows']:
+                started = time.perf_counter()
+                self.generate(options['rows'], options['chunk_size'])
+                self.stdout.write(f"Inserted {options['rows']} attendances in {time.perf_counter() - started:.1f}s")
+            self.benchmark(options['chunk_size'])
+            transaction.set_rollback(True)
+
+    def generate(self, rows, chunk_size):
+        users = list(User.objects.values_list('pk', flat=True)[:1000])
+        if not users:
+            users = [User.objects.create_user(email='benchmark@example.com', password=None).pk]
+        job = Job.objects.create(client_id=users[0], title='Attendance benchmark')
+        now = timezone.now()
+        shifts = Shift.objects.bulk_create([
+            Shift(
+                job=job, worker_id=users[0], name='Benchmark',
+                start_time=now - timedelta(days=day), end_time=now - timedelta(days=day, hours=-8),
+            )
+            for day in range(90)
+        ])
+        for start in range(0, rows, chunk_size):
+            batch = []
+            for _ in range(min(chunk_size, rows - start)):
+                shift = random.choice(shifts)
+                check_in = shift.start_time + timedelta(minutes=random.gauss(0, 20))
+                batch.append(Attendance(
+                    user_id=random.choice(users),
+                    shift=shift if random.random() < 0.8 else None,
+                    check_in=check_in,
+                    check_in_seconds=seconds_since_midnight(check_in),
+                    check_out=check_in + timedelta(hours=random.uniform(4, 9)) if random.random() < 0.9 else None,
+                ))
+            Attendance.objects.bulk_create(batch)
+
+    def benchmark(self, chunk_size):
+        attendances = Attendance.objects.all()
+        count = attendances.count()
+        if not count:
+            self.stdout.write(self.style.WARNING('No attendances to benchmark; pass --rows to generate some.'))
+            return
+
+        started = time.perf_counter()
+        orm = self.orm_figures(attendances)
+        orm_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        columns = AttendanceColumns.load(attendances, chunk_size=chunk_size)
+        load_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        numpy_figures = {
+            'heatmap': columns.hourly_heatmap().tolist(),
+            'lateness': [bucket_count for _, _, bucket_count in columns.lateness_distribution()],
+        }
+        # Figures the ORM has no portable aggregate for
+        columns.check_in_percentiles()
+        columns.rolling_average(columns.daily_worked_hours()[1])
+        compute_elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Attendances: {count}')
+        self.stdout.write(f'ORM aggregates: {orm_elapsed:.3f}s (heatmap and lateness buckets only)')
+        self.stdout.write(
+            f'NumPy columns:  {compute_elapsed:.3f}s (with percentiles and rolling averages) '
+            f'+ {load_elapsed:.3f}s column load ({count / load_elapsed:.0f} rows/s)'
+        )
+        if orm == numpy_figures:
+            self.stdout.write(self.style.SUCCESS('Both paths returned identical heatmaps and lateness buckets.'))
+        else:
+            self.stdout.write(self.style.ERROR('Heatmap or lateness results differ between the ORM and NumPy paths.'))
+
+    def orm_figures(self, attendances):
+        heatmap = [[0] * 24 for _ in range(7)]
+        cells = attendances.annotate(
+            weekday=ExtractWeekDay('check_in'), hour=ExtractHour('check_in'),
+        ).values('weekday', 'hour').annotate(count=Count('pk')).order_by()
+        for cell in cells:
+            # ExtractWeekDay counts from Sunday = 1
+            heatmap[(cell['weekday'] + 5) % 7][cell['hour']] += cell['count']
+
+        late = Q(shift__isnull=False, check_in__gt=F('shift__start_time'))
+        buckets = {}
+        for i, lower in enumerate(LATENESS_BUCKETS):
+            bucket = late & Q(check_in__gt=F('shift__start_time') + timedelta(minutes=lower))
+            if i + 1 < len(LATENESS_BUCKETS):
+                bucket &= Q(check_in__lte=F('shift__start_time') + timedelta(minutes=LATENESS_BUCKETS[i + 1]))
+            buckets[f'bucket_{i}'] = Count('pk', filter=bucket)
+        counts = attendances.aggregate(**buckets)
+        return {'heatmap': heatmap, 'lateness': [counts[f'bucket_{i}'] for i in range(len(LATENESS_BUCKETS))]}
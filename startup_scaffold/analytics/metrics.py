@@ -0,0 +1,163 @@
+"""
+Dashboard metrics store.
+
+The admin dashboard reads a handful of counters from the cache with one
+``get_many``, instead of counting users and attendances on every poll.
+Check-ins and new users bump the counters as they happen; a periodic
+``reconcile`` recounts everything from the database and stamps the time it
+did so. Reads recount whenever the last reconcile is older than
+``DASHBOARD_METRICS_MAX_STALENESS`` seconds, so increments that were lost
+(e.g. to a counter that had expired) are never served for longer than that.
+Invalidated counters are recounted on their next read.
+"""
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from attendance.models import Attendance, seconds_since_midnight
+from attendance.reports import day_bounds
+
+User = get_user_model()
+
+KEY_PREFIX = 'dashboard'
+# Counters outlive their day so late reads of yesterday still hit the cache
+TIMEOUT = 2 * 24 * 3600
+DAY_METRICS = ('active_users', 'check_ins', 'check_in_seconds', 'late')
+METRICS = ('total_users',) + DAY_METRICS
+
+
+def max_staleness():
+    return settings.DASHBOARD_METRICS_MAX_STALENESS
+
+
+def cache_key(name, day=None):
+    if name == 'total_users':
+        return f'{KEY_PREFIX}:{name}'
+    return f'{KEY_PREFIX}:{(day or timezone.localdate()).isoformat()}:{name}'
+
+
+def _reconciled_key(day):
+    return cache_key('reconciled_at', day)
+
+
+def _seen_key(day, user_id):
+    return cache_key(f'seen:{user_id}', day)
+
+
+def count_total_users():
+    return User.objects.count()
+
+
+def count_day(day, names=DAY_METRICS):
+    """
+    The day metrics ``names`` of ``day`` from its attendances. Counting the
+    active users also marks them seen, so their next check-in is not counted again.
+    """
+    start, end = day_bounds(day)
+    attendances = Attendance.objects.filter(check_in__gte=start, check_in__lt=end)
+    values = {}
+    if any(name != 'active_users' for name in names):
+        row = attendances.aggregate(
+            check_ins=Count('pk'),
+            check_in_seconds=Sum('check_in_seconds'),
+            late=Count('pk', filter=Q(shift__isnull=False, check_in__gt=F('shift__start_time'))),
+        )
+        row['check_in_seconds'] = row['check_in_seconds'] or 0
+        values.update((name, row[name]) for name in names if name in row)
+    if 'active_users' in names:
+        user_ids = set(attendances.values_list('user_id', flat=True))
+        cache.set_many({_seen_key(day, user_id): True for user_id in user_ids}, TIMEOUT)
+        values['active_users'] = len(user_ids)
+    return values
+
+
+def reconcile(day=None):
+    """Recount every metric of ``day`` (default today) and cache it; returns the metrics."""
+    day = day or timezone.localdate()
+    values = {'total_users': count_total_users(), **count_day(day)}
+    cache.set_many({cache_key(name, day): value for name, value in values.items()}, TIMEOUT)
+    values['reconciled_at'] = time.time()
+    cache.set(_reconciled_key(day), values['reconciled_at'], TIMEOUT)
+    return values
+
+
+def invalidate(*names, day=None):
+    """Drop the cached ``names`` (default: all, forcing a full recount) of ``day``."""
+    day = day or timezone.localdate()
+    keys = [cache_key(name, day) for name in names or METRICS]
+    if not names:
+        keys.append(_reconciled_key(day))
+    cache.delete_many(keys)
+
+
+def get_metrics(day=None):
+    """The metrics of ``day`` (default today), recounting only what is missing or stale."""
+    day = day or timezone.localdate()
+    keys = {cache_key(name, day): name for name in METRICS}
+    cached = cache.get_many([*keys, _reconciled_key(day)])
+    reconciled_at = cached.pop(_reconciled_key(day), None)
+    if reconciled_at is None or time.time() - reconciled_at > max_staleness():
+        return reconcile(day)
+
+    values = {keys[key]: value for key, value in cached.items()}
+    missing = {}
+    if 'total_users' not in values:
+        missing['total_users'] = count_total_users()
+    missing_day_metrics = [name for name in DAY_METRICS if name not in values]
+    if missing_day_metrics:
+        missing.update(count_day(day, missing_day_metrics))
+    if missing:
+        cache.set_many({cache_key(name, day): value for name, value in missing.items()}, TIMEOUT)
+    return {**values, **missing, 'reconciled_at': reconciled_at}
+
+
+def dashboard(day=None):
+    """The dashboard figures of ``day`` derived from its metrics."""
+    metrics = get_metrics(day)
+    average = None
+    if metrics['check_ins']:
+        average = (datetime.min + timedelta(seconds=metrics['check_in_seconds'] // metrics['check_ins'])).time()
+    return {
+        'total_users': metrics['total_users'],
+        'active_users_today': metrics['active_users'],
+        'avg_check_in_time': average.strftime('%H:%M:%S') if average else None,
+        'absent_today': max(metrics['total_users'] - metrics['active_users'], 0),
+        'late_today': metrics['late'],
+        'reconciled_at': datetime.fromtimestamp(metrics['reconciled_at'], tz=timezone.get_current_timezone()),
+    }
+
+
+def _incr(name, delta, day=None):
+    if not delta:
+        return
+    try:
+        cache.incr(cache_key(name, day), delta)
+    except ValueError:
+        # Not cached: its next read recounts it, this change included
+        pass
+
+
+def record_users(delta):
+    _incr('total_users', delta)
+
+
+def record_attendance_change(user_id, previous, current):
+    """Apply one attendance change, given as ``attendance_state`` tuples, to today's metrics."""
+    today = timezone.localdate()
+    for state, sign in ((previous, -1), (current, 1)):
+        if state is None:
+            continue
+        check_in, _, shift_start = state
+        if timezone.localdate(check_in) != today:
+            continue
+        _incr('check_ins', sign, today)
+        _incr('check_in_seconds', sign * seconds_since_midnight(check_in), today)
+        if shift_start and check_in > shift_start:
+            _incr('late', sign, today)
+    # A user counts as active from their first check-in of the day; recounts mark them seen too
+    if current is not None and timezone.localdate(current[0]) == today:
+        if cache.add(_seen_key(today, user_id), True, TIMEOUT):
+            _incr('active_users', 1, today)
@@ -41,3 +41,25 @@ class AttendanceAnomaly(models.Model):
 
     def __str__(self):
         return f"Anomaly for {self.user} detected on {self.date_detected}"
+
+
+# Keep the cached dashboard metrics current between reconciliations
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from attendance.signals import attendance_changed
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def count_new_user(sender, instance, created, **kwargs):
+    if created:
+        from .metrics import record_users
+        record_users(1)
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def count_deleted_user(sender, instance, **kwargs):
+    from .metrics import record_users
+    record_users(-1)
+
+@receiver(attendance_changed)
+def count_attendance_change(sender, user_id, previous, current, **kwargs):
+    from .metrics import record_attendance_change
+    record_attendance_change(user_id, previous, current)
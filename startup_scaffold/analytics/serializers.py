@@ -40,6 +40,7 @@ class DashboardMetricsSerializer(serializers.Serializer):
     avg_check_in_time = serializers.CharField()
     absent_today = serializers.IntegerField()
     late_today = serializers.IntegerField()
+    reconciled_at = serializers.DateTimeField()
 
 class TopPerformerSerializer(serializers.Serializer):
     user = serializers.CharField()
@@ -0,0 +1,98 @@
+"""
+Monthly attendance summaries.
+
+Summaries are rolled up from the daily attendance reports, not from raw
+check-ins: one query groups a range of months of reports by (user, month),
+and the summaries are written with one upsert per batch of users on the
+(user, month) unique key. Independent months can be rolled up in parallel.
+"""
+from datetime import date, timedelta
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from attendance.models import DailyAttendanceReport
+from core.utils import month_start, next_month
+from .models import MonthlyAttendanceSummary
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+SUMMARY_FIELDS = ['total_days_worked', 'total_hours_worked', 'total_lateness_count', 'absence_ratio']
+
+
+def parse_month(value):
+    """First day of the month of ``value``, an ISO date or ``YYYY-MM``."""
+    if isinstance(value, date):
+        return month_start(value)
+    return month_start(date.fromisoformat(value if len(value) > 7 else f'{value}-01'))
+
+
+def months_between(first, last):
+    """The first days of every month from ``first`` to ``last``, inclusive."""
+    month, last = month_start(first), month_start(last)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def aggregate_months(first, last, user_ids=None):
+    """
+    Per-user totals of the daily reports from month ``first`` to month
+    ``last`` as ``{(user_id, month): row}``, in one query.
+    """
+    reports = DailyAttendanceReport.objects.filter(date__gte=month_start(first), date__lt=next_month(month_start(last)))
+    if user_ids is not None:
+        reports = reports.filter(user_id__in=user_ids)
+
+    rows = reports.annotate(month=TruncMonth('date')).values('user_id', 'month').annotate(
+        days_worked=Count('pk', filter=Q(checked_in=True)),
+        worked=Sum('total_worked_hours'),
+        late_days=Count('pk', filter=Q(was_late=True)),
+    ).order_by()
+    return {(row['user_id'], row['month']): row for row in rows}
+
+
+def build_summary(user_id, month, row=None):
+    """The summary of ``user_id`` for ``month`` from its ``aggregate_months`` row (``None``: no reports)."""
+    days_in_month = (next_month(month) - month).days
+    days_worked = row['days_worked'] if row else 0
+    worked = row['worked'] if row and row['worked'] else timedelta(0)
+    return MonthlyAttendanceSummary(
+        user_id=user_id,
+        month=month,
+        total_days_worked=days_worked,
+        total_hours_worked=worked.total_seconds() / 3600,
+        total_lateness_count=row['late_days'] if row else 0,
+        absence_ratio=1 - days_worked / days_in_month,
+    )
+
+
+def save_summaries(summaries):
+    MonthlyAttendanceSummary.objects.bulk_create(
+        summaries,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['user', 'month'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+def generate_monthly_summaries(first, last=None):
+    """
+    Write the summary of every user for each month from ``first`` to
+    ``last`` (default: just ``first``). Returns the number of summaries written.
+    """
+    months = months_between(first, last or first)
+    stats = aggregate_months(months[0], months[-1])
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=BATCH_SIZE)
+    written = 0
+    for chunk in iter(lambda: list(islice(user_ids, BATCH_SIZE)), []):
+        save_summaries([
+            build_summary(user_id, month, stats.get((user_id, month)))
+            for user_id in chunk for month in months
+        ])
+        written += len(chunk) * len(months)
+    return written
@@ -1,63 +1,49 @@
-from celery import shared_task
+from celery import group, shared_task
 from django.utils.timezone import now
 from datetime import timedelta, date
 from django.contrib.auth import get_user_model
-from django.db import models
-from .models import MonthlyAttendanceSummary, AttendanceHeatmap
+from .columnar import AttendanceColumns
+from .models import AttendanceHeatmap
+from .metrics import reconcile
+from .summaries import generate_monthly_summaries, month_start, months_between, parse_month
 from attendance.models import Attendance
+from attendance.reports import day_bounds
 
 User = get_user_model()
 
 @shared_task
-def generate_monthly_attendance_summary():
-    today = now().date()
-    first_day_of_last_month = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
-    last_day_of_last_month = today.replace(day=1) - timedelta(days=1)
-
-    users = User.objects.all()
-    for user in users:
-        # Calculate attendance summary for last month
-        attendances = Attendance.objects.filter(
-            user=user,
-            check_in__date__gte=first_day_of_last_month,
-            check_in__date__lte=last_day_of_last_month
-        )
-        total_days_worked = attendances.values('check_in__date').distinct().count()
-        total_hours_worked = sum([(a.check_out - a.check_in).total_seconds() / 3600 for a in attendances if a.check_out and a.check_in])
-        total_lateness_count = attendances.filter(is_late=True).count()
-        total_work_days = (last_day_of_last_month - first_day_of_last_month).days + 1
-        absence_ratio = 1 - (total_days_worked / total_work_days) if total_work_days > 0 else 0
-
-        summary, created = MonthlyAttendanceSummary.objects.update_or_create(
-            user=user,
-            month=first_day_of_last_month,
-            defaults={
-                'total_days_worked': total_days_worked,
-                'total_hours_worked': total_hours_worked,
-                'total_lateness_count': total_lateness_count,
-                'absence_ratio': absence_ratio,
-            }
-        )
+def generate_monthly_attendance_summary(month=None):
+    """
+    Monthly attendance summaries of every user for ``month`` (ISO date or
+    ``YYYY-MM``, default last month), rolled up from the daily reports.
+    """
+    month = parse_month(month) if month else month_start(now().date().replace(day=1) - timedelta(days=1))
+    return generate_monthly_summaries(month)
 
 @shared_task
-def generate_attendance_heatmap():
-    today = now().date()
-    # Aggregate attendance data for today
-    attendances = Attendance.objects.filter(check_in__date=today)
-    total_attendances = attendances.count()
-    punctuality_score = 0
-    attendance_rate = 0
+def backfill_monthly_attendance_summaries(first, last):
+    """Roll up every month from ``first`` to ``last`` in parallel, one task per month"""
+    months = months_between(parse_month(first), parse_month(last))
+    group(generate_monthly_attendance_summary.s(month.isoformat()) for month in months).apply_async()
+    return len(months)
 
-    if total_attendances > 0:
-        punctuality_score = attendances.aggregate(avg_punctuality=models.Avg('punctuality_score'))['avg_punctuality'] or 0
-        # Assuming total expected attendance is number of users
-        total_users = User.objects.count()
-        attendance_rate = total_attendances / total_users if total_users > 0 else 0
+@shared_task
+def generate_attendance_heatmap(day=None):
+    """Punctuality and attendance rate for ``day`` (ISO date, default today)"""
+    day = date.fromisoformat(day) if day else now().date()
+    start, end = day_bounds(day)
+    columns = AttendanceColumns.load(Attendance.objects.filter(check_in__gte=start, check_in__lt=end))
+    total_users = User.objects.count()
 
-    heatmap, created = AttendanceHeatmap.objects.update_or_create(
-        date=today,
+    AttendanceHeatmap.objects.update_or_create(
+        date=day,
         defaults={
-            'punctuality_score': punctuality_score,
-            'attendance_rate': attendance_rate,
+            'punctuality_score': columns.punctuality() or 0,
+            'attendance_rate': columns.active_users() / total_users if total_users else 0,
         }
     )
+
+@shared_task
+def reconcile_dashboard_metrics():
+    """Recount today's cached dashboard metrics from the database"""
+    reconcile()
@@ -1,3 +1,304 @@
+import gzip
+import time
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from attendance.models import Attendance, DailyAttendanceReport
+from jobs.models import Job
+from shifts.models import Shift
+from . import metrics
+from .columnar import AttendanceColumns
+from .models import MonthlyAttendanceSummary
+from .summaries import generate_monthly_summaries
+from .models import AttendanceHeatmap
+from .tasks import backfill_monthly_attendance_summaries, generate_attendance_heatmap, generate_monthly_attendance_summary
 
-# Create your tests here.
+User = get_user_model()
+
+class MonthlySummaryTests(TestCase):
+    def setUp(self):
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.idle = User.objects.create_user(email='idle@example.com', password='pass1234')
+
+    def report(self, day, hours, was_late=False):
+        DailyAttendanceReport.objects.create(
+            user=self.worker, date=day, total_worked_hours=timedelta(hours=hours),
+            was_late=was_late, checked_in=True, checked_out=True,
+        )
+
+    def test_summaries_roll_up_daily_reports(self):
+        self.report(date(2026, 2, 2), 8)
+        self.report(date(2026, 2, 3), 6.5, was_late=True)
+        self.report(date(2026, 3, 2), 4)
+        DailyAttendanceReport.objects.create(
+            user=self.worker, date=date(2026, 2, 4), total_worked_hours=timedelta(0), was_absent=True,
+        )
+
+        with self.assertNumQueries(3):
+            self.assertEqual(generate_monthly_summaries(date(2026, 2, 1), date(2026, 3, 1)), 4)
+
+        february = MonthlyAttendanceSummary.objects.get(user=self.worker, month=date(2026, 2, 1))
+        self.assertEqual((february.total_days_worked, february.total_hours_worked, february.total_lateness_count), (2, 14.5, 1))
+        self.assertAlmostEqual(february.absence_ratio, 1 - 2 / 28)
+        march = MonthlyAttendanceSummary.objects.get(user=self.worker, month=date(2026, 3, 1))
+        self.assertEqual((march.total_days_worked, march.total_hours_worked), (1, 4.0))
+        idle = MonthlyAttendanceSummary.objects.get(user=self.idle, month=date(2026, 2, 1))
+        self.assertEqual((idle.total_days_worked, idle.absence_ratio), (0, 1.0))
+
+    def test_rerun_updates_existing_summaries(self):
+        generate_monthly_attendance_summary('2026-02')
+        self.report(date(2026, 2, 10), 3)
+        generate_monthly_attendance_summary('2026-02-01')
+
+        self.assertEqual(MonthlyAttendanceSummary.objects.filter(month=date(2026, 2, 1)).count(), 2)
+        summary = MonthlyAttendanceSummary.objects.get(user=self.worker, month=date(2026, 2, 1))
+        self.assertEqual((summary.total_days_worked, summary.total_hours_worked), (1, 3.0))
+
+    def test_backfill_rolls_up_each_month(self):
+        self.report(date(2025, 12, 24), 2)
+        self.assertEqual(backfill_monthly_attendance_summaries('2025-11', '2026-01'), 3)
+        self.assertEqual(MonthlyAttendanceSummary.objects.count(), 6)
+        summary = MonthlyAttendanceSummary.objects.get(user=self.worker, month=date(2025, 12, 1))
+        self.assertEqual(summary.total_hours_worked, 2.0)
+
+    def test_backfill_command(self):
+        out = StringIO()
+        call_command('backfill_monthly_summaries', '2026-01', '2026-02', '--sync', stdout=out)
+        self.assertIn('Wrote 4 monthly summaries', out.getvalue())
+
+
+class AnalyticsPaginationTests(TestCase):
+    def setUp(self):
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.worker)
+
+    def walk(self, url):
+        response = self.api.get(url, {'page_size': 2})
+        rows = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows.extend(response.data['results'])
+            if not response.data['next']:
+                return rows
+            response = self.api.get(response.data['next'])
+
+    def test_monthly_summaries_page_by_month(self):
+        # Created out of month order, as a backfill does
+        for month in (3, 1, 5, 2, 4):
+            MonthlyAttendanceSummary.objects.create(user=self.worker, month=date(2026, month, 1))
+        months = [row['month'] for row in self.walk(reverse('monthly-attendance-summary'))]
+        self.assertEqual(months, [f'2026-0{month}-01' for month in (5, 4, 3, 2, 1)])
+
+    def test_heatmap_pages_by_date(self):
+        for day in (3, 1, 5, 2, 4, 2):
+            AttendanceHeatmap.objects.create(date=date(2026, 2, day), punctuality_score=1, attendance_rate=1)
+        days = [row['date'] for row in self.walk(reverse('attendance-heatmap'))]
+        self.assertEqual(days, [f'2026-02-0{day}' for day in (5, 4, 3, 2, 2, 1)])
+
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass1234', is_staff=True)
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        job = Job.objects.create(client=self.admin, title='Warehouse')
+        now = timezone.now()
+        self.shift = Shift.objects.create(
+            job=job, worker=self.worker, name='Shift', start_time=now - timedelta(minutes=30), end_time=now + timedelta(hours=8),
+        )
+
+    def check_in(self):
+        attendance = Attendance.objects.create(user=self.worker, shift=self.shift, check_in=self.shift.start_time)
+        metrics.reconcile()
+        self.client.force_login(self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('attendance-check-in', args=[attendance.pk]), {'biometric_verified': True})
+        return attendance
+
+    def test_endpoint_serves_cached_metrics(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['total_users'], response.data['active_users_today'], response.data['absent_today']), (2, 0, 2)
+        )
+        self.assertIsNone(response.data['avg_check_in_time'])
+        with self.assertNumQueries(0):
+            metrics.get_metrics()
+
+    def test_check_in_updates_counters_without_recount(self):
+        attendance = self.check_in()
+
+        with self.assertNumQueries(0):
+            data = metrics.dashboard()
+        self.assertEqual((data['active_users_today'], data['late_today'], data['absent_today']), (1, 1, 1))
+        attendance.refresh_from_db()
+        self.assertEqual(data['avg_check_in_time'], timezone.localtime(attendance.check_in).strftime('%H:%M:%S'))
+        self.assertEqual(metrics.count_day(timezone.localdate())['late'], 1)
+
+    def test_new_users_are_counted(self):
+        metrics.reconcile()
+        User.objects.create_user(email='new@example.com', password='pass1234')
+        with self.assertNumQueries(0):
+            self.assertEqual(metrics.get_metrics()['total_users'], 3)
+
+    def test_invalidated_metric_is_recounted_alone(self):
+        self.check_in()
+        metrics.invalidate('late')
+        with self.assertNumQueries(1):
+            self.assertEqual(metrics.get_metrics()['late'], 1)
+
+    def test_stale_metrics_are_reconciled(self):
+        metrics.reconcile()
+        # Bypasses the incremental updates
+        Attendance.objects.create(user=self.worker, check_in=timezone.now())
+        self.assertEqual(metrics.get_metrics()['active_users'], 0)
+
+        later = time.time() + metrics.max_staleness() + 1
+        with mock.patch('analytics.metrics.time.time', return_value=later):
+            self.assertEqual(metrics.get_metrics()['active_users'], 1)
+
+
+class ColumnarAnalyticsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass1234', is_staff=True)
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.job = Job.objects.create(client=self.admin, title='Warehouse')
+        # A Monday
+        self.day = date(2026, 3, 2)
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.day + timedelta(days=day), datetime.min.time())) + timedelta(
+            hours=hour, minutes=minute
+        )
+
+    def attend(self, user, check_in, hours=None, shift_start=None):
+        shift = None
+        if shift_start:
+            shift = Shift.objects.create(
+                job=self.job, worker=user, name='Shift', start_time=shift_start, end_time=shift_start + timedelta(hours=8)
+            )
+        check_out = check_in + timedelta(hours=hours) if hours else None
+        return Attendance.objects.create(user=user, shift=shift, check_in=check_in, check_out=check_out)
+
+    def populate(self):
+        self.attend(self.worker, self.at(0, 8, 3), 8, shift_start=self.at(0, 8))
+        self.attend(self.worker, self.at(1, 9, 20), 7, shift_start=self.at(1, 9))
+        self.attend(self.worker, self.at(2, 8), shift_start=self.at(2, 8))
+        self.attend(self.admin, self.at(2, 10), 2)
+
+    def test_columns_vectorize_attendance_figures(self):
+        self.populate()
+        columns = AttendanceColumns.load(Attendance.objects.all(), chunk_size=3)
+
+        self.assertEqual(len(columns), 4)
+        self.assertEqual(columns.lateness_distribution(), [(0, 5, 1), (5, 15, 0), (15, 30, 1), (30, 60, 0), (60, None, 0)])
+        heatmap = columns.hourly_heatmap()
+        self.assertEqual((heatmap[0][8], heatmap[1][9], heatmap[2][8], heatmap[2][10], heatmap.sum()), (1, 1, 1, 1, 4))
+        self.assertEqual(columns.check_in_percentiles((0, 100)), {0: 8 * 3600, 100: 10 * 3600})
+        self.assertAlmostEqual(columns.punctuality(), 1 / 3)
+        first_day, hours = columns.daily_worked_hours()
+        self.assertEqual((first_day, hours.tolist()), (self.day, [8.0, 7.0, 2.0]))
+        self.assertEqual(columns.rolling_average(hours, 2).tolist(), [7.5, 4.5])
+        self.assertEqual(columns.user_totals()[self.worker.pk], (15.0, 2))
+
+    def test_lateness_on_a_bucket_edge_starts_that_bucket(self):
+        for minutes in (0.5, 5, 15, 30, 60):
+            self.attend(self.worker, self.at(0, 9) + timedelta(minutes=minutes), shift_start=self.at(0, 9))
+        columns = AttendanceColumns.load(Attendance.objects.all())
+        self.assertEqual(columns.lateness_distribution(), [(0, 5, 1), (5, 15, 1), (15, 30, 1), (30, 60, 1), (60, None, 1)])
+
+    def test_empty_columns(self):
+        columns = AttendanceColumns.load(Attendance.objects.none())
+        self.assertIsNone(columns.average_check_in_seconds())
+        self.assertEqual(columns.hourly_heatmap().sum(), 0)
+        self.assertEqual(columns.daily_worked_hours()[1].size, 0)
+
+    def test_local_times_use_each_check_in_offset(self):
+        # New York moves to daylight time at 02:00 on 2026-03-08, 07:00 UTC
+        with timezone.override('America/New_York'):
+            tz = timezone.get_current_timezone()
+            for hour in (1, 3):
+                self.attend(self.worker, timezone.make_aware(datetime(2026, 3, 8, hour, 30), tz))
+            # Still 2026-03-08 locally, already the next day in UTC
+            self.attend(self.worker, timezone.make_aware(datetime(2026, 3, 8, 23, 30), tz))
+            columns = AttendanceColumns.load(Attendance.objects.all())
+            self.assertEqual(sorted(columns.check_in_seconds.tolist()), [1.5 * 3600, 3.5 * 3600, 23.5 * 3600])
+            self.assertEqual(columns.local_days.tolist(), [(date(2026, 3, 8) - date(1970, 1, 1)).days] * 3)
+
+    def test_distribution_endpoint(self):
+        self.populate()
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('attendance-distribution'), {'from': '2026-03-01', 'to': '2026-03-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['attendances'], 2)
+        self.assertEqual(response.data['check_in_time_percentiles']['p50'], '08:41:30')
+        self.assertEqual(len(response.data['hourly_heatmap']), 7)
+
+        response = self.client.get(reverse('attendance-distribution'), {'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_average_check_in_time(self):
+        self.populate()
+        self.client.force_login(self.worker)
+        response = self.client.get(reverse('average-checkin-time'))
+        self.assertEqual(response.data['average_check_in_time'], '08:27:40')
+
+    def test_heatmap_task(self):
+        self.populate()
+        generate_attendance_heatmap(self.at(2, 0).date().isoformat())
+        heatmap = AttendanceHeatmap.objects.get(date=self.day + timedelta(days=2))
+        self.assertEqual((heatmap.punctuality_score, heatmap.attendance_rate), (1.0, 1.0))
+
+
+class CSVExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(email='staff@example.com', password='pass1234', is_staff=True)
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        for month in (date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)):
+            MonthlyAttendanceSummary.objects.create(
+                user=self.worker, month=month, total_days_worked=3, total_hours_worked=24.0, total_lateness_count=1,
+            )
+        AttendanceHeatmap.objects.create(date=date(2026, 2, 1), punctuality_score=0.5, attendance_rate=0.75)
+        AttendanceHeatmap.objects.create(date=date(2026, 2, 2), punctuality_score=1.0, attendance_rate=1.0)
+        self.client.force_login(self.staff)
+
+    def rows(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_monthly_summary_export_streams_rows_in_one_query(self):
+        response = self.client.get(reverse('export-monthly-summary'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            rows = self.rows(response)
+        self.assertEqual(rows[0], 'User,Month,Total Days Worked,Total Hours Worked,Total Lateness Count,Absence Ratio')
+        self.assertEqual(rows[1:], [f'worker@example.com,2026-0{month},3,24.0,1,0.0' for month in (1, 2, 3)])
+
+    def test_monthly_summary_export_filters_months(self):
+        response = self.client.get(reverse('export-monthly-summary'), {'from': '2026-02', 'to': '2026-02'})
+        self.assertEqual(self.rows(response)[1:], ['worker@example.com,2026-02,3,24.0,1,0.0'])
+        response = self.client.get(reverse('export-monthly-summary'), {'from': 'february'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_heatmap_export_is_gzipped_when_accepted(self):
+        response = self.client.get(
+            reverse('export-attendance-heatmap'), {'from': '2026-02-02'}, HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(rows, ['Date,Punctuality Score,Attendance Rate', '2026-02-02,1.0,1.0'])
+
+    def test_exports_are_staff_only(self):
+        self.client.force_login(self.worker)
+        self.assertEqual(self.client.get(reverse('export-monthly-summary')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('export-attendance-heatmap')).status_code, 403)
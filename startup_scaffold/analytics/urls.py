@@ -10,6 +10,7 @@ from .views import (
     ExportMonthlySummaryCSVView,
     ExportAttendanceHeatmapCSVView,
     AnomalyDetectionView,
+    AttendanceDistributionView,
 )
 
 router = DefaultRouter()
@@ -20,6 +21,7 @@ urlpatterns = [
     path('monthly-summary/', MonthlyAttendanceSummaryView.as_view(), name='monthly-attendance-summary'),
     path('heatmap/', AttendanceHeatmapView.as_view(), name='attendance-heatmap'),
     path('average-checkin-time/', AverageCheckInTimeView.as_view(), name='average-checkin-time'),
+    path('attendance-distribution/', AttendanceDistributionView.as_view(), name='attendance-distribution'),
     path('dashboard-metrics/', DashboardMetricsView.as_view(), name='dashboard-metrics'),
     path('top-performers/', TopPerformersView.as_view(), name='top-performers'),
     path('export/monthly-summary/', ExportMonthlySummaryCSVView.as_view(), name='export-monthly-summary'),
@@ -1,6 +1,5 @@
 from rest_framework import viewsets, permissions, generics, views, response, status
-from django.db.models import Avg, F, ExpressionWrapper, DurationField
-from datetime import datetime, timedelta
+from datetime import timedelta
 from .models import PlatformMetric, MonthlyAttendanceSummary, AttendanceHeatmap
 from .serializers import PlatformMetricSerializer, MonthlyAttendanceSummarySerializer, AttendanceHeatmapSerializer
 from attendance.models import Attendance
@@ -9,8 +8,9 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 from rest_framework import viewsets, permissions, generics, views, response, status
-from django.db.models import Avg, F, ExpressionWrapper, DurationField, Q, Count
-from datetime import datetime, timedelta
+from django.db.models import Q, Count
+from datetime import date, timedelta
+from django.utils import timezone
 from .models import PlatformMetric, MonthlyAttendanceSummary, AttendanceHeatmap, AttendanceAnomaly
 from .serializers import (
     PlatformMetricSerializer,
@@ -21,12 +21,17 @@ from .serializers import (
     TopPerformerSerializer,
 )
 from attendance.models import Attendance
+from attendance.reports import day_bounds
+from attendance.stats import check_in_stats, user_check_in_stats
 from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import HttpResponse
-import csv
+from core import exports
+from . import metrics
+from .columnar import AttendanceColumns, format_seconds
+from .summaries import parse_month
+import uuid
 
 User = get_user_model()
 
@@ -74,25 +79,21 @@ class AverageCheckInTimeView(views.APIView):
     def get(self, request, *args, **kwargs):
         user = request.user
         user_id = request.query_params.get('user_id')
-        queryset = Attendance.objects.filter(check_in__isnull=False)
 
         if not (user.is_staff or user.is_superuser):
-            queryset = queryset.filter(user=user)
+            stats = user_check_in_stats(user.pk)
         elif user_id:
-            queryset = queryset.filter(user_id=user_id)
-
-        avg_seconds = queryset.annotate(
-            check_in_seconds=ExpressionWrapper(
-                F('check_in__hour') * 3600 + F('check_in__minute') * 60 + F('check_in__second'),
-                output_field=DurationField()
-            )
-        ).aggregate(avg_seconds=Avg('check_in_seconds'))['avg_seconds']
-
-        if avg_seconds is None:
-            return response.Response({'average_check_in_time': None}, status=status.HTTP_200_OK)
+            try:
+                stats = user_check_in_stats(uuid.UUID(user_id))
+            except ValueError:
+                return Response({'detail': 'Invalid user_id'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            stats = check_in_stats(Attendance.objects.all())
 
-        avg_time = (datetime.min + timedelta(seconds=avg_seconds)).time()
-        return response.Response({'average_check_in_time': avg_time.strftime('%H:%M:%S')}, status=status.HTTP_200_OK)
+        return response.Response({
+            'average_check_in_time': format_seconds(stats['average']),
+            'check_in_time_percentiles': {f'p{p}': format_seconds(value) for p, value in stats['percentiles'].items()},
+        }, status=status.HTTP_200_OK)
 
 class DashboardMetricsView(views.APIView):
     permission_classes = [IsAuthenticated]
@@ -102,30 +103,8 @@ class DashboardMetricsView(views.APIView):
         if not (user.is_staff or user.is_superuser):
             return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
 
-        total_users = User.objects.count()
-        today = datetime.today().date()
-        active_users_today = Attendance.objects.filter(check_in__date=today).values('user').distinct().count()
-        avg_check_in_time = Attendance.objects.filter(check_in__date=today).annotate(
-            check_in_seconds=ExpressionWrapper(
-                F('check_in__hour') * 3600 + F('check_in__minute') * 60 + F('check_in__second'),
-                output_field=DurationField()
-            )
-        ).aggregate(avg_seconds=Avg('check_in_seconds'))['avg_seconds']
-        if avg_check_in_time is not None:
-            avg_check_in_time = (datetime.min + timedelta(seconds=avg_check_in_time)).time().strftime('%H:%M:%S')
-        else:
-            avg_check_in_time = None
-
-        absent_today = total_users - active_users_today
-        late_today = Attendance.objects.filter(check_in__date=today, is_late=True).count()
-
-        data = {
-            'total_users': total_users,
-            'active_users_today': active_users_today,
-            'avg_check_in_time': avg_check_in_time,
-            'absent_today': absent_today,
-            'late_today': late_today,
-        }
+        # Served from the metrics cache; see analytics.metrics
+        data = metrics.dashboard()
         serializer = DashboardMetricsSerializer(data)
         return Response(serializer.data)
 
@@ -166,6 +145,7 @@ class TopPerformersView(views.APIView):
         return Response(serializer.data)
 
 class ExportMonthlySummaryCSVView(views.APIView):
+    """Monthly summaries as a streamed CSV, optionally limited to ``?from=&to=`` months (``YYYY-MM``)"""
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
@@ -173,26 +153,27 @@ class ExportMonthlySummaryCSVView(views.APIView):
         if not (user.is_staff or user.is_superuser):
             return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="monthly_attendance_summary.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['User', 'Month', 'Total Days Worked', 'Total Hours Worked', 'Total Lateness Count', 'Absence Ratio'])
-
         summaries = MonthlyAttendanceSummary.objects.all()
-        for summary in summaries:
-            writer.writerow([
-                summary.user.username,
-                summary.month.strftime('%Y-%m'),
-                summary.total_days_worked,
-                summary.total_hours_worked,
-                summary.total_lateness_count,
-                summary.absence_ratio,
-            ])
-
-        return response
+        try:
+            if 'from' in request.query_params:
+                summaries = summaries.filter(month__gte=parse_month(request.query_params['from']))
+            if 'to' in request.query_params:
+                summaries = summaries.filter(month__lte=parse_month(request.query_params['to']))
+        except ValueError:
+            return Response({'detail': 'from and to must be YYYY-MM months.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = summaries.order_by('month', 'user__email').values_list(
+            'user__email', 'month', 'total_days_worked', 'total_hours_worked', 'total_lateness_count', 'absence_ratio',
+        ).iterator(chunk_size=exports.CHUNK_SIZE)
+        return exports.streaming_csv_response(
+            request,
+            'monthly_attendance_summary.csv',
+            ['User', 'Month', 'Total Days Worked', 'Total Hours Worked', 'Total Lateness Count', 'Absence Ratio'],
+            ((email, month.strftime('%Y-%m'), *values) for email, month, *values in rows),
+        )
 
 class ExportAttendanceHeatmapCSVView(views.APIView):
+    """Attendance heatmap days as a streamed CSV, optionally limited to ``?from=&to=`` ISO dates"""
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
@@ -200,21 +181,24 @@ class ExportAttendanceHeatmapCSVView(views.APIView):
         if not (user.is_staff or user.is_superuser):
             return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="attendance_heatmap.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Punctuality Score', 'Attendance Rate'])
-
         heatmaps = AttendanceHeatmap.objects.all()
-        for heatmap in heatmaps:
-            writer.writerow([
-                heatmap.date.strftime('%Y-%m-%d'),
-                heatmap.punctuality_score,
-                heatmap.attendance_rate,
-            ])
-
-        return response
+        try:
+            if 'from' in request.query_params:
+                heatmaps = heatmaps.filter(date__gte=date.fromisoformat(request.query_params['from']))
+            if 'to' in request.query_params:
+                heatmaps = heatmaps.filter(date__lte=date.fromisoformat(request.query_params['to']))
+        except ValueError:
+            return Response({'detail': 'from and to must be ISO dates.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = heatmaps.order_by('date').values_list(
+            'date', 'punctuality_score', 'attendance_rate',
+        ).iterator(chunk_size=exports.CHUNK_SIZE)
+        return exports.streaming_csv_response(
+            request,
+            'attendance_heatmap.csv',
+            ['Date', 'Punctuality Score', 'Attendance Rate'],
+            ((day.strftime('%Y-%m-%d'), *values) for day, *values in rows),
+        )
 
 class AnomalyDetectionView(views.APIView):
     permission_classes = [IsAuthenticated]
@@ -227,3 +211,46 @@ class AnomalyDetectionView(views.APIView):
         anomalies = AttendanceAnomaly.objects.filter(resolved=False)
         serializer = AttendanceAnomalySerializer(anomalies, many=True)
         return Response(serializer.data)
+
+class AttendanceDistributionView(views.APIView):
+    """Lateness, check-in time and worked hours distributions over ``?from=&to=`` (default: last 30 days)"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not (user.is_staff or user.is_superuser):
+            return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            end = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+            start = date.fromisoformat(request.query_params['from']) if 'from' in request.query_params else end - timedelta(days=29)
+        except ValueError:
+            return Response({'detail': 'from and to must be ISO dates.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'detail': 'from must not be after to.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns = AttendanceColumns.load(Attendance.objects.filter(
+            check_in__gte=day_bounds(start)[0], check_in__lt=day_bounds(end)[1],
+        ))
+        first_day, hours = columns.daily_worked_hours()
+        window = 7
+        rolling = columns.rolling_average(hours, window)
+        return Response({
+            'from': start,
+            'to': end,
+            'attendances': len(columns),
+            'active_users': columns.active_users(),
+            'punctuality': columns.punctuality(),
+            'lateness_minutes': [
+                {'from': lower, 'to': upper, 'count': count}
+                for lower, upper, count in columns.lateness_distribution()
+            ],
+            'check_in_time_percentiles': {
+                f'p{q}': format_seconds(value) for q, value in columns.check_in_percentiles().items()
+            },
+            'hourly_heatmap': columns.hourly_heatmap().tolist(),
+            'rolling_worked_hours': [
+                {'date': first_day + timedelta(days=offset + window - 1), 'hours': round(value, 2)}
+                for offset, value in enumerate(rolling.tolist())
+            ],
+        })
@@ -0,0 +1,20 @@
+"""
+The geofences check-ins are validated against.
+
+A shift's fences are the active ``Geofence`` rows of its job's location,
+plus the circle set on the shift itself, if any. A check-in is allowed
+anywhere inside any of them. Shifts without fences are not geofenced.
+"""
+from core.geofence import CircleFence, FenceSet
+from .models import Geofence
+
+
+def shift_fences(shift):
+    """``FenceSet`` of ``shift``, in one query."""
+    fences = [
+        geofence.to_fence()
+        for geofence in Geofence.objects.filter(is_active=True, location__job__shifts=shift)
+    ]
+    if shift.geofence_lat is not None and shift.geofence_lng is not None and shift.geofence_radius_meters is not None:
+        fences.append(CircleFence(shift.geofence_lat, shift.geofence_lng, shift.geofence_radius_meters))
+    return FenceSet(fences)
@@ -0,0 +1,116 @@
+import math
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from core.geofence import CircleFence, FenceSet, PolygonFence
+
+# Site the synthetic fences surround
+CENTER = (6.5244, 3.3792)
+
+
+class Command(BaseCommand):
+    help = 'Measure geofence validation throughput, vectorized batches against one check per ping'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pings',
+            type=int,
+            default=100000,
+            help='Number of synthetic GPS pings per batch (default: 100000)'
+        )
+        parser.add_argument(
+            '--circles',
+            type=int,
+            default=2,
+            help='Circle fences around the site (default: 2)'
+        )
+        parser.add_argument(
+            '--polygons',
+            type=int,
+            default=2,
+            help='Polygon fences around the site (default: 2)'
+        )
+        parser.add_argument(
+            '--vertices',
+            type=int,
+            default=32,
+            help='Vertices per polygon (default: 32)'
+        )
+        parser.add_argument(
+            '--spread-km',
+            type=float,
+            default=2.0,
+            help='Pings are scattered this far around the site (default: 2.0)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per method; the best is reported (default: 5)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the synthetic data (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        fences = FenceSet(self.fences(rng, options['circles'], options['polygons'], options['vertices']))
+        latitudes, longitudes = self.pings(rng, options['pings'], options['spread_km'])
+        self.stdout.write(
+            f"{len(fences)} fences, {options['pings']} pings within {options['spread_km']} km of the site"
+        )
+
+        batch_seconds, inside = self.best(options['repeat'], lambda: fences.contains(latitudes, longitudes))
+        self.report('vectorized batch', len(latitudes), batch_seconds)
+
+        # One call per ping, as a check-in does; a sample keeps this run short
+        sample = min(len(latitudes), 5000)
+        single_seconds, single = self.best(options['repeat'], lambda: [
+            fences.contains_point(latitudes[i], longitudes[i]) for i in range(sample)
+        ])
+        self.report('one call per ping', sample, single_seconds)
+
+        if list(inside[:sample]) != single:
+            self.stderr.write(self.style.ERROR('Batch and per-ping results differ'))
+        self.stdout.write(
+            f'{inside.mean():.1%} of pings inside; '
+            f'batch is {single_seconds / sample / (batch_seconds / len(latitudes)):.0f}x faster per ping'
+        )
+
+    def fences(self, rng, circles, polygons, vertices):
+        lat, lng = CENTER
+        fences = []
+        for _ in range(circles):
+            offset = rng.normal(scale=0.005, size=2)
+            fences.append(CircleFence(lat + offset[0], lng + offset[1], rng.uniform(100, 500)))
+        for _ in range(polygons):
+            # A star-shaped outline around a point near the site
+            center = (lat, lng) + rng.normal(scale=0.005, size=2)
+            angles = np.sort(rng.uniform(0, 2 * math.pi, vertices))
+            radii = rng.uniform(0.002, 0.006, vertices)
+            fences.append(PolygonFence(np.column_stack([
+                center[0] + radii * np.sin(angles),
+                center[1] + radii * np.cos(angles),
+            ])))
+        return fences
+
+    def pings(self, rng, count, spread_km):
+        degrees = math.degrees(spread_km / 6371.0)
+        return (
+            CENTER[0] + rng.uniform(-degrees, degrees, count),
+            CENTER[1] + rng.uniform(-degrees, degrees, count),
+        )
+
+    def best(self, repeat, run):
+        best, result = math.inf, None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            result = run()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    def report(self, label, pings, seconds):
+        self.stdout.write(f'{label:>18}: {pings} pings in {seconds * 1000:.1f} ms, {pings / seconds:,.0f} pings/s')
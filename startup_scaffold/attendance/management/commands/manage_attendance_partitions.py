@@ -0,0 +1,46 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from attendance import partitions
+from attendance.tasks import create_attendance_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly attendance partitions and detach old ones (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=3,
+            help='Number of months after the current one to create partitions for (default: 3)'
+        )
+        parser.add_argument(
+            '--detach-before',
+            metavar='YYYY-MM',
+            help='Detach the partitions of the months before this one'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop detached partitions instead of keeping them as standalone tables'
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write(self.style.WARNING('The attendance table is not partitioned on this database; nothing to do.'))
+            return
+
+        before = None
+        if options['detach_before']:
+            try:
+                before = date.fromisoformat(f"{options['detach_before']}-01")
+            except ValueError:
+                raise CommandError('--detach-before must be a YYYY-MM month.')
+
+        created = create_attendance_partitions(options['ahead'])
+        self.stdout.write(self.style.SUCCESS(f'Created {len(created)} partitions: {", ".join(created) or "none"}'))
+
+        if before:
+            detached = partitions.detach_partitions(before, drop=options['drop'])
+            action = 'Dropped' if options['drop'] else 'Detached'
+            self.stdout.write(self.style.SUCCESS(f'{action} {len(detached)} partitions: {", ".join(detached) or "none"}'))
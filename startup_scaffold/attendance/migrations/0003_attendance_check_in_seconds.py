@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+
+
+def fill_check_in_seconds(apps, schema_editor):
+    # Local time of day depends on the time zone rules, so it is computed here rather than in SQL
+    Attendance = apps.get_model('attendance', 'Attendance')
+    pending = Attendance.objects.filter(check_in_seconds__isnull=True).order_by('pk')
+    while True:
+        batch = list(pending.only('pk', 'check_in')[:BATCH_SIZE])
+        if not batch:
+            return
+        for attendance in batch:
+            local = timezone.localtime(attendance.check_in)
+            attendance.check_in_seconds = local.hour * 3600 + local.minute * 60 + local.second
+        Attendance.objects.bulk_update(batch, ['check_in_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_initial'),
+        ('shifts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='check_in_seconds',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['user', 'check_in', 'check_in_seconds'], name='attendance_user_checkin_idx'),
+        ),
+        migrations.RunPython(fill_check_in_seconds, migrations.RunPython.noop),
+    ]
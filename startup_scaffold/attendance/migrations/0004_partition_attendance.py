@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:40
+
+from django.db import migrations
+
+
+def partition_attendance(apps, schema_editor):
+    from attendance import partitions
+
+    # Only PostgreSQL partitions the table; elsewhere it stays a plain table
+    partitions.partition_table(schema_editor.connection)
+
+
+def unpartition_attendance(apps, schema_editor):
+    from attendance import partitions
+
+    partitions.unpartition_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendance_check_in_seconds'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_attendance, unpartition_attendance),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 03:47
+
+import datetime
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def fill_lateness(apps, schema_editor):
+    # Whole minutes are all older reports kept; the nightly run restores the exact totals
+    DailyAttendanceReport = apps.get_model('attendance', 'DailyAttendanceReport')
+    pending = DailyAttendanceReport.objects.filter(late_minutes__gt=0, lateness=datetime.timedelta(0)).order_by('pk')
+    while True:
+        batch = list(pending.only('pk', 'late_minutes')[:BATCH_SIZE])
+        if not batch:
+            return
+        for report in batch:
+            report.lateness = datetime.timedelta(minutes=report.late_minutes)
+        DailyAttendanceReport.objects.bulk_update(batch, ['lateness'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_geofence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyattendancereport',
+            name='lateness',
+            field=models.DurationField(default=datetime.timedelta(0)),
+        ),
+        migrations.RunPython(fill_lateness, migrations.RunPython.noop),
+    ]
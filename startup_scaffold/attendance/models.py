@@ -3,12 +3,23 @@ from django.db import models
 from django.conf import settings
 from shifts.models import Shift
 from datetime import timedelta
+from django.utils import timezone
+from django.core.exceptions import ValidationError
+from core.geofence import CircleFence, GeofenceError, PolygonFence
+
+
+def seconds_since_midnight(value):
+    """Seconds between local midnight and the aware datetime ``value``."""
+    local = timezone.localtime(value)
+    return local.hour * 3600 + local.minute * 60 + local.second
 
 class Attendance(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     shift = models.ForeignKey(Shift, on_delete=models.SET_NULL, null=True, blank=True)
     check_in = models.DateTimeField()
+    # Local time of day of check_in, so averages and percentiles need no per-row extract
+    check_in_seconds = models.PositiveIntegerField(null=True, editable=False)
     check_out = models.DateTimeField(null=True, blank=True)
     check_in_lat = models.FloatField(null=True, blank=True)
     check_in_lng = models.FloatField(null=True, blank=True)
@@ -18,6 +29,19 @@ class Attendance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers per-user check-in time aggregates over a date range
+            models.Index(fields=['user', 'check_in', 'check_in_seconds'], name='attendance_user_checkin_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.check_in_seconds = seconds_since_midnight(self.check_in) if self.check_in else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'check_in' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'check_in_seconds'}
+        super().save(*args, **kwargs)
+
     @property
     def total_hours(self):
         if self.check_in and self.check_out:
@@ -32,6 +56,8 @@ class DailyAttendanceReport(models.Model):
     date = models.DateField()
     total_worked_hours = models.DurationField()
     late_minutes = models.IntegerField(default=0)
+    # Exact total lateness; late_minutes is its whole minutes
+    lateness = models.DurationField(default=timedelta(0))
     was_late = models.BooleanField(default=False)
     was_absent = models.BooleanField(default=False)
     checked_in = models.BooleanField(default=False)
@@ -42,3 +68,49 @@ class DailyAttendanceReport(models.Model):
 
     def __str__(self):
         return f"Report for {self.user} on {self.date}"
+
+
+class Geofence(models.Model):
+    """A circle or polygon a site's check-ins must fall in; a site may have several"""
+    class Kind(models.TextChoices):
+        CIRCLE = 'circle', 'Circle'
+        POLYGON = 'polygon', 'Polygon'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    location = models.ForeignKey('jobs.Location', on_delete=models.CASCADE, related_name='geofences')
+    name = models.CharField(max_length=100, blank=True)
+    kind = models.CharField(max_length=10, choices=Kind.choices, default=Kind.CIRCLE)
+    # Circle
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    radius_meters = models.FloatField(null=True, blank=True)
+    # Polygon: [[latitude, longitude], ...] corners, in order
+    vertices = models.JSONField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} geofence {self.name or self.pk} of {self.location}"
+
+    def clean(self):
+        try:
+            self.to_fence()
+        except GeofenceError as e:
+            raise ValidationError(str(e))
+
+    def to_fence(self):
+        if self.kind == self.Kind.POLYGON:
+            return PolygonFence(self.vertices or [])
+        return CircleFence(self.latitude, self.longitude, self.radius_meters)
+
+
+# Cached per-user check-in statistics are dropped whenever an attendance changes
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_check_in_stats(sender, instance, **kwargs):
+    from .stats import invalidate_user_check_in_stats
+    invalidate_user_check_in_stats(instance.user_id)
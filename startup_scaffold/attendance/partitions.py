@@ -0,0 +1,175 @@
+"""
+Monthly range partitions of the attendance table.
+
+On PostgreSQL ``attendance_attendance`` is partitioned by ``check_in``, one
+partition per month plus a default partition that catches rows outside every
+month created so far. Queries that bound ``check_in`` (every report and
+dashboard does) only scan the partitions of the months they touch. Old
+partitions can be detached, leaving plain tables that are no longer part of
+the queries.
+
+A partitioned table needs the partition key in its primary key, so the
+database key is ``(id, check_in)``; Django keeps treating ``id`` alone as
+the primary key. Other databases keep a plain table, and every function
+here is a no-op on them.
+"""
+import re
+from datetime import date
+from django.db import connection as default_connection, transaction
+from core.utils import month_start, next_month
+from .models import Attendance
+
+TABLE = Attendance._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(connection=default_connection):
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection=default_connection):
+    """``{month: table}`` of the monthly partitions attached to the attendance table."""
+    if not is_partitioned(connection):
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s',
+            [TABLE],
+        )
+        partitions = {}
+        for name, in cursor.fetchall():
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+
+def create_partitions(months, connection=default_connection):
+    """Create the missing partitions of ``months``; returns the tables created."""
+    if not is_partitioned(connection):
+        return []
+    existing = list_partitions(connection)
+    created = []
+    for month in sorted({month_start(month) for month in months} - set(existing)):
+        _create_partition(connection, month)
+        created.append(partition_name(month))
+    return created
+
+
+def _create_partition(connection, month):
+    quote = connection.ops.quote_name
+    table, name, default = quote(TABLE), quote(partition_name(month)), quote(DEFAULT_PARTITION)
+    bounds = [month.isoformat(), next_month(month).isoformat()]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {default} WHERE check_in >= %s AND check_in < %s LIMIT 1', bounds)
+        if cursor.fetchone() is None:
+            cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', bounds)
+            return
+        # Rows of this month already landed in the default partition: move them over
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', bounds)
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE check_in >= %s AND check_in < %s RETURNING *) '
+            f'INSERT INTO {table} SELECT * FROM moved',
+            bounds,
+        )
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+
+
+def detach_partitions(before, drop=False, connection=default_connection):
+    """
+    Detach the partitions of the months before ``before``; they stay around
+    as plain tables unless ``drop``. Returns the tables detached.
+    """
+    quote = connection.ops.quote_name
+    detached = []
+    for month, name in sorted(list_partitions(connection).items()):
+        if month >= month_start(before):
+            continue
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}')
+            if drop:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+        detached.append(name)
+    return detached
+
+
+def _table_definition(cursor, table):
+    """Index and constraint definitions of ``table``, other than its primary key."""
+    cursor.execute(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i JOIN pg_class c ON c.oid = i.indrelid "
+        "WHERE c.relname = %s AND NOT i.indisprimary",
+        [table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(con.oid) FROM pg_constraint con "
+        "JOIN pg_class c ON c.oid = con.conrelid WHERE c.relname = %s AND con.contype IN ('f', 'c')",
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _rebuild(connection, partitioned):
+    """Recreate the attendance table, partitioned or plain, with its rows, indexes and constraints."""
+    quote = connection.ops.quote_name
+    table, old = quote(TABLE), quote(f'{TABLE}_old')
+    with connection.cursor() as cursor:
+        indexes, constraints = _table_definition(cursor, TABLE)
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+        if partitioned:
+            cursor.execute(
+                f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (check_in)'
+            )
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, check_in)')
+            cursor.execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT')
+        else:
+            cursor.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+        cursor.execute(f'SELECT min(check_in), max(check_in) FROM {old}')
+        first, last = cursor.fetchone()
+
+    if partitioned and first is not None:
+        month, months = month_start(first.date()), []
+        while month <= last.date():
+            months.append(month)
+            month = next_month(month)
+        create_partitions(months, connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+        # Read before the rename, so they name the new table; their names are free again
+        for definition in indexes:
+            cursor.execute(definition)
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}')
+
+
+def partition_table(connection=default_connection):
+    if is_supported(connection) and not is_partitioned(connection):
+        _rebuild(connection, partitioned=True)
+
+
+def unpartition_table(connection=default_connection):
+    if is_partitioned(connection):
+        _rebuild(connection, partitioned=False)
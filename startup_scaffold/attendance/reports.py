@@ -0,0 +1,159 @@
+"""
+Daily attendance reports.
+
+Reports are kept current during the day by ``track_attendance``, which folds
+every check-in and check-out into the user's report with atomic ``F()``
+arithmetic. The nightly ``generate_daily_reports`` then only reconciles. It
+takes one grouped aggregation over the day's Attendance rows joined to their
+shifts and writes one upsert per batch of users on the (user, date) unique key.
+
+Both paths keep the exact total ``lateness`` and round it down to
+``late_minutes`` once, so a day of several late check-ins gets the same
+minutes from either.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Func, IntegerField, Q, Sum
+from django.utils import timezone
+from .models import Attendance, DailyAttendanceReport
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+REPORT_FIELDS = ['total_worked_hours', 'late_minutes', 'lateness', 'was_late', 'was_absent', 'checked_in', 'checked_out']
+
+
+class WholeMinutes(Func):
+    """Whole minutes of a duration expression, rounded down."""
+    template = 'CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / 60) AS integer)'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite stores durations as integer microseconds
+        template = 'CAST((%(expressions)s) / 60000000 AS integer)'
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+
+def late_minutes(lateness):
+    return int(lateness.total_seconds() // 60)
+
+
+def day_bounds(day):
+    """Aware ``[start, end)`` of ``day`` in the current time zone."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def aggregate_day(day, user_ids=None):
+    """Per-user totals of ``day``'s attendance as ``{user_id: row}``, in one query."""
+    start, end = day_bounds(day)
+    attendances = Attendance.objects.filter(check_in__gte=start, check_in__lt=end)
+    if user_ids is not None:
+        attendances = attendances.filter(user_id__in=user_ids)
+
+    late = Q(shift__isnull=False, check_in__gt=F('shift__start_time'))
+    checked_out = Q(check_out__isnull=False)
+    rows = attendances.values('user_id').annotate(
+        worked=Sum(ExpressionWrapper(F('check_out') - F('check_in'), output_field=DurationField()), filter=checked_out),
+        lateness=Sum(ExpressionWrapper(F('check_in') - F('shift__start_time'), output_field=DurationField()), filter=late),
+        late_count=Count('pk', filter=late),
+        checked_out_count=Count('pk', filter=checked_out),
+    ).order_by()
+    return {row['user_id']: row for row in rows}
+
+
+def build_report(user_id, day, row=None):
+    """The report of ``user_id`` for ``day`` from its ``aggregate_day`` row (``None``: absent)."""
+    if row is None:
+        return DailyAttendanceReport(user_id=user_id, date=day, total_worked_hours=timedelta(0), was_absent=True)
+    lateness = row['lateness'] or timedelta(0)
+    return DailyAttendanceReport(
+        user_id=user_id,
+        date=day,
+        total_worked_hours=row['worked'] or timedelta(0),
+        late_minutes=late_minutes(lateness),
+        lateness=lateness,
+        was_late=row['late_count'] > 0,
+        was_absent=False,
+        checked_in=True,
+        checked_out=row['checked_out_count'] > 0,
+    )
+
+
+def save_reports(reports):
+    DailyAttendanceReport.objects.bulk_create(
+        reports,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=REPORT_FIELDS,
+    )
+
+
+def generate_daily_reports(day):
+    """
+    Write the report of every user for ``day``; users without attendance
+    are reported absent. Returns the number of reports written.
+    """
+    stats = aggregate_day(day)
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=BATCH_SIZE)
+    written = 0
+    for chunk in iter(lambda: list(islice(user_ids, BATCH_SIZE)), []):
+        save_reports([build_report(user_id, day, stats.get(user_id)) for user_id in chunk])
+        written += len(chunk)
+    return written
+
+
+def attendance_state(attendance):
+    """What a daily report needs of ``attendance``: ``(check_in, check_out, shift_start)``."""
+    shift_start = attendance.shift.start_time if attendance.shift_id else None
+    return attendance.check_in, attendance.check_out, shift_start
+
+
+def _contribution(check_in, check_out, shift_start):
+    """``(date, worked, late)`` one attendance adds to its daily report."""
+    worked = check_out - check_in if check_out else timedelta(0)
+    late = check_in - shift_start if shift_start and check_in > shift_start else timedelta(0)
+    return timezone.localdate(check_in), worked, late
+
+
+def track_attendance(user_id, previous, current):
+    """
+    Fold a change of one attendance of ``user_id`` into the daily reports
+    with ``F()`` arithmetic, so concurrent check-ins never lose an update.
+    ``previous`` and ``current`` are its ``attendance_state`` before and
+    after the change, ``None`` when it was created or deleted. Call inside
+    the transaction that writes the attendance.
+    """
+    deltas = defaultdict(lambda: [timedelta(0), timedelta(0)])
+    if previous is not None:
+        day, worked, late = _contribution(*previous)
+        deltas[day][0] -= worked
+        deltas[day][1] -= late
+    day = current_late = None
+    if current is not None:
+        day, worked, current_late = _contribution(*current)
+        deltas[day][0] += worked
+        deltas[day][1] += current_late
+
+    for report_day, (worked, late) in deltas.items():
+        DailyAttendanceReport.objects.bulk_create(
+            [DailyAttendanceReport(user_id=user_id, date=report_day, total_worked_hours=timedelta(0))],
+            ignore_conflicts=True,
+        )
+        changes = {
+            'total_worked_hours': F('total_worked_hours') + worked,
+            'lateness': F('lateness') + late,
+            # Rounded from the new exact total, as the nightly run does
+            'late_minutes': WholeMinutes(F('lateness') + late),
+        }
+        if report_day == day:
+            # Flags are only ever raised here; the nightly run clears stale ones
+            changes.update(was_absent=False, checked_in=True)
+            if current_late:
+                changes['was_late'] = True
+            if current[1]:
+                changes['checked_out'] = True
+        DailyAttendanceReport.objects.filter(user_id=user_id, date=report_day).update(**changes)
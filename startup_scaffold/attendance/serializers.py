@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from core.geofence import GeofenceError, coordinates
 from .models import Attendance, DailyAttendanceReport
 
+MAX_PINGS = 50000
+
 class AttendanceSerializer(serializers.ModelSerializer):
     total_hours = serializers.DurationField(read_only=True)
 
@@ -12,3 +15,14 @@ class DailyAttendanceReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = DailyAttendanceReport
         fields = '__all__'
+
+class PingBatchSerializer(serializers.Serializer):
+    """GPS pings of a shift, ``[latitude, longitude]`` pairs, e.g. synced from an offline device"""
+    shift = serializers.UUIDField()
+    pings = serializers.ListField(allow_empty=False, max_length=MAX_PINGS)
+
+    def validate_pings(self, value):
+        try:
+            return coordinates(value)
+        except GeofenceError as e:
+            raise serializers.ValidationError(str(e))
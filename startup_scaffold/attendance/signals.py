@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after the transaction that creates, changes or deletes an attendance
+# commits, with ``user_id`` and the ``previous`` and ``current``
+# ``attendance.reports.attendance_state`` of it (``None`` when absent).
+attendance_changed = Signal()
@@ -0,0 +1,74 @@
+"""
+Check-in time statistics.
+
+``Attendance.check_in_seconds`` holds the local time of day of every
+check-in. Averages and percentiles therefore aggregate a plain column that
+the (user, check_in, check_in_seconds) index covers. No hours and minutes
+are extracted per row. Results per user are cached until one of that
+user's attendances changes.
+"""
+from math import ceil, floor
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, FloatField
+from .models import Attendance
+
+PERCENTILES = (50, 90, 95)
+CACHE_TIMEOUT = 3600
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL's interpolated ``percentile_cont(fraction)`` ordered-set aggregate."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def check_in_stats(queryset, percentiles=PERCENTILES):
+    """
+    ``{'count', 'average', 'percentiles': {percentile: seconds}}`` of the
+    check-in times of ``queryset``, in seconds since local midnight.
+    """
+    queryset = queryset.filter(check_in_seconds__isnull=False).order_by()
+    if connections[queryset.db].vendor == 'postgresql':
+        row = queryset.aggregate(
+            count=Count('check_in_seconds'),
+            average=Avg('check_in_seconds'),
+            **{f'p{p}': PercentileCont('check_in_seconds', fraction=p / 100) for p in percentiles},
+        )
+        return {
+            'count': row['count'],
+            'average': row['average'],
+            'percentiles': {p: row[f'p{p}'] for p in percentiles},
+        }
+
+    row = queryset.aggregate(count=Count('check_in_seconds'), average=Avg('check_in_seconds'))
+    values = queryset.order_by('check_in_seconds').values_list('check_in_seconds', flat=True)
+    result = {}
+    for p in percentiles:
+        if not row['count']:
+            result[p] = None
+            continue
+        # Interpolated like percentile_cont, from the one or two values around the rank
+        rank = p / 100 * (row['count'] - 1)
+        low, high = floor(rank), ceil(rank)
+        neighbours = list(values[low:high + 1])
+        result[p] = neighbours[0] + (neighbours[-1] - neighbours[0]) * (rank - low)
+    return {'count': row['count'], 'average': row['average'], 'percentiles': result}
+
+
+def _cache_key(user_id):
+    return f'attendance:check_in_stats:{user_id}'
+
+
+def user_check_in_stats(user_id):
+    """``check_in_stats`` of all the attendances of ``user_id``, cached."""
+    stats = cache.get(_cache_key(user_id))
+    if stats is None:
+        stats = check_in_stats(Attendance.objects.filter(user_id=user_id))
+        cache.set(_cache_key(user_id), stats, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_user_check_in_stats(user_id):
+    cache.delete(_cache_key(user_id))
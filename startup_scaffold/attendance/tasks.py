@@ -0,0 +1,13 @@
+from celery import shared_task
+from django.utils import timezone
+from . import partitions
+
+
+@shared_task
+def create_attendance_partitions(ahead=3):
+    """Make sure the monthly attendance partitions exist for this month and the next ``ahead``"""
+    month, months = partitions.month_start(timezone.now().date()), []
+    for _ in range(ahead + 1):
+        months.append(month)
+        month = partitions.next_month(month)
+    return partitions.create_partitions(months)
@@ -1,3 +1,286 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, datetime, timedelta
+from django.contrib.auth import get_user_model
+from jobs.models import Job
+from shifts.models import Shift
+from shifts.tasks import generate_daily_attendance_reports
+from .models import Attendance, DailyAttendanceReport
+from . import partitions
+from .reports import attendance_state, generate_daily_reports, track_attendance
+from .stats import check_in_stats, user_check_in_stats
 
-# Create your tests here.
+User = get_user_model()
+
+class DailyReportTests(TestCase):
+    def setUp(self):
+        self.day = date(2026, 3, 2)
+        self.punctual = User.objects.create_user(email='punctual@example.com', password='pass1234')
+        self.late = User.objects.create_user(email='late@example.com', password='pass1234')
+        self.absent = User.objects.create_user(email='absent@example.com', password='pass1234')
+        self.job = Job.objects.create(client=self.punctual, title='Warehouse')
+
+    def at(self, hour, minute=0):
+        return timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=hour, minutes=minute)
+
+    def attend(self, user, check_in, check_out=None, shift_start=None):
+        shift = None
+        if shift_start:
+            shift = Shift.objects.create(
+                job=self.job, worker=user, name='Shift', start_time=shift_start, end_time=shift_start + timedelta(hours=8)
+            )
+        return Attendance.objects.create(user=user, shift=shift, check_in=check_in, check_out=check_out)
+
+    def test_reports_aggregate_each_user(self):
+        self.attend(self.punctual, self.at(8), self.at(12), shift_start=self.at(8))
+        self.attend(self.punctual, self.at(13), self.at(17))
+        self.attend(self.late, self.at(9, 20), self.at(17), shift_start=self.at(9))
+        self.attend(self.late, self.at(18, 5), shift_start=self.at(18))
+        # Other days are ignored
+        self.attend(self.absent, self.at(-2), self.at(-1))
+
+        with self.assertNumQueries(3):
+            self.assertEqual(generate_daily_reports(self.day), 3)
+
+        punctual = DailyAttendanceReport.objects.get(user=self.punctual, date=self.day)
+        self.assertEqual(punctual.total_worked_hours, timedelta(hours=8))
+        self.assertEqual((punctual.late_minutes, punctual.was_late, punctual.checked_out), (0, False, True))
+
+        late = DailyAttendanceReport.objects.get(user=self.late, date=self.day)
+        self.assertEqual(late.total_worked_hours, timedelta(hours=7, minutes=40))
+        self.assertEqual((late.late_minutes, late.was_late, late.was_absent), (25, True, False))
+
+        absent = DailyAttendanceReport.objects.get(user=self.absent, date=self.day)
+        self.assertEqual((absent.was_absent, absent.checked_in, absent.total_worked_hours), (True, False, timedelta(0)))
+
+    def test_rerun_updates_existing_reports(self):
+        generate_daily_reports(self.day)
+        self.attend(self.absent, self.at(10), self.at(11))
+        generate_daily_attendance_reports(self.day.isoformat())
+
+        self.assertEqual(DailyAttendanceReport.objects.filter(date=self.day).count(), 3)
+        report = DailyAttendanceReport.objects.get(user=self.absent, date=self.day)
+        self.assertEqual((report.was_absent, report.total_worked_hours), (False, timedelta(hours=1)))
+
+
+class IncrementalReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.client.force_login(self.user)
+        self.job = Job.objects.create(client=self.user, title='Warehouse')
+        now = timezone.now()
+        self.shift = Shift.objects.create(
+            job=self.job, worker=self.user, name='Shift',
+            start_time=now - timedelta(minutes=30), end_time=now + timedelta(hours=8),
+        )
+        self.attendance = Attendance.objects.create(user=self.user, shift=self.shift, check_in=self.shift.start_time)
+
+    def report(self):
+        return DailyAttendanceReport.objects.get(user=self.user, date=timezone.localdate())
+
+    def test_check_in_and_out_update_report(self):
+        response = self.client.post(
+            reverse('attendance-check-in', args=[self.attendance.pk]), {'biometric_verified': True}
+        )
+        self.assertEqual(response.status_code, 200)
+        report = self.report()
+        self.assertEqual((report.late_minutes, report.was_late, report.checked_in, report.checked_out), (30, True, True, False))
+        self.assertEqual(report.total_worked_hours, timedelta(0))
+
+        response = self.client.post(reverse('attendance-check-out', args=[self.attendance.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.attendance.refresh_from_db()
+        report = self.report()
+        self.assertEqual(report.total_worked_hours, self.attendance.total_hours)
+        self.assertEqual((report.late_minutes, report.checked_out), (30, True))
+
+    def test_repeated_check_out_replaces_previous_contribution(self):
+        self.client.post(reverse('attendance-check-in', args=[self.attendance.pk]), {'biometric_verified': True})
+        self.client.post(reverse('attendance-check-out', args=[self.attendance.pk]))
+        self.client.post(reverse('attendance-check-out', args=[self.attendance.pk]))
+        self.attendance.refresh_from_db()
+        self.assertEqual(self.report().total_worked_hours, self.attendance.total_hours)
+        self.assertEqual(self.report().late_minutes, 30)
+
+    def test_nightly_run_agrees_with_incremental_report(self):
+        self.client.post(reverse('attendance-check-in', args=[self.attendance.pk]), {'biometric_verified': True})
+        self.client.post(reverse('attendance-check-out', args=[self.attendance.pk]))
+        incremental = self.report()
+        generate_daily_reports(timezone.localdate())
+        reconciled = self.report()
+        self.assertEqual(
+            (incremental.total_worked_hours, incremental.late_minutes, incremental.was_late),
+            (reconciled.total_worked_hours, reconciled.late_minutes, reconciled.was_late),
+        )
+
+    def test_nightly_run_agrees_on_several_late_check_ins(self):
+        # Each check-in is 90 seconds late: 3 minutes in total, though each alone rounds to 1
+        for minutes in (0, 60):
+            shift = Shift.objects.create(
+                job=self.job, worker=self.user, name='Shift',
+                start_time=self.shift.start_time + timedelta(minutes=minutes),
+                end_time=self.shift.start_time + timedelta(minutes=minutes + 30),
+            )
+            attendance = Attendance.objects.create(user=self.user, shift=shift, check_in=shift.start_time + timedelta(seconds=90))
+            track_attendance(self.user.pk, None, attendance_state(attendance))
+        incremental = self.report()
+        self.assertEqual((incremental.late_minutes, incremental.lateness, incremental.was_late), (3, timedelta(seconds=180), True))
+
+        generate_daily_reports(timezone.localdate())
+        reconciled = self.report()
+        self.assertEqual(
+            (incremental.late_minutes, incremental.lateness, incremental.was_late),
+            (reconciled.late_minutes, reconciled.lateness, reconciled.was_late),
+        )
+
+    def test_delete_removes_contribution(self):
+        self.client.post(reverse('attendance-check-in', args=[self.attendance.pk]), {'biometric_verified': True})
+        self.client.post(reverse('attendance-check-out', args=[self.attendance.pk]))
+        response = self.client.delete(reverse('attendance-detail', args=[self.attendance.pk]))
+        self.assertEqual(response.status_code, 204)
+        report = self.report()
+        self.assertEqual((report.total_worked_hours, report.late_minutes), (timedelta(0), 0))
+
+
+class CheckInStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.day = timezone.make_aware(datetime(2026, 3, 2))
+        for hour, minute in ((8, 0), (8, 30), (9, 0), (11, 0)):
+            Attendance.objects.create(user=self.user, check_in=self.day + timedelta(hours=hour, minutes=minute))
+
+    def test_check_in_seconds_is_stored(self):
+        attendance = Attendance.objects.earliest('check_in')
+        self.assertEqual(attendance.check_in_seconds, 8 * 3600)
+        attendance.check_in += timedelta(minutes=5)
+        attendance.save(update_fields=['check_in'])
+        attendance.refresh_from_db()
+        self.assertEqual(attendance.check_in_seconds, 8 * 3600 + 300)
+
+    def test_average_and_percentiles(self):
+        stats = check_in_stats(Attendance.objects.filter(user=self.user), percentiles=(0, 50, 90, 100))
+        self.assertEqual((stats['count'], stats['average']), (4, 9 * 3600 + 7.5 * 60))
+        self.assertEqual(stats['percentiles'], {0: 8 * 3600, 50: 8.75 * 3600, 90: 10.4 * 3600, 100: 11 * 3600})
+        self.assertEqual(check_in_stats(Attendance.objects.none())['percentiles'][50], None)
+
+    def test_user_stats_are_cached_until_attendance_changes(self):
+        self.assertEqual(user_check_in_stats(self.user.pk)['count'], 4)
+        with self.assertNumQueries(0):
+            user_check_in_stats(self.user.pk)
+        Attendance.objects.create(user=self.user, check_in=self.day + timedelta(hours=10))
+        self.assertEqual(user_check_in_stats(self.user.pk)['count'], 5)
+
+    def test_average_uses_covering_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan text is SQLite specific')
+        plan = Attendance.objects.filter(user=self.user, check_in__gte=self.day).values('check_in_seconds').explain()
+        self.assertIn('COVERING INDEX attendance_user_checkin_idx', plan)
+
+
+class PartitionTests(TestCase):
+    def test_partition_names(self):
+        self.assertEqual(partitions.partition_name(date(2026, 3, 1)), 'attendance_attendance_p2026_03')
+        self.assertEqual(partitions.next_month(date(2026, 12, 1)), date(2027, 1, 1))
+
+    def test_plain_table_fallback(self):
+        if partitions.is_supported(connection):
+            self.skipTest('PostgreSQL partitions the table')
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(partitions.create_partitions([date(2026, 3, 1)]), [])
+        self.assertEqual(partitions.detach_partitions(date(2026, 3, 1)), [])
+        out = StringIO()
+        call_command('manage_attendance_partitions', '--detach-before', '2025-01', stdout=out)
+        self.assertIn('not partitioned', out.getvalue())
+
+    def test_current_status_only_scans_recent_attendances(self):
+        user = User.objects.create_user(email='worker@example.com', password='pass1234')
+        now = timezone.now()
+        current = Attendance.objects.create(user=user, check_in=now - timedelta(hours=2))
+        Attendance.objects.create(user=user, check_in=now - timedelta(days=40))
+        self.client.force_login(user)
+        response = self.client.get(reverse('current-attendance-status'))
+        self.assertEqual([row['id'] for row in response.data['results']], [str(current.pk)])
+
+
+class GeofenceCheckInTests(TestCase):
+    def setUp(self):
+        from jobs.models import Location
+        from .models import Geofence
+        self.user = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.client.force_login(self.user)
+        self.site = Location.objects.create(city='Lagos', country='Nigeria', latitude=6.5244, longitude=3.3792)
+        self.job = Job.objects.create(client=self.user, title='Warehouse', location=self.site)
+        now = timezone.now()
+        self.shift = Shift.objects.create(
+            job=self.job, worker=self.user, name='Shift', start_time=now, end_time=now + timedelta(hours=8),
+        )
+        self.attendance = Attendance.objects.create(user=self.user, shift=self.shift, check_in=now)
+        # The warehouse floor plus a circle around the car park
+        Geofence.objects.create(
+            location=self.site, kind=Geofence.Kind.POLYGON,
+            vertices=[[6.520, 3.375], [6.520, 3.380], [6.525, 3.380], [6.525, 3.375]],
+        )
+        Geofence.objects.create(location=self.site, latitude=6.530, longitude=3.378, radius_meters=200)
+        Geofence.objects.create(location=self.site, latitude=6.540, longitude=3.378, radius_meters=200, is_active=False)
+
+    def check_in(self, latitude, longitude):
+        return self.client.post(reverse('attendance-check-in', args=[self.attendance.pk]), {
+            'check_in_lat': latitude, 'check_in_lng': longitude, 'biometric_verified': True,
+        })
+
+    def test_check_in_must_be_inside_a_fence(self):
+        self.assertEqual(self.check_in(6.540, 3.378).status_code, 403)
+        self.assertEqual(self.check_in(6.527, 3.378).status_code, 403)
+        self.assertEqual(self.check_in(95, 3.378).status_code, 400)
+        self.assertEqual(self.client.post(
+            reverse('attendance-check-in', args=[self.attendance.pk]), {'biometric_verified': True},
+        ).status_code, 400)
+        self.assertEqual(self.check_in(6.5301, 3.3781).status_code, 200)
+        self.assertEqual(self.check_in(6.522, 3.377).status_code, 200)
+        self.attendance.refresh_from_db()
+        self.assertEqual((self.attendance.check_in_lat, self.attendance.check_in_lng), (6.522, 3.377))
+
+    def test_shift_circle_still_applies(self):
+        from .models import Geofence
+        Geofence.objects.all().delete()
+        self.assertEqual(self.check_in(6.6, 3.4).status_code, 200)
+        Shift.objects.filter(pk=self.shift.pk).update(geofence_lat=6.5244, geofence_lng=3.3792, geofence_radius_meters=100)
+        self.assertEqual(self.check_in(6.6, 3.4).status_code, 403)
+        self.assertEqual(self.check_in(6.5245, 3.3792).status_code, 200)
+
+    def test_batch_ping_validation(self):
+        pings = [[6.522, 3.377], [6.527, 3.378], [6.530, 3.378], [6.540, 3.378]] * 250
+        response = self.client.post(
+            reverse('attendance-validate-pings'), {'shift': str(self.shift.pk), 'pings': pings}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['geofenced'])
+        self.assertEqual(response.data['inside'][:4], [True, False, True, False])
+        self.assertEqual(response.data['outside_count'], 500)
+
+        response = self.client.post(
+            reverse('attendance-validate-pings'), {'shift': str(self.shift.pk), 'pings': [[6.5, 3.3], [6.5]]},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        self.client.force_login(other)
+        response = self.client.post(
+            reverse('attendance-validate-pings'), {'shift': str(self.shift.pk), 'pings': pings}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_geofence_geometry_is_validated(self):
+        from django.core.exceptions import ValidationError
+        from .models import Geofence
+        with self.assertRaises(ValidationError):
+            Geofence(location=self.site, kind=Geofence.Kind.POLYGON, vertices=[[6.52, 3.37]]).full_clean()
+        with self.assertRaises(ValidationError):
+            Geofence(location=self.site, latitude=6.52, longitude=3.37).full_clean()
@@ -19,21 +19,58 @@ from django.db.models import Q, Sum, F, ExpressionWrapper, DurationField, Count
 from django.contrib.auth import get_user_model
 from datetime import datetime, timedelta
 from .models import Attendance, DailyAttendanceReport
-from .serializers import AttendanceSerializer, DailyAttendanceReportSerializer
+from .serializers import AttendanceSerializer, DailyAttendanceReportSerializer, PingBatchSerializer
 from .permissions import IsAdminOrSelf
+from .geofences import shift_fences
+from .reports import attendance_state, track_attendance
+from .signals import attendance_changed
 from rest_framework.decorators import action
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from shifts.models import Shift
+import numpy as np
 
 User = get_user_model()
 
+# Attendances still open after this long are forgotten check-outs, not current presence
+OPEN_ATTENDANCE_WINDOW = timedelta(hours=24)
+
 class AttendanceViewSet(viewsets.ModelViewSet):
-    queryset = Attendance.objects.all()
+    queryset = Attendance.objects.select_related('shift')
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    max_page_size = 50
+
+    # Every write also updates the user's daily report, in the same transaction
+    @transaction.atomic
+    def perform_create(self, serializer):
+        attendance = serializer.save()
+        self.record_change(attendance.user_id, None, attendance)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        user_id, previous = instance.user_id, attendance_state(instance)
+        attendance = serializer.save()
+        if attendance.user_id != user_id:
+            self.record_change(user_id, previous, None)
+            previous = None
+        self.record_change(attendance.user_id, previous, attendance)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.record_change(instance.user_id, attendance_state(instance), None)
+        instance.delete()
+
+    def record_change(self, user_id, previous, attendance):
+        current = attendance_state(attendance) if attendance else None
+        track_attendance(user_id, previous, current)
+        transaction.on_commit(lambda: attendance_changed.send(
+            sender=Attendance, user_id=user_id, previous=previous, current=current,
+        ))
 
     @action(detail=True, methods=['post'], url_path='check-in')
     def check_in(self, request, pk=None):
-        import math
-
         attendance = self.get_object()
         grace_period_minutes = 10  # Grace period in minutes, can be configurable
         now = timezone.now()
@@ -41,27 +78,19 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
         # Geofencing validation
         shift = attendance.shift
-        if shift and shift.geofence_lat is not None and shift.geofence_lng is not None and shift.geofence_radius_meters is not None:
+        fences = shift_fences(shift) if shift else None
+        if fences:
             check_in_lat = request.data.get('check_in_lat')
             check_in_lng = request.data.get('check_in_lng')
             if check_in_lat is None or check_in_lng is None:
                 return Response({'error': 'Check-in latitude and longitude are required for geofencing.'}, status=400)
-
-            # Calculate distance between check-in location and geofence center
-            def haversine(lat1, lon1, lat2, lon2):
-                R = 6371000  # Earth radius in meters
-                phi1 = math.radians(float(lat1))
-                phi2 = math.radians(float(lat2))
-                delta_phi = math.radians(float(lat2) - float(lat1))
-                delta_lambda = math.radians(float(lon2) - float(lon1))
-                a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-                c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-                return R * c
-
-            distance = haversine(check_in_lat, check_in_lng, shift.geofence_lat, shift.geofence_lng)
-            if distance > shift.geofence_radius_meters:
+            try:
+                inside = fences.contains_point(float(check_in_lat), float(check_in_lng))
+            except (TypeError, ValueError):
+                return Response({'error': 'Check-in latitude and longitude must be valid coordinates.'}, status=400)
+            if not inside:
                 # Log violation or deny check-in
-                return Response({'error': 'Check-in location is outside the allowed geofence radius.'}, status=403)
+                return Response({'error': 'Check-in location is outside the allowed geofences.'}, status=403)
 
         if shift_start:
             grace_period_end = shift_start + timedelta(minutes=grace_period_minutes)
@@ -77,21 +106,50 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             # For now, just return a warning or allow to proceed based on config
             return Response({'warning': 'Biometric verification not completed. This is a placeholder.'}, status=200)
 
+        previous = attendance_state(attendance)
         attendance.check_in = now
         attendance.check_in_lat = request.data.get('check_in_lat')
         attendance.check_in_lng = request.data.get('check_in_lng')
-        attendance.save()
+        with transaction.atomic():
+            attendance.save()
+            self.record_change(attendance.user_id, previous, attendance)
         serializer = self.get_serializer(attendance)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'], url_path='check-out')
     def check_out(self, request, pk=None):
         attendance = self.get_object()
+        previous = attendance_state(attendance)
         attendance.check_out = timezone.now()
-        attendance.save()
+        with transaction.atomic():
+            attendance.save()
+            self.record_change(attendance.user_id, previous, attendance)
         serializer = self.get_serializer(attendance)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='pings/validate', url_name='validate-pings')
+    def validate_pings(self, request):
+        """
+        Check a batch of GPS pings of a shift, e.g. synced from an offline
+        device, against its geofences; ``inside`` follows the order of ``pings``
+        """
+        serializer = PingBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        shift = get_object_or_404(Shift, pk=serializer.validated_data['shift'])
+        user = request.user
+        if shift.worker_id != user.pk and not (user.is_staff or user.is_superuser):
+            return Response({'detail': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        latitudes, longitudes = serializer.validated_data['pings']
+        fences = shift_fences(shift)
+        inside = fences.contains(latitudes, longitudes) if fences else np.ones(len(latitudes), dtype=bool)
+        return Response({
+            'shift': shift.pk,
+            'geofenced': bool(fences),
+            'inside': inside.tolist(),
+            'outside_count': int(len(inside) - inside.sum()),
+        })
+
 class DailyAttendanceReportView(generics.ListAPIView):
     serializer_class = DailyAttendanceReportSerializer
     permission_classes = [IsAuthenticated]
@@ -122,16 +180,22 @@ class CurrentAttendanceStatusView(generics.ListAPIView):
 
     def get_queryset(self):
         now = timezone.now()
-        # Users currently checked in (check_in <= now and (check_out is null or check_out > now))
-        return Attendance.objects.filter(check_in__lte=now).filter(Q(check_out__isnull=True) | Q(check_out__gt=now))
+        # Users currently checked in (check_in <= now and (check_out is null or check_out > now)).
+        # The lower bound keeps the scan to the latest partitions instead of all history.
+        return Attendance.objects.filter(
+            check_in__gt=now - OPEN_ATTENDANCE_WINDOW, check_in__lte=now,
+        ).filter(Q(check_out__isnull=True) | Q(check_out__gt=now))
 
 class MyAttendanceHistoryView(generics.ListAPIView):
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated]
+    # Most recent check-ins first, at most 30 per page
+    keyset_ordering = ('-check_in', '-id')
+    max_page_size = 30
 
     def get_queryset(self):
         user = self.request.user
-        return Attendance.objects.filter(user=user).order_by('-check_in')[:30]
+        return Attendance.objects.filter(user=user)
 
 class AttendanceViolationsView(generics.ListAPIView):
     serializer_class = DailyAttendanceReportSerializer
@@ -1 +1,8 @@
+from django.contrib import admin
+from .models import ArchiveBatch
 
+@admin.register(ArchiveBatch)
+class ArchiveBatchAdmin(admin.ModelAdmin):
+    list_display = ('model', 'file', 'row_count', 'first_timestamp', 'last_timestamp', 'status', 'created_at')
+    list_filter = ('model', 'status')
+    readonly_fields = [field.name for field in ArchiveBatch._meta.fields]
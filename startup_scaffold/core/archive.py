@@ -0,0 +1,192 @@
+"""
+Cold-storage archival of old rows.
+
+Rows older than the retention window are read in keyset order, (timestamp,
+pk) chunk by chunk, so each chunk is an index range scan however large the
+table is. They are written to gzipped CSV files in the ``archive`` storage.
+Every file is then read back and checked against its recorded row count and
+SHA-256. Only after that are exactly the archived primary keys deleted from
+the database, in batches. An ``ArchiveBatch`` row records each file so it can
+be listed and read back later.
+
+Columns are the model's concrete fields by column name. ``\\N`` stands for
+NULL, so it is not confused with an empty string.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import tempfile
+import uuid
+from datetime import timedelta
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ArchiveBatch
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_ROWS_PER_FILE = 100000
+NULL = '\\N'
+
+
+class ArchiveVerificationError(Exception):
+    pass
+
+
+def archive_storage():
+    return storages['archive']
+
+
+def archived_models():
+    """``{label: timestamp_field}`` of the models to archive."""
+    return settings.ARCHIVE_MODELS
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)
+
+
+def _encode(value):
+    if value is None:
+        return NULL
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _decode(value):
+    return None if value == NULL else value
+
+
+def _sha256(fileobj):
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(1 << 20), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunks(queryset, timestamp_field, columns, chunk_size):
+    """Rows of ``queryset`` in (timestamp, pk) keyset order, ``chunk_size`` per query."""
+    pk = queryset.model._meta.pk.attname
+    queryset = queryset.order_by(timestamp_field, pk)
+    timestamp_index, pk_index = columns.index(timestamp_field), columns.index(pk)
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(
+                Q(**{f'{timestamp_field}__gt': last[timestamp_index]})
+                | Q(**{timestamp_field: last[timestamp_index], f'{pk}__gt': last[pk_index]})
+            )
+        rows = list(page.values_list(*columns)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+def _write_file(label, timestamp_field, columns, rows_iter, rows_per_file, cutoff):
+    """Write up to ``rows_per_file`` rows to a new archive file; returns its batch, or ``None``."""
+    timestamp_index = columns.index(timestamp_field)
+    count, first, last = 0, None, None
+    with tempfile.TemporaryFile() as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as compressed:
+            text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(columns)
+            for rows in rows_iter:
+                for row in rows:
+                    writer.writerow([_encode(value) for value in row])
+                count += len(rows)
+                first = first or rows[0][timestamp_index]
+                last = rows[-1][timestamp_index]
+                if count >= rows_per_file:
+                    break
+            text.flush()
+            text.detach()
+        if not count:
+            return None
+
+        sha256 = _sha256(raw)
+        raw.seek(0)
+        name = f"{label.replace('.', '/')}/{first:%Y/%m}/{uuid.uuid4().hex}.csv.gz"
+        name = archive_storage().save(name, File(raw))
+    return ArchiveBatch.objects.create(
+        model=label, file=name, columns=columns, cutoff=cutoff,
+        first_timestamp=first, last_timestamp=last, row_count=count, sha256=sha256,
+    )
+
+
+def read_rows(batch):
+    """The rows of an archive file as lists of strings, ``None`` for NULL; header excluded."""
+    with archive_storage().open(batch.file, 'rb') as stored:
+        with gzip.open(stored, mode='rt', encoding='utf-8', newline='') as text:
+            reader = csv.reader(text)
+            next(reader)
+            for row in reader:
+                yield [_decode(value) for value in row]
+
+
+def verify(batch):
+    """Check an archive file against its batch; returns the primary keys it holds."""
+    with archive_storage().open(batch.file, 'rb') as stored:
+        sha256 = _sha256(stored)
+    if sha256 != batch.sha256:
+        raise ArchiveVerificationError(f'{batch.file}: checksum mismatch')
+    pk_index = batch.columns.index(apps.get_model(batch.model)._meta.pk.attname)
+    pks = [row[pk_index] for row in read_rows(batch)]
+    if len(pks) != batch.row_count:
+        raise ArchiveVerificationError(f'{batch.file}: {len(pks)} rows read back, {batch.row_count} written')
+    batch.status = ArchiveBatch.Status.VERIFIED
+    batch.save(update_fields=['status'])
+    return pks
+
+
+def purge(batch, pks, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Delete the verified rows of ``batch`` from the database, ``chunk_size`` per statement."""
+    model = apps.get_model(batch.model)
+    pk_field = model._meta.pk
+    for start in range(0, len(pks), chunk_size):
+        chunk = [pk_field.to_python(pk) for pk in pks[start:start + chunk_size]]
+        with transaction.atomic():
+            model._base_manager.filter(pk__in=chunk).delete()
+    batch.status = ArchiveBatch.Status.PURGED
+    batch.purged_at = timezone.now()
+    batch.save(update_fields=['status', 'purged_at'])
+
+
+def archive_model(label, before=None, chunk_size=DEFAULT_CHUNK_SIZE, rows_per_file=DEFAULT_ROWS_PER_FILE, delete=True):
+    """
+    Archive the rows of model ``label`` older than ``before`` (default: the
+    retention window), verifying each file before its rows are deleted
+    (unless not ``delete``). Returns the batches written.
+    """
+    model = apps.get_model(label)
+    timestamp_field = archived_models()[label]
+    before = before or default_cutoff()
+    columns = [field.attname for field in model._meta.concrete_fields]
+    rows = _chunks(
+        model._base_manager.filter(**{f'{timestamp_field}__lt': before}), timestamp_field, columns, chunk_size,
+    )
+    batches = []
+    while True:
+        batch = _write_file(label, timestamp_field, columns, rows, rows_per_file, before)
+        if batch is None:
+            return batches
+        pks = verify(batch)
+        if delete:
+            purge(batch, pks, chunk_size)
+        batches.append(batch)
+
+
+def archive_all(before=None, **options):
+    """Archive every model of ``ARCHIVE_MODELS``; returns ``{label: rows archived}``."""
+    return {
+        label: sum(batch.row_count for batch in archive_model(label, before, **options))
+        for label in archived_models()
+    }
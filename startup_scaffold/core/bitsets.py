@@ -0,0 +1,36 @@
+"""
+Compact integer bitsets stored in BinaryField columns.
+
+Bit ``n`` is set when the item with ordinal ``n`` is a member. Python ints
+are arbitrary precision, so AND plus ``int.bit_count`` gives the size of an
+intersection in a single popcount, whatever the number of items.
+"""
+
+
+def pack(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def unpack(value):
+    if not value:
+        return 0
+    return int.from_bytes(bytes(value), 'little')
+
+
+def from_ordinals(ordinals):
+    bits = 0
+    for ordinal in ordinals:
+        if ordinal is not None:
+            bits |= 1 << ordinal
+    return bits
+
+
+def ordinals(bits):
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def overlap(a, b):
+    return (a & b).bit_count()
@@ -18,6 +18,22 @@ app.conf.beat_schedule = {
         'task': 'jobs.tasks.mark_expired_jobs',
         'schedule': crontab(minute=0, hour='*'),  # every hour
     },
+    'mark-missed-shifts-every-minute': {
+        'task': 'shifts.tasks.mark_missed_shifts',
+        'schedule': crontab(),  # one anti-join update, cheap when nothing is due
+    },
+    'reconcile-dashboard-metrics': {
+        'task': 'analytics.tasks.reconcile_dashboard_metrics',
+        'schedule': crontab(minute='*/5'),  # within DASHBOARD_METRICS_MAX_STALENESS
+    },
+    'create-attendance-partitions-daily': {
+        'task': 'attendance.tasks.create_attendance_partitions',
+        'schedule': crontab(minute=30, hour=0),  # idempotent; months ahead always exist
+    },
+    'archive-old-rows-weekly': {
+        'task': 'core.tasks.archive_old_rows',
+        'schedule': crontab(minute=0, hour=3, day_of_week='sun'),
+    },
 }
 
 @app.task(bind=True)
@@ -0,0 +1,53 @@
+"""
+Set-based write helpers on top of the ORM.
+"""
+from django.db import connections, transaction
+from django.db.models.sql import UpdateQuery
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def update_returning_ids(queryset, batch_size=DEFAULT_BATCH_SIZE, **values):
+    """
+    ``queryset.update(**values)`` that also yields the primary keys of the
+    updated rows, in lists of at most ``batch_size``.
+
+    PostgreSQL runs one ``UPDATE ... RETURNING``. Other databases update the
+    rows in primary key chunks, each in its own transaction; there the update
+    must take rows out of ``queryset`` (e.g. by changing a filtered status),
+    otherwise the same chunk would be selected forever.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        ids = _update_returning(queryset, connection, values)
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size]
+        return
+
+    queryset = queryset.order_by('pk')
+    while True:
+        with transaction.atomic(using=queryset.db):
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if ids:
+                queryset.model._base_manager.using(queryset.db).filter(pk__in=ids).update(**values)
+        if not ids:
+            return
+        yield ids
+
+
+def _update_returning_sql(queryset, connection, values):
+    """``(sql, params)`` of ``queryset.update(**values)`` returning the primary keys of the updated rows."""
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    # as_sql() runs pre_sql_setup() itself, as in SQLUpdateCompiler.execute_sql
+    sql, params = query.get_compiler(connection=connection).as_sql()
+    pk = queryset.model._meta.pk
+    return f'{sql} RETURNING {connection.ops.quote_name(pk.column)}', params
+
+
+def _update_returning(queryset, connection, values):
+    sql, params = _update_returning_sql(queryset, connection, values)
+    pk = queryset.model._meta.pk
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [pk.to_python(row[0]) for row in cursor.fetchall()]
@@ -0,0 +1,183 @@
+"""
+Geohash cells and great-circle distances, without PostGIS.
+
+A geohash interleaves longitude and latitude bits into a base32 string, so
+every prefix names a rectangular cell and nearby points share prefixes.
+Radius searches first select the few cells covering the circle's bounding
+box (plain indexed string range scans on any database), or the box itself
+when the circle is too large for cells, then refine the candidates with an
+exact haversine distance computed by the database in the same query.
+"""
+import math
+import numpy as np
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+# Finer cells mean tighter candidate sets but more range scans per query
+MAX_COVERING_CELLS = 16
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    value = bit_count = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[value])
+            value = bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """``(lat_degrees, lng_degrees)`` spanned by a cell of ``precision`` characters."""
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def _bbox_cells(south, west, north, east, precision):
+    # Stepping by exactly one cell size visits every cell the box overlaps
+    lat_step, lng_step = cell_size(precision)
+    cells = set()
+    lat = south
+    while True:
+        lng = west
+        while True:
+            cells.add(encode(lat, lng, precision))
+            if lng >= east:
+                break
+            lng = min(lng + lng_step, east)
+        if lat >= north:
+            break
+        lat = min(lat + lat_step, north)
+    return cells
+
+
+def bounding_boxes(latitude, longitude, radius_km):
+    """
+    ``(south, west, north, east)`` boxes covering every point within
+    ``radius_km``, split at the antimeridian, or ``None`` when the circle
+    touches a pole.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = latitude - dlat, latitude + dlat
+    if south <= -90 or north >= 90:
+        return None
+    dlng = dlat / math.cos(math.radians(max(abs(south), abs(north))))
+    if dlng >= 180:
+        return None
+
+    west, east = longitude - dlng, longitude + dlng
+    # Split boxes crossing the antimeridian
+    boxes = [(south, max(west, -180.0), north, min(east, 180.0))]
+    if west < -180:
+        boxes.append((south, west + 360, north, 180.0))
+    if east > 180:
+        boxes.append((south, -180.0, north, east - 360))
+    return boxes
+
+
+def covering_cells(latitude, longitude, radius_km, max_cells=MAX_COVERING_CELLS):
+    """
+    The finest set of at most ``max_cells`` geohash prefixes covering every
+    point within ``radius_km``, or ``None`` when the circle is too large
+    (or touches a pole) to be worth prefiltering.
+    """
+    boxes = bounding_boxes(latitude, longitude, radius_km)
+    if boxes is None:
+        return None
+
+    for precision in range(MAX_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        estimate = sum(
+            (math.ceil((n - s) / lat_step) + 1) * (math.ceil((e - w) / lng_step) + 1)
+            for s, w, n, e in boxes
+        )
+        if estimate <= max_cells:
+            cells = set()
+            for box in boxes:
+                cells |= _bbox_cells(*box, precision)
+            return sorted(cells)
+    return None
+
+
+def prefix_range(prefix):
+    """``(low, high)`` bounds of the geohashes starting with ``prefix``; ``high`` may be ``None``."""
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return prefix, None
+    return prefix, stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+
+
+def cells_q(field, cells):
+    """``Q`` matching rows whose ``field`` geohash lies in any of ``cells``, as index range scans."""
+    condition = Q()
+    for cell in cells:
+        low, high = prefix_range(cell)
+        cell_q = Q(**{f'{field}__gte': low})
+        if high is not None:
+            cell_q &= Q(**{f'{field}__lt': high})
+        condition |= cell_q
+    return condition
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_array(latitude, longitude, latitudes, longitudes):
+    """Distances from one point to arrays of points, in a single vectorized pass."""
+    lat1, lng1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    lng2 = np.radians(np.asarray(longitudes, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def nearby_q(latitude, longitude, radius_km, prefix=''):
+    """
+    ``Q`` narrowing rows with ``latitude``, ``longitude`` and ``geohash``
+    fields under ``prefix`` to candidates around the circle: the covering
+    geohash cells, or its bounding boxes when they would be too many.
+    """
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells is not None:
+        return cells_q(f'{prefix}geohash', cells)
+    boxes = bounding_boxes(latitude, longitude, radius_km)
+    if boxes is None:
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        return Q(**{f'{prefix}latitude__range': (max(latitude - dlat, -90.0), min(latitude + dlat, 90.0))})
+    condition = Q()
+    for south, west, north, east in boxes:
+        condition |= Q(**{f'{prefix}latitude__range': (south, north), f'{prefix}longitude__range': (west, east)})
+    return condition
+
+
+def distance_km(latitude, longitude, prefix=''):
+    """Haversine distance from the point to the ``latitude``/``longitude`` fields under ``prefix``, as a SQL expression."""
+    lat1 = math.radians(latitude)
+    lat2, lng2 = Radians(F(f'{prefix}latitude')), Radians(F(f'{prefix}longitude'))
+    a = (
+        Power(Sin((lat2 - Value(lat1)) / Value(2.0)), Value(2.0))
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(math.radians(longitude))) / Value(2.0)), Value(2.0))
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Value(1.0), Sqrt(a)), output_field=FloatField())
@@ -0,0 +1,160 @@
+"""
+Geofences: circles and polygons around a site, tested against GPS points.
+
+Every fence has a latitude/longitude bounding box. Points are tested against
+the boxes first, which rejects almost every point away from a fence with
+four comparisons. Only the remaining candidates get the exact test: a
+haversine distance for circles, an even-odd ray cast for polygons. Both are
+NumPy array operations over all the candidates at once. A batch of pings
+therefore costs a few vectorized passes per fence, not a Python loop per
+ping.
+
+Polygons are tested in plain latitude/longitude. That is accurate for
+site-sized fences away from the poles and the antimeridian.
+"""
+import math
+import numpy as np
+from .geo import EARTH_RADIUS_KM, haversine_km_array
+
+
+class GeofenceError(ValueError):
+    pass
+
+
+def _check_point(latitude, longitude):
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise GeofenceError(f'({latitude}, {longitude}) is not a valid latitude and longitude.')
+
+
+def coordinates(points):
+    """
+    ``(latitudes, longitudes)`` float arrays of ``points``, a sequence of
+    ``[latitude, longitude]`` pairs. Raises ``GeofenceError`` if they are not valid.
+    """
+    try:
+        array = np.asarray(points, dtype=float)
+    except (TypeError, ValueError):
+        raise GeofenceError('Points must be [latitude, longitude] pairs of numbers.')
+    if array.ndim != 2 or array.shape[1] != 2:
+        raise GeofenceError('Points must be [latitude, longitude] pairs of numbers.')
+    latitudes, longitudes = array[:, 0], array[:, 1]
+    valid = (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+    if not valid.all():
+        index = int(np.flatnonzero(~valid)[0])
+        raise GeofenceError(f'Point {index} is not a valid latitude and longitude.')
+    return latitudes, longitudes
+
+
+def _arrays(latitudes, longitudes):
+    latitudes = np.asarray(latitudes, dtype=float).reshape(-1)
+    longitudes = np.asarray(longitudes, dtype=float).reshape(-1)
+    if latitudes.shape != longitudes.shape:
+        raise GeofenceError('As many latitudes as longitudes are needed.')
+    return latitudes, longitudes
+
+
+def _in_box(box, latitudes, longitudes):
+    south, west, north, east = box
+    return (latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east)
+
+
+class Fence:
+    """A fence; subclasses set ``bbox`` (south, west, north, east) and the exact ``_contains``."""
+    bbox = None
+
+    def _contains(self, latitudes, longitudes):
+        raise NotImplementedError
+
+    def contains(self, latitudes, longitudes):
+        """Boolean array: which of the points are inside the fence."""
+        latitudes, longitudes = _arrays(latitudes, longitudes)
+        inside = _in_box(self.bbox, latitudes, longitudes)
+        candidates = np.flatnonzero(inside)
+        if len(candidates):
+            inside[candidates] = self._contains(latitudes[candidates], longitudes[candidates])
+        return inside
+
+
+class CircleFence(Fence):
+    def __init__(self, latitude, longitude, radius_meters):
+        if latitude is None or longitude is None or radius_meters is None:
+            raise GeofenceError('A circle needs a latitude, a longitude and a radius.')
+        latitude, longitude, radius_meters = float(latitude), float(longitude), float(radius_meters)
+        _check_point(latitude, longitude)
+        if not radius_meters > 0:
+            raise GeofenceError('The radius must be positive.')
+        self.latitude, self.longitude, self.radius_meters = latitude, longitude, radius_meters
+
+        dlat = math.degrees(radius_meters / 1000 / EARTH_RADIUS_KM)
+        south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+        widest = max(abs(south), abs(north))
+        dlng = 180.0 if widest >= 90 else dlat / math.cos(math.radians(widest))
+        west, east = longitude - dlng, longitude + dlng
+        if west < -180 or east > 180:
+            # Crosses the antimeridian: only the latitudes narrow it down
+            west, east = -180.0, 180.0
+        self.bbox = (south, west, north, east)
+
+    def _contains(self, latitudes, longitudes):
+        distances = haversine_km_array(self.latitude, self.longitude, latitudes, longitudes)
+        return distances * 1000 <= self.radius_meters
+
+
+class PolygonFence(Fence):
+    def __init__(self, vertices):
+        """``vertices``: the ``[latitude, longitude]`` corners of the polygon, in order."""
+        try:
+            latitudes, longitudes = coordinates(vertices)
+        except GeofenceError as e:
+            raise GeofenceError(f'Invalid polygon: {e}')
+        if len(latitudes) > 1 and latitudes[0] == latitudes[-1] and longitudes[0] == longitudes[-1]:
+            latitudes, longitudes = latitudes[:-1], longitudes[:-1]
+        if len(latitudes) < 3:
+            raise GeofenceError('A polygon needs at least three vertices.')
+        self.latitudes, self.longitudes = latitudes, longitudes
+        self.bbox = (latitudes.min(), longitudes.min(), latitudes.max(), longitudes.max())
+
+    def _contains(self, latitudes, longitudes):
+        inside = np.zeros(len(latitudes), dtype=bool)
+        lat_j, lng_j = self.latitudes[-1], self.longitudes[-1]
+        # A point is inside when a ray from it crosses the edges an odd number of times
+        for lat_i, lng_i in zip(self.latitudes, self.longitudes):
+            crosses = (lat_i > latitudes) != (lat_j > latitudes)
+            if lat_i != lat_j:
+                at = (lng_j - lng_i) * (latitudes - lat_i) / (lat_j - lat_i) + lng_i
+                inside ^= crosses & (longitudes < at)
+            lat_j, lng_j = lat_i, lng_i
+        return inside
+
+
+class FenceSet:
+    """The union of ``fences``: a point is allowed when any of them contains it."""
+
+    def __init__(self, fences):
+        self.fences = list(fences)
+        boxes = np.array([fence.bbox for fence in self.fences], dtype=float).reshape(-1, 4)
+        self.bbox = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max()) if len(boxes) else None
+
+    def __len__(self):
+        return len(self.fences)
+
+    def contains(self, latitudes, longitudes):
+        """Boolean array: which of the points are inside at least one fence."""
+        latitudes, longitudes = _arrays(latitudes, longitudes)
+        inside = np.zeros(len(latitudes), dtype=bool)
+        if not self.fences:
+            return inside
+        # The box around every fence turns away points far from the site in one pass
+        candidates = np.flatnonzero(_in_box(self.bbox, latitudes, longitudes))
+        for fence in self.fences:
+            if not len(candidates):
+                break
+            hit = fence.contains(latitudes[candidates], longitudes[candidates])
+            inside[candidates[hit]] = True
+            # Points inside one fence need no other
+            candidates = candidates[~hit]
+        return inside
+
+    def contains_point(self, latitude, longitude):
+        _check_point(latitude, longitude)
+        return bool(self.contains([latitude], [longitude])[0])
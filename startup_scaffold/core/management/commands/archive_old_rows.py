@@ -0,0 +1,62 @@
+from datetime import date, datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core import archive
+
+
+class Command(BaseCommand):
+    help = 'Move old rows to compressed files in the archive storage, verify them, then delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help='app_label.Model to archive; repeatable (default: every model in ARCHIVE_MODELS)'
+        )
+        parser.add_argument(
+            '--before',
+            help='Archive rows older than this ISO date (default: ARCHIVE_RETENTION_DAYS ago)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=archive.DEFAULT_CHUNK_SIZE,
+            help=f'Rows read and deleted per query (default: {archive.DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--rows-per-file',
+            type=int,
+            default=archive.DEFAULT_ROWS_PER_FILE,
+            help=f'Rows per archive file (default: {archive.DEFAULT_ROWS_PER_FILE})'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Write and verify the archive files but keep the rows in the database'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['models'] or list(archive.archived_models())
+        unknown = set(labels) - set(archive.archived_models())
+        if unknown:
+            raise CommandError(f"Not in ARCHIVE_MODELS: {', '.join(sorted(unknown))}")
+
+        before = None
+        if options['before']:
+            try:
+                before = timezone.make_aware(datetime.combine(date.fromisoformat(options['before']), time.min))
+            except ValueError:
+                raise CommandError('--before must be an ISO date.')
+
+        for label in labels:
+            batches = archive.archive_model(
+                label,
+                before,
+                chunk_size=options['chunk_size'],
+                rows_per_file=options['rows_per_file'],
+                delete=not options['keep'],
+            )
+            rows = sum(batch.row_count for batch in batches)
+            action = 'archived' if options['keep'] else 'archived and deleted'
+            self.stdout.write(self.style.SUCCESS(f'{label}: {rows} rows {action} in {len(batches)} files'))
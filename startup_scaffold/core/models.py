@@ -40,3 +40,55 @@ class SoftDeleteModel(models.Model):
 
     class Meta:
         abstract = True
+
+class DerivedFieldsModel(models.Model):
+    """
+    An abstract base class model for columns maintained outside of save(),
+    listed in 'derived_fields'. A full save of an existing row leaves those
+    columns out of its UPDATE so a stale in-memory copy never overwrites
+    them; an explicit 'update_fields' still writes whatever it names.
+    """
+    derived_fields = ()
+    _skip_derived_fields = False
+
+    def save(self, *args, **kwargs):
+        self._skip_derived_fields = kwargs.get('update_fields') is None
+        super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # Only the UPDATE is narrowed: deferred fields stay unloaded and a
+        # row deleted in the meantime is inserted again as usual
+        if self._skip_derived_fields:
+            values = [value for value in values if value[0].name not in self.derived_fields]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    class Meta:
+        abstract = True
+
+class ArchiveBatch(models.Model):
+    """
+    One gzipped CSV file of rows moved out of the database into the archive
+    storage, with what is needed to verify it: row count and SHA-256.
+    """
+    class Status(models.TextChoices):
+        WRITTEN = 'written', 'Written'
+        VERIFIED = 'verified', 'Verified'
+        PURGED = 'purged', 'Purged'
+
+    model = models.CharField(max_length=100, db_index=True)  # app_label.ModelName
+    file = models.CharField(max_length=255, unique=True)  # name in the archive storage
+    columns = models.JSONField()
+    cutoff = models.DateTimeField()
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    row_count = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.WRITTEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    purged_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.model} archive {self.file} ({self.row_count} rows)"
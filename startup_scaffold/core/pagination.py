@@ -0,0 +1,220 @@
+import base64
+import datetime
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .utils import PAGINATION_DEFAULTS
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds datetimes to milliseconds, which would make
+    # rows within the same millisecond as the cursor skip or repeat
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (seek) pagination, the project-wide default.
+
+    Rows are ordered by ``ordering``, whose last field must be unique. The
+    cursor carries the ordering values of the last row on the page, so every
+    page is fetched with a ``WHERE (a, b) < (x, y) LIMIT n`` style range scan
+    and no ``COUNT`` or ``OFFSET``: deep pages cost the same as the first one.
+
+    The ordering is, in turn: the view's ``keyset_ordering`` attribute, the
+    queryset's own ``order_by`` (or its model's ``Meta.ordering``) with the
+    primary key appended as a tiebreak, newest first on
+    ``(created_at, id)``, or the primary key for models without
+    ``created_at``. Views may lower the page size cap with a
+    ``max_page_size`` attribute.
+
+    Nullable ordering fields sort their NULLs last in either direction on
+    every database, and the seek filter treats NULL as past every value, so
+    a page ending on a NULL still has a next page.
+    """
+    ordering = None
+    default_ordering = ('-created_at', '-id')
+    fallback_ordering = ('-pk',)
+    page_size = PAGINATION_DEFAULTS['PAGE_SIZE']
+    max_page_size = PAGINATION_DEFAULTS['MAX_PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset, view)
+        self.page_size = self.get_page_size(request, view)
+        self.nullable = [self.is_nullable(queryset, field.lstrip('-')) for field in self.ordering]
+
+        queryset = queryset.order_by(*self.order_by())
+        cursor = self.decode_cursor(request, queryset)
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(cursor))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, queryset, view):
+        if self.ordering is not None:
+            return self.ordering
+        ordering = getattr(view, 'keyset_ordering', None)
+        if ordering is not None:
+            return ordering
+        ordering = self.get_queryset_ordering(queryset)
+        if ordering is not None:
+            return ordering
+        try:
+            queryset.model._meta.get_field('created_at')
+        except FieldDoesNotExist:
+            return self.fallback_ordering
+        return self.default_ordering
+
+    def get_queryset_ordering(self, queryset):
+        """
+        The ordering ``queryset`` asks for, ending with the primary key so
+        it is unique; ``None`` when it has none or orders by expressions.
+        """
+        query = queryset.query
+        ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) and field != '?' for field in ordering):
+            return None
+        ordering = tuple(ordering)
+        pk_names = ('pk', queryset.model._meta.pk.name)
+        if not any(field.lstrip('-') in pk_names for field in ordering):
+            ordering += ('-pk' if ordering[-1].startswith('-') else 'pk',)
+        return ordering
+
+    def order_by(self):
+        """``ordering`` as ``order_by()`` arguments, with NULLs last for nullable fields."""
+        return [
+            (F(field[1:]).desc(nulls_last=True) if field.startswith('-') else F(field).asc(nulls_last=True))
+            if nullable else field
+            for field, nullable in zip(self.ordering, self.nullable)
+        ]
+
+    def get_max_page_size(self, view):
+        return min(self.max_page_size, getattr(view, 'max_page_size', None) or self.max_page_size)
+
+    def get_page_size(self, request, view=None):
+        max_page_size = self.get_max_page_size(view)
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            page_size = self.page_size
+        if page_size <= 0:
+            page_size = self.page_size
+        return min(page_size, max_page_size)
+
+    def seek_filter(self, cursor):
+        """Rows strictly after ``cursor`` in ``ordering`` order."""
+        condition = Q()
+        equal = Q()
+        for field, nullable, value in zip(self.ordering, self.nullable, cursor):
+            name = field.lstrip('-')
+            if value is None:
+                # NULLs sort last: no value comes after one
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if nullable:
+                after |= Q(**{f'{name}__isnull': True})
+            condition |= equal & after
+            equal &= Q(**{name: value})
+        return condition
+
+    def position(self, instance):
+        values = []
+        for field in self.ordering:
+            value = instance
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, values):
+        payload = json.dumps(values, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def ordering_field(self, queryset, name):
+        """The model field or annotation output field ``name`` orders ``queryset`` on."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        opts = queryset.model._meta
+        for part in name.split('__'):
+            field = opts.pk if part == 'pk' else opts.get_field(part)
+            if field.is_relation:
+                opts = field.related_model._meta
+                field = field.target_field
+        return field
+
+    def is_nullable(self, queryset, name):
+        """Whether the ordering field ``name`` of ``queryset`` can be NULL, e.g. through a nullable relation."""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field.null
+        opts = queryset.model._meta
+        for part in name.split('__'):
+            field = opts.pk if part == 'pk' else opts.get_field(part)
+            if field.null:
+                return True
+            if field.is_relation:
+                opts = field.related_model._meta
+        return False
+
+    def decode_cursor(self, request, queryset):
+        """
+        The ordering values of the cursor in ``request``, converted by their
+        fields, so a tampered cursor is a 404 rather than a failing query.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [
+                self.ordering_field(queryset, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None and not nullable for value, nullable in zip(values, self.nullable)):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.position(self.page[-1])))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
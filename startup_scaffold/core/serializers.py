@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .models import ArchiveBatch
 
 class TimeStampedSerializer(serializers.Serializer):
     created_at = serializers.DateTimeField(read_only=True)
@@ -21,3 +22,12 @@ class DynamicFieldsMixin(serializers.Serializer):
             existing = set(self.fields)
             for field_name in existing - allowed:
                 self.fields.pop(field_name)
+
+class ArchiveBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchiveBatch
+        fields = (
+            'id', 'model', 'file', 'columns', 'cutoff', 'first_timestamp', 'last_timestamp',
+            'row_count', 'sha256', 'status', 'created_at', 'purged_at',
+        )
+
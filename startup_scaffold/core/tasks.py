@@ -0,0 +1,8 @@
+from celery import shared_task
+from .archive import archive_all
+
+
+@shared_task
+def archive_old_rows():
+    """Move rows older than ARCHIVE_RETENTION_DAYS to the archive storage"""
+    return archive_all()
@@ -6,6 +6,24 @@ from django.contrib.auth import get_user_model
 from django.db import connection
 from .views import HealthCheckView
 from .response import BaseAPIViewResponse
+from . import archive, bitsets, geo, geofence
+from .models import ArchiveBatch
+from .pagination import KeysetPagination
+from notifications.models import Notification
+from jobs.models import Location
+from django.utils import timezone
+from django.test import override_settings
+from django.core.management import call_command
+from datetime import timedelta
+from attendance.models import Attendance
+from io import StringIO
+import base64
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import numpy as np
 
 User = get_user_model()
 
@@ -129,9 +147,275 @@ class CoreUtilsTests(TestCase):
         # This would depend on what utilities are implemented
         pass
 
+    def test_month_boundaries(self):
+        from datetime import date
+        from .utils import month_start, next_month
+        self.assertEqual(month_start(date(2026, 2, 17)), date(2026, 2, 1))
+        self.assertEqual(next_month(date(2026, 1, 31)), date(2026, 2, 1))
+        self.assertEqual(next_month(date(2026, 12, 15)), date(2027, 1, 1))
+
 class CoreValidatorsTests(TestCase):
     def test_core_validators(self):
         """Test core validators"""
         # Add tests for validators in core/validators.py
         # This would depend on what validators are implemented
         pass
+
+class BitsetTests(TestCase):
+    def test_pack_roundtrip(self):
+        """Test bitsets survive packing into bytes"""
+        bits = bitsets.from_ordinals([0, 3, 64, 200])
+        self.assertEqual(bitsets.unpack(bitsets.pack(bits)), bits)
+        self.assertEqual(bitsets.unpack(b''), 0)
+        self.assertEqual(list(bitsets.ordinals(bits)), [0, 3, 64, 200])
+
+    def test_overlap_is_intersection_size(self):
+        """Test overlap counts shared members"""
+        self.assertEqual(bitsets.overlap(bitsets.from_ordinals([1, 2, 70]), bitsets.from_ordinals([2, 70, 71])), 2)
+        self.assertEqual(bitsets.overlap(0, bitsets.from_ordinals([5])), 0)
+
+class GeoTests(TestCase):
+    def test_geohash_encode(self):
+        """Test geohash encoding matches the reference implementation"""
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(-25.382708, -49.265506, 6), '6gkzwg')
+
+    def test_haversine(self):
+        """Test scalar and vectorized distances agree"""
+        london_paris = geo.haversine_km(51.5074, -0.1278, 48.8566, 2.3522)
+        self.assertAlmostEqual(london_paris, 343.5, delta=1)
+        distances = geo.haversine_km_array(51.5074, -0.1278, [48.8566, 51.5074], [2.3522, -0.1278])
+        self.assertAlmostEqual(distances[0], london_paris, places=6)
+        self.assertAlmostEqual(distances[1], 0)
+
+    def test_covering_cells_contain_every_point_in_radius(self):
+        """Test the cell prefilter never drops points inside the circle"""
+        rng = random.Random(4)
+        for latitude, longitude, radius_km in [(6.5, 3.4, 5), (51.5, -0.1, 25), (0, 179.99, 40), (70, 20, 150)]:
+            cells = geo.covering_cells(latitude, longitude, radius_km)
+            self.assertIsNotNone(cells)
+            self.assertLessEqual(len(cells), geo.MAX_COVERING_CELLS)
+            for _ in range(300):
+                lat = latitude + rng.uniform(-2, 2)
+                lng = (longitude + rng.uniform(-5, 5) + 180) % 360 - 180
+                if geo.haversine_km(latitude, longitude, lat, lng) <= radius_km:
+                    geohash = geo.encode(lat, lng)
+                    self.assertTrue(any(geohash.startswith(cell) for cell in cells))
+
+    def test_prefix_range(self):
+        """Test prefix ranges carry past the last base32 digit"""
+        self.assertEqual(geo.prefix_range('s0'), ('s0', 's1'))
+        self.assertEqual(geo.prefix_range('bz'), ('bz', 'c'))
+        self.assertEqual(geo.prefix_range('zz'), ('zz', None))
+
+class GeofenceTests(TestCase):
+    # A square of about 1.1 km a side, with a notch cut out of its east side
+    SITE = [(6.52, 3.37), (6.52, 3.38), (6.524, 3.38), (6.524, 3.376), (6.526, 3.376), (6.526, 3.38), (6.53, 3.38), (6.53, 3.37)]
+
+    def test_circle_fence(self):
+        """Test circles contain the points within their radius"""
+        fence = geofence.CircleFence(51.5074, -0.1278, 500)
+        inside = fence.contains([51.5074, 51.5110, 51.5120, 48.8566], [-0.1278, -0.1278, -0.1278, 2.3522])
+        self.assertEqual(inside.tolist(), [True, True, False, False])
+        with self.assertRaises(geofence.GeofenceError):
+            geofence.CircleFence(51.5, -0.1, 0)
+
+    def test_polygon_fence(self):
+        """Test polygons follow their outline, notches included"""
+        fence = geofence.PolygonFence(self.SITE + [self.SITE[0]])
+        self.assertEqual(len(fence.latitudes), len(self.SITE))
+        inside = fence.contains([6.522, 6.525, 6.525, 6.528, 6.531], [3.378, 3.372, 3.378, 3.378, 3.375])
+        self.assertEqual(inside.tolist(), [True, True, False, True, False])
+        for vertices in ([(6.5, 3.3), (6.6, 3.4)], [(6.5, 3.3), (6.6, 'x'), (6.7, 3.3)], [(95, 3.3), (6.6, 3.4), (6.7, 3.3)]):
+            with self.assertRaises(geofence.GeofenceError):
+                geofence.PolygonFence(vertices)
+
+    def test_fence_set_matches_exact_tests(self):
+        """Test a set allows points inside any fence, with or without the box precheck"""
+        fences = geofence.FenceSet([geofence.PolygonFence(self.SITE), geofence.CircleFence(6.535, 3.375, 300)])
+        rng = np.random.default_rng(7)
+        latitudes, longitudes = rng.uniform(6.51, 6.545, 5000), rng.uniform(3.36, 3.39, 5000)
+        expected = np.zeros(5000, dtype=bool)
+        for fence in fences.fences:
+            expected |= fence._contains(latitudes, longitudes)
+        inside = fences.contains(latitudes, longitudes)
+        self.assertTrue(inside.any() and not inside.all())
+        self.assertEqual(inside.tolist(), expected.tolist())
+        self.assertTrue(fences.contains_point(6.535, 3.375))
+        self.assertFalse(geofence.FenceSet([]).contains_point(6.535, 3.375))
+
+    def test_coordinates(self):
+        """Test ping batches are checked before use"""
+        latitudes, longitudes = geofence.coordinates([[6.5, 3.3], [6.6, 3.4]])
+        self.assertEqual((latitudes.tolist(), longitudes.tolist()), ([6.5, 6.6], [3.3, 3.4]))
+        for points in ([[6.5, 3.3], [6.6]], [[6.5, 3.3, 1]], [[6.5, 'east']], [[6.5, 181]]):
+            with self.assertRaises(geofence.GeofenceError):
+                geofence.coordinates(points)
+
+    def test_benchmark_command(self):
+        """Test the geofence benchmark runs and agrees with itself"""
+        out, err = StringIO(), StringIO()
+        call_command('benchmark_geofences', '--pings', '2000', '--repeat', '1', stdout=out, stderr=err)
+        self.assertIn('pings/s', out.getvalue())
+        self.assertEqual(err.getvalue(), '')
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='pager@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('notification-list')
+
+    def create_notifications(self, count):
+        return Notification.objects.bulk_create(
+            [Notification(user=self.user, message=f'Message {index}') for index in range(count)]
+        )
+
+    def collect(self, params):
+        response = self.client.get(self.url, params)
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_pages_newest_first_without_gaps(self):
+        """Test walking the cursor visits every row once in (created_at, id) order"""
+        self.create_notifications(7)
+        expected = [str(pk) for pk in Notification.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        self.assertEqual(self.collect({'page_size': 3}), expected)
+
+    def test_rows_sharing_a_millisecond(self):
+        """Test cursors keep full timestamp precision"""
+        self.create_notifications(6)
+        stamp = timezone.now().replace(microsecond=123456)
+        ids = list(Notification.objects.values_list('id', flat=True))
+        Notification.objects.filter(id__in=ids[:3]).update(created_at=stamp)
+        Notification.objects.filter(id__in=ids[3:]).update(created_at=stamp.replace(microsecond=123400))
+        seen = self.collect({'page_size': 2})
+        self.assertEqual(sorted(seen), sorted(str(pk) for pk in ids))
+
+    def test_endpoint_page_size_cap(self):
+        """Test page sizes are capped per endpoint"""
+        self.create_notifications(60)
+        response = self.client.get(self.url, {'page_size': 500})
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a garbled cursor is rejected"""
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """Test a well-formed cursor holding values of the wrong type is rejected"""
+        for values in (['abc', 'x'], [None, None], [[1], {}]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keeps_queryset_ordering(self):
+        """Test an explicitly ordered queryset is paged in its own order, with the primary key as tiebreak"""
+        paginator = KeysetPagination()
+        self.assertEqual(paginator.get_ordering(Location.objects.order_by('-city'), None), ('-city', '-pk'))
+        self.assertEqual(paginator.get_ordering(Location.objects.order_by('city', 'id'), None), ('city', 'id'))
+        self.assertEqual(paginator.get_ordering(Location.objects.order_by('?'), None), ('-pk',))
+
+    def test_view_page_size_cap(self):
+        """Test views lower the page size cap with max_page_size"""
+        view = type('View', (), {'max_page_size': 30})()
+        self.assertEqual(KeysetPagination().get_max_page_size(view), 30)
+        self.assertEqual(KeysetPagination().get_max_page_size(None), KeysetPagination.max_page_size)
+
+    def test_pages_through_nulls_of_a_nullable_ordering(self):
+        """Test NULLs sort last either way and every next link can be followed"""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        locations = [Location.objects.create(city=f'City {index}', latitude=latitude) for index, latitude in enumerate((1, None, 2, None, 3))]
+        queryset = Location.objects.filter(pk__in=[location.pk for location in locations])
+
+        def walk(queryset):
+            seen, url = [], '/locations/?page_size=2'
+            while url:
+                paginator = KeysetPagination()
+                seen.extend(location.pk for location in paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url))))
+                url = paginator.get_next_link()
+            return seen
+
+        ascending = sorted(locations, key=lambda location: (location.latitude is None, location.latitude or 0, location.pk))
+        self.assertEqual(walk(queryset.order_by('latitude')), [location.pk for location in ascending])
+        descending = sorted(locations, key=lambda location: (location.latitude is None, -(location.latitude or 0), location.pk))
+        descending = [location.pk for location in descending[:3]] + sorted((location.pk for location in descending[3:]), reverse=True)
+        self.assertEqual(walk(queryset.order_by('-latitude')), descending)
+
+    def test_falls_back_to_primary_key(self):
+        """Test models without created_at are paged on the primary key"""
+        self.assertEqual(KeysetPagination().get_ordering(Location.objects.all(), None), ('-pk',))
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            'archive': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': location}},
+        }
+        override = override_settings(STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.admin = User.objects.create_user(email='admin@example.com', password='pass1234', is_staff=True)
+        self.now = timezone.now()
+        self.old = [
+            Attendance.objects.create(user=self.admin, check_in=self.now - timedelta(days=800, minutes=i))
+            for i in range(7)
+        ]
+        self.recent = Attendance.objects.create(user=self.admin, check_in=self.now - timedelta(days=1))
+
+    def test_archive_verifies_then_deletes_old_rows(self):
+        batches = archive.archive_model('attendance.Attendance', chunk_size=2, rows_per_file=4)
+
+        self.assertEqual([batch.row_count for batch in batches], [4, 3])
+        self.assertTrue(all(batch.status == ArchiveBatch.Status.PURGED for batch in batches))
+        self.assertEqual(list(Attendance.objects.values_list('pk', flat=True)), [self.recent.pk])
+
+        archived = {row[0] for batch in batches for row in archive.read_rows(batch)}
+        self.assertEqual(archived, {str(attendance.pk) for attendance in self.old})
+        check_out = batches[0].columns.index('check_out')
+        self.assertIsNone(next(archive.read_rows(batches[0]))[check_out])
+
+    def test_corrupt_file_is_not_purged(self):
+        batch = archive.archive_model('attendance.Attendance', delete=False)[0]
+        with archive.archive_storage().open(batch.file, 'wb') as stored:
+            stored.write(gzip.compress(b'id\n'))
+        with self.assertRaises(archive.ArchiveVerificationError):
+            archive.verify(batch)
+        self.assertEqual(Attendance.objects.count(), 8)
+
+    def test_command_and_read_back_api(self):
+        call_command('archive_old_rows', '--model', 'attendance.Attendance', stdout=StringIO())
+        self.assertEqual(Attendance.objects.count(), 1)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('archive-list'), {'model': 'attendance.Attendance'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        batch_id = response.data['results'][0]['id']
+
+        response = self.client.get(reverse('archive-rows', args=[batch_id]), {'offset': 5, 'limit': 10})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['user_id'], str(self.admin.pk))
+
+        response = self.client.get(reverse('archive-download', args=[batch_id]))
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 8)
+
+    def test_archive_api_is_admin_only(self):
+        worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.client.force_authenticate(worker)
+        self.assertEqual(self.client.get(reverse('archive-list')).status_code, status.HTTP_403_FORBIDDEN)
+
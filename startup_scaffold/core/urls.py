@@ -1,6 +1,11 @@
-from django.urls import path
-from .views import HealthCheckView
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+from .views import ArchiveBatchViewSet, HealthCheckView
+
+router = DefaultRouter()
+router.register(r'archives', ArchiveBatchViewSet, basename='archive')
 
 urlpatterns = [
     path('health/', HealthCheckView.as_view(), name='health-check'),
+    path('', include(router.urls)),
 ]
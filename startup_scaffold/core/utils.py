@@ -1,6 +1,7 @@
 import os
 import random
 import string
+from datetime import date
 from django.utils.text import slugify
 
 def upload_to_path(instance, filename, base_path='uploads'):
@@ -23,6 +24,18 @@ def slugify_string(value):
     """
     return slugify(value)
 
+def month_start(day):
+    """
+    First day of the month of a date.
+    """
+    return day.replace(day=1)
+
+def next_month(month):
+    """
+    First day of the month after the month of a date.
+    """
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
 PAGINATION_DEFAULTS = {
     'PAGE_SIZE': 20,
     'MAX_PAGE_SIZE': 100,
@@ -1,7 +1,18 @@
+from itertools import islice
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser
 from django.db import connection
+from django.http import FileResponse
+from . import archive
+from .models import ArchiveBatch
+from .serializers import ArchiveBatchSerializer
+
+# Most rows one ?limit= read-back of an archive file returns
+MAX_ARCHIVE_ROWS = 1000
 
 class HealthCheckView(APIView):
     """
@@ -19,3 +30,46 @@ class HealthCheckView(APIView):
             return Response({"status": "ok", "message": "Healthy"}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"status": "error", "message": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+class ArchiveBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Archived row files, for historical exports. ``?model=`` filters by
+    ``app_label.Model``; ``rows`` reads a file back as JSON, ``download``
+    returns it as stored (gzipped CSV).
+    """
+    serializer_class = ArchiveBatchSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = ArchiveBatch.objects.all()
+        model = self.request.query_params.get('model')
+        if model:
+            queryset = queryset.filter(model=model)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def rows(self, request, pk=None):
+        """``?offset=&limit=`` rows of the file as objects keyed by column"""
+        batch = self.get_object()
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), MAX_ARCHIVE_ROWS)
+        except ValueError:
+            raise ValidationError({'detail': 'offset and limit must be integers.'})
+        rows = islice(archive.read_rows(batch), offset, offset + limit)
+        return Response({
+            'columns': batch.columns,
+            'offset': offset,
+            'results': [dict(zip(batch.columns, row)) for row in rows],
+        })
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        batch = self.get_object()
+        return FileResponse(
+            archive.archive_storage().open(batch.file, 'rb'),
+            as_attachment=True,
+            filename=batch.file.rsplit('/', 1)[-1],
+            content_type='application/gzip',
+        )
+
@@ -0,0 +1,77 @@
+"""
+Hiring workers for jobs.
+
+``Job.hired_count`` is only ever changed here (and when a hired application
+is deleted), with a conditional ``UPDATE ... WHERE hired_count <= max_workers - n``.
+The database applies that check and the increment atomically, so concurrent
+hire requests can never push a job past ``max_workers``. The job row does not
+need to be locked first, on any backend.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from rest_framework import status
+from core.exceptions import CustomAPIException
+from .models import Job, JobApplication
+
+
+class HiringError(CustomAPIException):
+    default_detail = 'Unable to hire for this job.'
+    default_code = 'hiring_error'
+
+
+class ApplicationNotFound(HiringError):
+    status_code = status.HTTP_404_NOT_FOUND
+    default_detail = 'Application not found.'
+    default_code = 'application_not_found'
+
+
+def hire_workers(job, worker_ids):
+    """
+    Hire the applicants ``worker_ids`` for ``job`` all at once: either every
+    worker is hired or none is. The job moves to in progress when it is full.
+    Returns the hired applications.
+    """
+    worker_ids = set(worker_ids)
+    if not worker_ids:
+        raise HiringError('worker_ids is required.')
+
+    with transaction.atomic():
+        applications = list(
+            JobApplication.objects.filter(job=job, worker_id__in=worker_ids).select_related('worker')
+        )
+        if len(applications) != len(worker_ids):
+            raise ApplicationNotFound()
+        if any(application.is_hired for application in applications):
+            raise HiringError('Worker already hired for this job.')
+
+        count = len(applications)
+        updated = Job.objects.filter(
+            pk=job.pk,
+            status=Job.Status.OPEN,
+            hired_count__lte=F('max_workers') - count,
+        ).update(
+            hired_count=F('hired_count') + count,
+            status=Case(
+                When(hired_count__gte=F('max_workers') - count, then=Value(Job.Status.IN_PROGRESS)),
+                default=F('status'),
+            ),
+        )
+        if not updated:
+            raise HiringError('Maximum number of workers already hired for this job.')
+
+        # Guards against a concurrent request hiring the same applicant
+        hired = JobApplication.objects.filter(
+            pk__in=[application.pk for application in applications], is_hired=False,
+        ).update(is_hired=True)
+        if hired != count:
+            raise HiringError('Worker already hired for this job.')
+
+        job.refresh_from_db(fields=['hired_count', 'status'])
+        if job.status != Job.Status.OPEN:
+            # Queryset updates send no post_save, so closed jobs leave recommendations here
+            from .recommendations import schedule_refresh
+            schedule_refresh(job_ids=[job.pk])
+
+    for application in applications:
+        application.is_hired = True
+    return applications
@@ -0,0 +1,67 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from core import bitsets
+from jobs.models import Job
+from jobs.recommendations import RecommendationEngine
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare M2M join matching with skill bitset matching on the current database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=200,
+            help='Number of workers to match (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        workers = list(
+            User.objects.exclude(skill_bits=b'').order_by('pk').values_list('id', 'skill_bits')[:options['workers']]
+        )
+        if not workers:
+            self.stdout.write(self.style.WARNING('No workers with skills to benchmark.'))
+            return
+
+        started = time.perf_counter()
+        orm_results = {}
+        for worker_id, _ in workers:
+            worker = User(pk=worker_id)
+            orm_results[worker_id] = dict(
+                Job.objects.filter(
+                    required_skills__in=worker.skills.all(),
+                    status=Job.Status.OPEN,
+                ).annotate(overlap=Count('required_skills')).values_list('id', 'overlap')
+            )
+        orm_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        engine = RecommendationEngine().load()
+        load_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        bitset_results = {}
+        for worker_id, skill_bits in workers:
+            bits = bitsets.unpack(skill_bits)
+            bitset_results[worker_id] = {
+                job_id: bitsets.overlap(bits, engine.jobs[job_id][0])
+                for job_id in engine.match(bits)
+            }
+        match_elapsed = time.perf_counter() - started
+
+        count = len(workers)
+        self.stdout.write(f'Workers matched: {count}, open jobs indexed: {len(engine.jobs)}')
+        self.stdout.write(f'ORM joins:   {orm_elapsed:.3f}s ({orm_elapsed / count * 1000:.2f} ms/worker)')
+        self.stdout.write(
+            f'Bitsets:     {match_elapsed:.3f}s ({match_elapsed / count * 1000:.2f} ms/worker) '
+            f'+ {load_elapsed:.3f}s one-off index load'
+        )
+        if orm_results == bitset_results:
+            self.stdout.write(self.style.SUCCESS('Both paths returned identical matches and overlaps.'))
+        else:
+            self.stdout.write(self.style.ERROR('Match results differ between the ORM and bitset paths.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from jobs import search
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Recreate the full-text job search index from scratch'
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text search backend.'))
+            return
+
+        with transaction.atomic():
+            search.drop_index()
+            search.create_index()
+            search.index_jobs(Job.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Job.objects.count()} jobs.'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from jobs.recommendations import RecommendationEngine, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Rebuild job recommendations for all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Number of workers matched per batch (default: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        engine = RecommendationEngine(chunk_size=options['chunk_size'])
+        stats = engine.run(progress=self.report_progress)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {stats['workers']} workers: {stats['created']} recommendations created, "
+                f"{stats['updated']} rescored, {stats['deleted']} removed in {stats['elapsed']:.2f}s"
+            )
+        )
+
+    def report_progress(self, stats):
+        rate = stats['workers'] / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(
+            f"Chunk {stats['chunks']}: {stats['workers']} workers "
+            f"(+{stats['created']} / ~{stats['updated']} / -{stats['deleted']}, {rate:.0f} workers/s)"
+        )
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_name_job_worker'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobrecommendation',
+            name='score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='jobrecommendation',
+            index=models.Index(fields=['worker', '-score', 'id'], name='jobs_rec_worker_score_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:10
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from jobs import search
+
+    search.create_index(schema_editor.connection)
+    search.index_jobs(apps.get_model('jobs', 'Job').objects.all(), schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from jobs import search
+
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_job_skill_bits'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
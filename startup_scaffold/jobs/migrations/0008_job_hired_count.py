@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:10
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_hired_applications(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    JobApplication = apps.get_model('jobs', 'JobApplication')
+    hired = JobApplication.objects.filter(job=models.OuterRef('pk'), is_hired=True).order_by().values('job')
+    Job.objects.update(
+        hired_count=Coalesce(
+            models.Subquery(hired.annotate(count=models.Count('pk')).values('count')), 0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='hired_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_hired_applications, migrations.RunPython.noop),
+    ]
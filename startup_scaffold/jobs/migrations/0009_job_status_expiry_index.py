@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_job_hired_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'expiry_date'], name='jobs_job_status_expiry_idx'),
+        ),
+    ]
@@ -4,17 +4,43 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from services.models import Skill
+from core.models import DerivedFieldsModel
+from core import geo
 
 class Location(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100, blank=True, null=True)
     country = models.CharField(max_length=100)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Full precision geohash of the coordinates; radius searches scan its prefixes
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.city}, {self.country}"
 
-class Job(models.Model):
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+class JobQuerySet(models.QuerySet):
+    def for_serialization(self):
+        """Everything JobSerializer reads, fetched up front: constant queries per page."""
+        return self.select_related('location').prefetch_related('required_skills')
+
+    def visible_to(self, user):
+        if user.is_staff:
+            return self
+        return self.filter(models.Q(client=user) | models.Q(status=Job.Status.OPEN))
+
+class Job(DerivedFieldsModel):
     class Status(models.TextChoices):
         OPEN = 'open', 'Open'
         IN_PROGRESS = 'in_progress', 'In Progress'
@@ -28,18 +54,49 @@ class Job(models.Model):
     name = models.CharField(max_length=255, null=True, blank=True)  # For backward compatibility with tests
     description = models.TextField(blank=True, null=True)
     required_skills = models.ManyToManyField(Skill, blank=True)
+    # Packed bitset of required skill ordinals, kept in sync by jobs.skill_bits
+    skill_bits = models.BinaryField(default=b'', editable=False)
     location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True)
     budget = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     shift = models.ForeignKey('shifts.Shift', on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_job')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
     max_workers = models.PositiveIntegerField(default=1)
+    # Number of hired applications, maintained by jobs.hiring
+    hired_count = models.PositiveIntegerField(default=0, editable=False)
     expiry_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = JobQuerySet.as_manager()
+
+    derived_fields = ('skill_bits', 'hired_count')
+    # Columns jobs.recommendations scores on; skill_bits is synced by m2m_changed
+    scoring_fields = ('status', 'location_id', 'budget')
+    _loaded_status = None
+    _loaded_scoring = None
+
+    class Meta:
+        indexes = [
+            # Expiry sweep: open jobs past their expiry date
+            models.Index(fields=['status', 'expiry_date'], name='jobs_job_status_expiry_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as stored, so post_save can tell status transitions apart
+        instance._loaded_status = instance.__dict__.get('status')
+        # Scoring inputs as stored, so post_save only refreshes recommendations they feed
+        instance._loaded_scoring = instance.scoring_inputs()
+        return instance
+
+    def scoring_inputs(self):
+        # Read from __dict__ so deferred fields are not fetched
+        return tuple(self.__dict__.get(field) for field in self.scoring_fields)
+
     def clean(self):
         if self.budget is not None and self.budget <= 0:
             raise ValidationError("Budget must be greater than 0.")
@@ -67,33 +124,151 @@ class JobRecommendation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     worker = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='job_recommendations')
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='recommended_to')
+    score = models.FloatField(default=0.0)
     recommended_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves the ranked per-worker feed as a single range scan
+            models.Index(fields=['worker', '-score', 'id'], name='jobs_rec_worker_score_idx'),
+        ]
+
     def __str__(self):
         return f"Recommendation of {self.job.title} to {self.worker.email}"
 
 # Signal to trigger rating creation when job is completed
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
-from ratings.models import Review
 
 @receiver(post_save, sender=Job)
-def create_ratings_on_job_completion(sender, instance, **kwargs):
-    if instance.status == Job.Status.COMPLETED:
-        # Create rating placeholders for client and hired workers
-        hired_applications = instance.applications.filter(is_hired=True)
-        for application in hired_applications:
-            # Create rating from client to worker
-            Review.objects.get_or_create(
-                rater=instance.client,
-                ratee=application.worker,
-                job=instance,
-                defaults={'rating': None, 'comment': ''}
-            )
-            # Create rating from worker to client
-            Review.objects.get_or_create(
-                rater=application.worker,
-                ratee=instance.client,
-                job=instance,
-                defaults={'rating': None, 'comment': ''}
-            )
+def create_ratings_on_job_completion(sender, instance, created, **kwargs):
+    # Only on the transition into completed, not on every later save; a
+    # deferred status was not changed by this save and is not loaded for it
+    status = instance.__dict__.get('status')
+    completed = status == Job.Status.COMPLETED and (created or instance._loaded_status != Job.Status.COMPLETED)
+    instance._loaded_status = status
+    if completed:
+        from .tasks import create_review_placeholders
+        job_id, client_id = str(instance.pk), str(instance.client_id)
+        transaction.on_commit(lambda: create_review_placeholders.delay(job_id, client_id))
+
+# Keep skill bitsets and job recommendations in sync with job and skill changes.
+# Deleting a job cascades to its recommendations, so only saves need a refresh.
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_delete, post_delete
+from .signals import jobs_expired
+
+SKILL_M2M_ACTIONS = ('post_add', 'post_remove', 'post_clear')
+
+def _changed_m2m_ids(sender, instance, action, reverse, pk_set, column):
+    """Ids of the jobs or users whose skills changed in an m2m_changed event."""
+    if not reverse:
+        return [instance.pk]
+    cleared = instance.__dict__.setdefault('_cleared_m2m_ids', {})
+    if action == 'pre_clear':
+        # Reverse clear from the Skill side: remember the members before they go
+        cleared[sender] = list(sender.objects.filter(skill_id=instance.pk).values_list(column, flat=True))
+        return []
+    if action == 'post_clear':
+        return cleared.pop(sender, [])
+    return list(pk_set)
+
+def sync_job_skills(job_ids, instance=None):
+    from .skill_bits import refresh_job_bits
+    from .recommendations import schedule_refresh
+    from .search import schedule_index
+    if job_ids:
+        refresh_job_bits(job_ids, instance)
+        schedule_refresh(job_ids=job_ids)
+        schedule_index(job_ids)
+
+def sync_worker_skills(worker_ids, instance=None):
+    from .skill_bits import refresh_worker_bits
+    from .recommendations import schedule_refresh
+    if worker_ids:
+        refresh_worker_bits(worker_ids, instance)
+        schedule_refresh(worker_ids=worker_ids)
+
+@receiver(post_save, sender=Job)
+def refresh_recommendations_on_job_save(sender, instance, created, **kwargs):
+    # Saves touching nothing the scores read, e.g. a title edit, leave them alone
+    scoring = instance.scoring_inputs()
+    changed = created or scoring != instance._loaded_scoring
+    instance._loaded_scoring = scoring
+    if changed:
+        from .recommendations import schedule_refresh
+        schedule_refresh(job_ids=[instance.pk])
+
+@receiver(jobs_expired)
+def drop_recommendations_of_expired_jobs(sender, job_ids, **kwargs):
+    JobRecommendation.objects.filter(job_id__in=job_ids).delete()
+
+@receiver(post_save, sender=JobApplication)
+def drop_recommendation_on_application(sender, instance, created, **kwargs):
+    if created:
+        JobRecommendation.objects.filter(worker_id=instance.worker_id, job_id=instance.job_id).delete()
+
+@receiver(post_delete, sender=JobApplication)
+def release_hired_slot(sender, instance, **kwargs):
+    if instance.is_hired:
+        Job.objects.filter(pk=instance.job_id, hired_count__gt=0).update(hired_count=models.F('hired_count') - 1)
+
+@receiver(m2m_changed, sender=Job.required_skills.through)
+def job_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' or action in SKILL_M2M_ACTIONS:
+        job_ids = _changed_m2m_ids(sender, instance, action, reverse, pk_set, 'job_id')
+        if action in SKILL_M2M_ACTIONS:
+            sync_job_skills(job_ids, None if reverse else instance)
+
+@receiver(m2m_changed, sender=get_user_model().skills.through)
+def worker_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' or action in SKILL_M2M_ACTIONS:
+        worker_ids = _changed_m2m_ids(sender, instance, action, reverse, pk_set, 'customuser_id')
+        if action in SKILL_M2M_ACTIONS:
+            sync_worker_skills(worker_ids, None if reverse else instance)
+
+@receiver(pre_delete, sender=Skill)
+def remember_skill_holders(sender, instance, **kwargs):
+    # The cascade removes the m2m rows without m2m_changed, and the ordinal
+    # may be handed out again, so the holders' bitsets must be rebuilt
+    instance._holder_job_ids = list(instance.job_set.values_list('pk', flat=True))
+    instance._holder_worker_ids = list(instance.customuser_set.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Skill)
+def rebuild_skill_holder_bits(sender, instance, **kwargs):
+    sync_job_skills(getattr(instance, '_holder_job_ids', []))
+    sync_worker_skills(getattr(instance, '_holder_worker_ids', []))
+
+# Keep the full-text search index (jobs.search) in sync with jobs, skill names and cities
+@receiver(post_save, sender=Job)
+def reindex_job_on_save(sender, instance, **kwargs):
+    from .search import schedule_index
+    schedule_index([instance.pk])
+
+@receiver(post_delete, sender=Job)
+def remove_job_from_index(sender, instance, **kwargs):
+    from .search import remove_jobs
+    remove_jobs([instance.pk])
+
+@receiver(post_save, sender=Skill)
+def reindex_jobs_on_skill_rename(sender, instance, created, **kwargs):
+    from .search import schedule_index
+    if not created:
+        schedule_index(instance.job_set.values_list('pk', flat=True))
+
+@receiver(post_save, sender=Location)
+def reindex_jobs_on_location_change(sender, instance, created, **kwargs):
+    from .search import schedule_index
+    if not created:
+        schedule_index(instance.job_set.values_list('pk', flat=True))
+
+@receiver(pre_delete, sender=Location)
+def remember_location_jobs(sender, instance, **kwargs):
+    # Jobs lose their city through SET_NULL, which sends no Job signals
+    instance._job_ids = list(instance.job_set.values_list('pk', flat=True))
+
+@receiver(post_delete, sender=Location)
+def reindex_jobs_on_location_delete(sender, instance, **kwargs):
+    from .search import schedule_index
+    schedule_index(getattr(instance, '_job_ids', []))
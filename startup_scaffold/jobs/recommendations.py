@@ -0,0 +1,290 @@
+import logging
+import time
+from collections import defaultdict
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.functions import Power
+from django.utils import timezone
+from core import bitsets
+from .models import Job, JobApplication, JobRecommendation
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Override with JOB_RECOMMENDATION_WEIGHTS / JOB_RECOMMENDATION_HALF_LIFE_DAYS /
+# JOB_RECOMMENDATION_BUDGET_SCALE in settings
+DEFAULT_WEIGHTS = {
+    'skills': 0.55,
+    'location': 0.25,
+    'budget': 0.1,
+    'recency': 0.1,
+}
+DEFAULT_HALF_LIFE_DAYS = 7
+# Budget earning half of the budget weight
+DEFAULT_BUDGET_SCALE = 1000
+
+
+def recommendation_weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'JOB_RECOMMENDATION_WEIGHTS', {})}
+
+
+class EpochSeconds(Func):
+    """Seconds since the Unix epoch of a datetime expression."""
+    template = 'CAST(EXTRACT(EPOCH FROM %(expressions)s) AS double precision)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        template = '((julianday(%(expressions)s) - 2440587.5) * 86400.0)'
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+
+def ranked(recommendations, now=None):
+    """
+    ``recommendations`` annotated with ``rank``: the stored score plus the
+    recency weight decayed by the age of the job. Decay depends on the time
+    of the query, so it is applied here rather than stored; stored scores
+    only change when a job or worker does.
+    """
+    now = now or timezone.now()
+    half_life_days = getattr(settings, 'JOB_RECOMMENDATION_HALF_LIFE_DAYS', DEFAULT_HALF_LIFE_DAYS)
+    age_half_lives = (Value(now.timestamp()) - EpochSeconds('job__created_at')) / Value(half_life_days * 86400.0)
+    return recommendations.annotate(rank=F('score') + Value(float(recommendation_weights()['recency'])) * Power(
+        Value(0.5), age_half_lives, output_field=FloatField(),
+    ))
+
+
+class RecommendationEngine:
+    """
+    Set-based job recommendation builder.
+
+    Open jobs, their skill bitsets and locations are loaded once into
+    in-memory inverted indexes; skill overlap is a popcount of the AND of the
+    worker and job bitsets, so matching never joins the M2M tables. Workers are then matched chunk by chunk and
+    the stored recommendations are reconciled with a diff: new pairs are bulk
+    inserted and stale ones are removed with a single delete per chunk.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.jobs = {}
+        self.jobs_by_skill = defaultdict(set)
+        self.jobs_by_location = defaultdict(set)
+        self.weights = recommendation_weights()
+        self.budget_scale = getattr(settings, 'JOB_RECOMMENDATION_BUDGET_SCALE', DEFAULT_BUDGET_SCALE)
+        self.stats = {'workers': 0, 'chunks': 0, 'created': 0, 'updated': 0, 'deleted': 0, 'elapsed': 0.0}
+
+    def load(self, job_ids=None, ordinals=None, location_ids=None):
+        """
+        Build the inverted indexes and scoring features over open jobs. The
+        optional filters limit the index to the jobs an incremental refresh
+        can possibly touch.
+        """
+        open_jobs = Job.objects.filter(status=Job.Status.OPEN)
+        if job_ids is not None:
+            open_jobs = open_jobs.filter(id__in=job_ids)
+
+        if ordinals is not None or location_ids is not None:
+            skilled_jobs = Job.required_skills.through.objects.filter(skill__ordinal__in=ordinals or [])
+            open_jobs = open_jobs.filter(
+                Q(id__in=skilled_jobs.values('job_id')) | Q(location_id__in=location_ids or [])
+            )
+
+        for job_id, location_id, budget, skill_bits in open_jobs.values_list(
+            'id', 'location_id', 'budget', 'skill_bits'
+        ):
+            bits = bitsets.unpack(skill_bits)
+            self.jobs[job_id] = (bits, location_id, budget)
+            for ordinal in bitsets.ordinals(bits):
+                self.jobs_by_skill[ordinal].add(job_id)
+            if location_id:
+                self.jobs_by_location[location_id].add(job_id)
+        return self
+
+    def match(self, skill_bits, location_id=None):
+        """Open jobs sharing at least one skill or the location with a worker."""
+        matched = set()
+        for ordinal in bitsets.ordinals(skill_bits):
+            matched |= self.jobs_by_skill.get(ordinal, set())
+        if location_id:
+            matched |= self.jobs_by_location.get(location_id, set())
+        return matched
+
+    def score(self, job_id, skill_bits, location_id):
+        """
+        Weighted sum of the skill overlap ratio, location match and budget,
+        the budget saturating towards 1 past the budget scale. Only the job
+        and the worker feed it, so a rerun leaves unchanged pairs alone; the
+        recency decay is added at query time by ``ranked``.
+        """
+        job_bits, job_location_id, budget = self.jobs[job_id]
+        skill_count = job_bits.bit_count()
+        skill_ratio = bitsets.overlap(skill_bits, job_bits) / skill_count if skill_count else 0.0
+        location_match = 1.0 if location_id and location_id == job_location_id else 0.0
+        budget_ratio = float(budget / (budget + self.budget_scale)) if budget and budget > 0 else 0.0
+        return round(
+            self.weights['skills'] * skill_ratio
+            + self.weights['location'] * location_match
+            + self.weights['budget'] * budget_ratio,
+            6,
+        )
+
+    def desired_pairs(self, workers):
+        """Scored ``{(worker_id, job_id): score}`` for ``workers``."""
+        worker_ids = [worker_id for worker_id, _, _ in workers]
+        applied = set(
+            JobApplication.objects.filter(worker_id__in=worker_ids).values_list('worker_id', 'job_id')
+        )
+
+        desired = {}
+        for worker_id, location_id, skill_bits in workers:
+            bits = bitsets.unpack(skill_bits)
+            for job_id in self.match(bits, location_id):
+                if (worker_id, job_id) not in applied:
+                    desired[(worker_id, job_id)] = self.score(job_id, bits, location_id)
+        return desired
+
+    def reconcile(self, desired, existing_queryset):
+        """
+        Make the recommendations in ``existing_queryset`` equal ``desired``, a
+        ``{(worker_id, job_id): score}`` dict. Returns
+        ``(created, updated, deleted)``.
+        """
+        existing = set()
+        changed = []
+        stale_ids = []
+        for rec_id, worker_id, job_id, score in existing_queryset.values_list('id', 'worker_id', 'job_id', 'score'):
+            pair = (worker_id, job_id)
+            if pair in desired and pair not in existing:
+                existing.add(pair)
+                if score != desired[pair]:
+                    changed.append(JobRecommendation(id=rec_id, score=desired[pair]))
+            else:
+                stale_ids.append(rec_id)
+
+        new_recommendations = [
+            JobRecommendation(worker_id=worker_id, job_id=job_id, score=score)
+            for (worker_id, job_id), score in desired.items()
+            if (worker_id, job_id) not in existing
+        ]
+
+        with transaction.atomic():
+            if stale_ids:
+                JobRecommendation.objects.filter(id__in=stale_ids).delete()
+            JobRecommendation.objects.bulk_update(changed, ['score'], batch_size=self.chunk_size)
+            JobRecommendation.objects.bulk_create(new_recommendations, batch_size=self.chunk_size)
+
+        return len(new_recommendations), len(changed), len(stale_ids)
+
+    def process_workers(self, workers):
+        """
+        Reconcile recommendations for ``workers``, a list of
+        ``(worker_id, location_id, skill_bits)`` tuples. Returns
+        ``(created, updated, deleted)``.
+        """
+        worker_ids = [worker_id for worker_id, _, _ in workers]
+        return self.reconcile(
+            self.desired_pairs(workers),
+            JobRecommendation.objects.filter(worker_id__in=worker_ids),
+        )
+
+    def iter_worker_chunks(self):
+        # Keyset pagination on the primary key keeps every chunk query indexed
+        last_id = None
+        while True:
+            queryset = User.objects.order_by('pk')
+            if last_id is not None:
+                queryset = queryset.filter(pk__gt=last_id)
+            chunk = list(queryset.values_list('id', 'location_id', 'skill_bits')[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+    def run(self, progress=None):
+        """
+        Recommend jobs to every worker. ``progress`` is called with the
+        running stats dict after each chunk.
+        """
+        started = time.monotonic()
+        self.load()
+        for chunk in self.iter_worker_chunks():
+            created, updated, deleted = self.process_workers(chunk)
+            self.stats['workers'] += len(chunk)
+            self.stats['chunks'] += 1
+            self.stats['created'] += created
+            self.stats['updated'] += updated
+            self.stats['deleted'] += deleted
+            self.stats['elapsed'] = time.monotonic() - started
+            if progress:
+                progress(self.stats)
+
+        self.stats['elapsed'] = time.monotonic() - started
+        logger.info(
+            "Job recommendations rebuilt: %(workers)s workers in %(chunks)s chunks, "
+            "%(created)s created, %(updated)s rescored, %(deleted)s deleted in %(elapsed).2fs",
+            self.stats,
+        )
+        return self.stats
+
+
+def refresh_for_workers(worker_ids):
+    """Recompute every recommendation of the given workers."""
+    workers = list(User.objects.filter(pk__in=worker_ids).values_list('id', 'location_id', 'skill_bits'))
+    if not workers:
+        return 0, 0, 0
+    skill_bits = 0
+    for _, _, bits in workers:
+        skill_bits |= bitsets.unpack(bits)
+    location_ids = {location_id for _, location_id, _ in workers if location_id}
+    engine = RecommendationEngine().load(ordinals=list(bitsets.ordinals(skill_bits)), location_ids=location_ids)
+    return engine.process_workers(workers)
+
+
+def refresh_for_jobs(job_ids):
+    """
+    Recompute only the (worker, job) pairs of the given jobs. Candidate
+    workers are the ones sharing a skill or location with those jobs;
+    recommendations held by anyone else are dropped.
+    """
+    engine = RecommendationEngine().load(job_ids=job_ids)
+    ordinals = list(engine.jobs_by_skill)
+    location_ids = list(engine.jobs_by_location)
+
+    skilled_workers = User.skills.through.objects.filter(skill__ordinal__in=ordinals).values('customuser_id')
+    candidates = User.objects.filter(
+        Q(pk__in=skilled_workers) | Q(location_id__in=location_ids)
+    ).order_by('pk')
+
+    created = updated = deleted = 0
+    rows = candidates.values_list('id', 'location_id', 'skill_bits').iterator(chunk_size=engine.chunk_size)
+    for chunk in iter(lambda: list(islice(rows, engine.chunk_size)), []):
+        chunk_created, chunk_updated, chunk_deleted = engine.reconcile(
+            engine.desired_pairs(chunk),
+            JobRecommendation.objects.filter(job_id__in=job_ids, worker_id__in=[worker[0] for worker in chunk]),
+        )
+        created += chunk_created
+        updated += chunk_updated
+        deleted += chunk_deleted
+
+    deleted += JobRecommendation.objects.filter(job_id__in=job_ids).exclude(
+        Q(worker__in=skilled_workers) | Q(worker__location_id__in=location_ids)
+    ).delete()[0]
+    return created, updated, deleted
+
+
+def schedule_refresh(job_ids=(), worker_ids=()):
+    """Queue an incremental refresh once the current transaction commits."""
+    from .tasks import refresh_job_recommendations
+
+    job_ids = [str(pk) for pk in job_ids]
+    worker_ids = [str(pk) for pk in worker_ids]
+    if job_ids or worker_ids:
+        transaction.on_commit(
+            lambda: refresh_job_recommendations.delay(job_ids=job_ids, worker_ids=worker_ids)
+        )
@@ -0,0 +1,219 @@
+"""
+Full-text job search.
+
+Jobs are indexed into a shadow table so searches never scan jobs_job:
+PostgreSQL keeps a weighted tsvector per job behind a GIN index, SQLite keeps
+an FTS5 virtual table. The document is built from the job title, required
+skill names, location city and description. Rows are refreshed whenever a
+job, its skills or its location change (see the receivers in jobs.models).
+
+``match`` narrows a job queryset to the hits and ranks them inside the same
+SQL query, so visibility and the other list filters apply before ranking
+and the results page with the keyset cursor like any other list.
+"""
+import uuid
+from collections import defaultdict
+from django.db import connection as default_connection, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'jobs_job_search'
+DOCID_TABLE = 'jobs_job_search_docid'
+
+
+def build_documents(queryset):
+    """``(job_id, title, skills, city, description)`` for every job in ``queryset``."""
+    skills = defaultdict(list)
+    through = queryset.model.required_skills.through
+    for job_id, name in through.objects.filter(job__in=queryset).values_list('job_id', 'skill__name'):
+        skills[job_id].append(name)
+
+    for job_id, title, description, city in queryset.values_list('id', 'title', 'description', 'location__city'):
+        yield job_id, title or '', ' '.join(skills[job_id]), city or '', description or ''
+
+
+class PostgresSearchBackend:
+    create_sql = [
+        f"""
+        CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            job_id uuid PRIMARY KEY REFERENCES jobs_job (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+            content text NOT NULL,
+            document tsvector NOT NULL
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING gin (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+    upsert_sql = f"""
+        INSERT INTO {SEARCH_TABLE} (job_id, content, document)
+        VALUES (
+            %s, %s,
+            setweight(to_tsvector('english', %s), 'A')
+            || setweight(to_tsvector('english', %s), 'B')
+            || setweight(to_tsvector('english', %s), 'C')
+        )
+        ON CONFLICT (job_id) DO UPDATE SET content = EXCLUDED.content, document = EXCLUDED.document
+    """
+    match_sql = f"SELECT job_id FROM {SEARCH_TABLE} WHERE document @@ websearch_to_tsquery('english', %s)"
+    rank_sql = f"""
+        SELECT ts_rank_cd(document, websearch_to_tsquery('english', %s))
+        FROM {SEARCH_TABLE} WHERE job_id = {{job_id}}
+    """
+    highlight_sql = f"""
+        SELECT job_id, ts_headline('english', content, query, 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2')
+        FROM {SEARCH_TABLE}, websearch_to_tsquery('english', %s) AS query
+        WHERE job_id = ANY(%s::uuid[])
+    """
+
+    def query_params(self, query):
+        return [query]
+
+    def highlights(self, cursor, query, job_ids):
+        cursor.execute(self.highlight_sql, [query, [str(pk) for pk in job_ids]])
+        return cursor.fetchall()
+
+    def index(self, cursor, documents):
+        cursor.executemany(self.upsert_sql, [
+            (str(job_id), f'{title} {description}', title, f'{skills} {city}', description)
+            for job_id, title, skills, city, description in documents
+        ])
+
+    def remove(self, cursor, job_ids):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE job_id = ANY(%s::uuid[])", [[str(pk) for pk in job_ids]])
+
+
+class SQLiteSearchBackend:
+    # FTS5 rowids are integers, so a small mapping table links them to job UUIDs
+    create_sql = [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            title, skills, city, description, tokenize = 'porter unicode61'
+        )
+        """,
+        f"""
+        CREATE TABLE IF NOT EXISTS {DOCID_TABLE} (
+            docid INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL UNIQUE
+        )
+        """,
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}", f"DROP TABLE IF EXISTS {DOCID_TABLE}"]
+    match_sql = f"""
+        SELECT d.job_id FROM {SEARCH_TABLE} JOIN {DOCID_TABLE} d ON d.docid = {SEARCH_TABLE}.rowid
+        WHERE {SEARCH_TABLE} MATCH %s
+    """
+    rank_sql = f"""
+        SELECT -bm25({SEARCH_TABLE}, 10.0, 5.0, 5.0, 1.0) FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH %s AND rowid = (SELECT docid FROM {DOCID_TABLE} WHERE job_id = {{job_id}})
+    """
+    highlight_sql = f"""
+        SELECT d.job_id, snippet({SEARCH_TABLE}, -1, '<mark>', '</mark>', '...', 16)
+        FROM {SEARCH_TABLE} JOIN {DOCID_TABLE} d ON d.docid = {SEARCH_TABLE}.rowid
+        WHERE {SEARCH_TABLE} MATCH %s AND d.job_id IN ({{placeholders}})
+    """
+
+    def query_params(self, query):
+        # Quote every term so user input can't inject FTS5 query syntax
+        return [' '.join('"%s"' % term.replace('"', '""') for term in query.split())]
+
+    def highlights(self, cursor, query, job_ids):
+        sql = self.highlight_sql.format(placeholders=', '.join(['%s'] * len(job_ids)))
+        cursor.execute(sql, self.query_params(query) + [pk.hex for pk in job_ids])
+        return cursor.fetchall()
+
+    def index(self, cursor, documents):
+        for job_id, title, skills, city, description in documents:
+            cursor.execute(f"INSERT OR IGNORE INTO {DOCID_TABLE} (job_id) VALUES (%s)", [job_id.hex])
+            cursor.execute(f"SELECT docid FROM {DOCID_TABLE} WHERE job_id = %s", [job_id.hex])
+            docid = cursor.fetchone()[0]
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [docid])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, skills, city, description) VALUES (%s, %s, %s, %s, %s)",
+                [docid, title, skills, city, description],
+            )
+
+    def remove(self, cursor, job_ids):
+        for job_id in job_ids:
+            cursor.execute(f"SELECT docid FROM {DOCID_TABLE} WHERE job_id = %s", [job_id.hex])
+            row = cursor.fetchone()
+            if row:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [row[0]])
+                cursor.execute(f"DELETE FROM {DOCID_TABLE} WHERE docid = %s", [row[0]])
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_backend(connection=default_connection):
+    backend_class = BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class else None
+
+
+def create_index(connection=default_connection):
+    backend = get_backend(connection)
+    if backend:
+        with connection.cursor() as cursor:
+            for sql in backend.create_sql:
+                cursor.execute(sql)
+
+
+def drop_index(connection=default_connection):
+    backend = get_backend(connection)
+    if backend:
+        with connection.cursor() as cursor:
+            for sql in backend.drop_sql:
+                cursor.execute(sql)
+
+
+def index_jobs(queryset, connection=default_connection):
+    """Insert or refresh the search documents of the jobs in ``queryset``."""
+    backend = get_backend(connection)
+    if backend:
+        with connection.cursor() as cursor:
+            backend.index(cursor, build_documents(queryset))
+
+
+def remove_jobs(job_ids, connection=default_connection):
+    backend = get_backend(connection)
+    if backend and job_ids:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, [uuid.UUID(str(pk)) for pk in job_ids])
+
+
+def schedule_index(job_ids):
+    """Refresh the search documents of ``job_ids`` once the current transaction commits."""
+    from .models import Job
+
+    job_ids = list(job_ids)
+    if job_ids:
+        transaction.on_commit(lambda: index_jobs(Job.objects.filter(pk__in=job_ids)))
+
+
+def match(queryset, query, connection=default_connection):
+    """
+    The jobs of ``queryset`` matching ``query``, annotated with their
+    ``search_rank`` (higher is better). Returns ``None`` when the database
+    has no full-text backend.
+    """
+    backend = get_backend(connection)
+    if backend is None:
+        return None
+    params = backend.query_params(query)
+    job_id = f'{connection.ops.quote_name(queryset.model._meta.db_table)}.{connection.ops.quote_name("id")}'
+    return queryset.filter(pk__in=RawSQL(backend.match_sql, params)).annotate(
+        search_rank=RawSQL(backend.rank_sql.format(job_id=job_id), params, output_field=FloatField()),
+    )
+
+
+def highlights(query, job_ids, connection=default_connection):
+    """``{job_id: highlighted snippet}`` of the jobs ``job_ids`` matching ``query``."""
+    backend = get_backend(connection)
+    job_ids = [uuid.UUID(str(pk)) for pk in job_ids]
+    if backend is None or not job_ids:
+        return {}
+    with connection.cursor() as cursor:
+        rows = backend.highlights(cursor, query, job_ids)
+    return {uuid.UUID(str(job_id)): highlight for job_id, highlight in rows}
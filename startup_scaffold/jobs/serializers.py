@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from .models import Job, Skill, Location, JobApplication, JobRecommendation
 
+# Upper bound on applicants hired by a single bulk request
+MAX_BULK_HIRE = 500
+
 class SkillSerializer(serializers.ModelSerializer):
     class Meta:
         model = Skill
@@ -9,7 +12,8 @@ class SkillSerializer(serializers.ModelSerializer):
 class LocationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Location
-        fields = ('id', 'city', 'state', 'country')
+        fields = ('id', 'city', 'state', 'country', 'latitude', 'longitude', 'geohash')
+        read_only_fields = ('geohash',)
 
 class JobSerializer(serializers.ModelSerializer):
     required_skills = SkillSerializer(many=True, read_only=True)
@@ -19,12 +23,47 @@ class JobSerializer(serializers.ModelSerializer):
         model = Job
         fields = ('id', 'client', 'title', 'description', 'required_skills', 'location', 'budget', 'shift', 'status', 'created_at', 'updated_at')
 
+class JobSearchResultSerializer(JobSerializer):
+    """
+    Job matched by a ``?q=`` or ``?near=`` search, with its relevance, a
+    highlighted snippet and its distance in kilometres.
+    """
+    rank = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(JobSerializer.Meta):
+        fields = JobSerializer.Meta.fields + ('rank', 'highlight', 'distance_km')
+
+    def get_rank(self, obj):
+        return self.context.get('search_hits', {}).get(obj.pk, (None, None))[0]
+
+    def get_highlight(self, obj):
+        return self.context.get('search_hits', {}).get(obj.pk, (None, None))[1]
+
+    def get_distance_km(self, obj):
+        distance = getattr(obj, 'search_distance', None)
+        return round(distance, 3) if distance is not None else None
+
 class JobApplicationSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = ('id', 'job', 'worker', 'applied_at', 'is_hired')
+        # Hiring only goes through jobs.hiring, which keeps hired_count and the job status in step
+        read_only_fields = ('is_hired',)
+
+class BulkHireSerializer(serializers.Serializer):
+    worker_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=MAX_BULK_HIRE)
 
 class JobRecommendationSerializer(serializers.ModelSerializer):
     class Meta:
         model = JobRecommendation
-        fields = ('id', 'worker', 'job', 'recommended_at')
+        fields = ('id', 'worker', 'job', 'score', 'recommended_at')
+
+class RankedJobRecommendationSerializer(serializers.ModelSerializer):
+    job = JobSerializer(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = JobRecommendation
+        fields = ('id', 'job', 'score', 'rank', 'recommended_at')
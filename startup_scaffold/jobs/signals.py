@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by jobs.tasks.mark_expired_jobs for each batch of jobs it cancels, with
+# ``job_ids``. The jobs are updated in bulk, so no post_save is sent for them.
+jobs_expired = Signal()
@@ -0,0 +1,32 @@
+from collections import defaultdict
+from django.contrib.auth import get_user_model
+from core.bitsets import pack, from_ordinals
+from .models import Job
+
+User = get_user_model()
+
+
+def _refresh(model, through, owner_column, owner_ids, instance=None):
+    ordinals = defaultdict(list)
+    for owner_id, ordinal in through.objects.filter(
+        **{f'{owner_column}__in': owner_ids}
+    ).values_list(owner_column, 'skill__ordinal'):
+        ordinals[owner_id].append(ordinal)
+
+    objs = [model(pk=owner_id, skill_bits=pack(from_ordinals(ordinals[owner_id]))) for owner_id in owner_ids]
+    model.objects.bulk_update(objs, ['skill_bits'], batch_size=1000)
+    if instance is not None:
+        instance.skill_bits = pack(from_ordinals(ordinals[instance.pk]))
+
+
+def refresh_job_bits(job_ids, instance=None):
+    """
+    Recompute the required-skill bitsets of the given jobs, updating
+    ``instance`` in memory as well when it is one of them.
+    """
+    _refresh(Job, Job.required_skills.through, 'job_id', list(job_ids), instance)
+
+
+def refresh_worker_bits(worker_ids, instance=None):
+    """Recompute the skill bitsets of the given users."""
+    _refresh(User, User.skills.through, 'customuser_id', list(worker_ids), instance)
@@ -1,42 +1,52 @@
 from celery import shared_task
-from django.contrib.auth import get_user_model
 from django.utils import timezone
-from .models import Job, JobRecommendation
-
-User = get_user_model()
+from core.db import update_returning_ids
+from ratings.models import Review
+from .models import Job, JobApplication
+from .signals import jobs_expired
+from .recommendations import RecommendationEngine, DEFAULT_CHUNK_SIZE, refresh_for_jobs, refresh_for_workers
 
 @shared_task
-def recommend_jobs_for_all_users():
-    users = User.objects.all()
-    for user in users:
-        recommend_jobs_for_user(user)
+def recommend_jobs_for_all_users(chunk_size=DEFAULT_CHUNK_SIZE):
+    return RecommendationEngine(chunk_size=chunk_size).run()
 
 def recommend_jobs_for_user(user):
-    # Clear existing recommendations
-    JobRecommendation.objects.filter(worker=user).delete()
-
-    # Get jobs matching user's skills and location
-    if hasattr(user, 'profile') and user.profile.location:
-        # Example of weighted recommendation: 70% skills, 30% location
-        skill_jobs = Job.objects.filter(
-            required_skills__in=user.skills.all(),
-            status=Job.Status.OPEN
-        )
-        location_jobs = Job.objects.filter(
-            location=user.profile.location,
-            status=Job.Status.OPEN
-        )
-        # Combine and rank jobs (simple union here, can be improved)
-        matching_jobs = (skill_jobs | location_jobs).distinct().exclude(applications__worker=user)
+    # Match on skills or location, dropping jobs the user already applied to
+    refresh_for_workers([user.pk])
 
-        # Create new recommendations
-        for job in matching_jobs:
-            JobRecommendation.objects.create(worker=user, job=job)
+@shared_task
+def refresh_job_recommendations(job_ids=None, worker_ids=None):
+    """Incremental refresh triggered by job and skill change events."""
+    if job_ids:
+        refresh_for_jobs(job_ids)
+    if worker_ids:
+        refresh_for_workers(worker_ids)
 
 @shared_task
 def mark_expired_jobs():
+    """
+    Cancel open jobs past their expiry date in bulk, over the (status,
+    expiry_date) index, and announce them with ``jobs_expired`` per batch.
+    """
     now = timezone.now()
-    expired_jobs = Job.objects.filter(expiry_date__lt=now, status=Job.Status.OPEN)
-    for job in expired_jobs:
-        job.status = Job.Status.CANCELLED
-        job.save()
+    expired_jobs = Job.objects.filter(status=Job.Status.OPEN, expiry_date__lt=now)
+    expired = 0
+    for job_ids in update_returning_ids(expired_jobs, status=Job.Status.CANCELLED, updated_at=now):
+        jobs_expired.send(sender=Job, job_ids=job_ids)
+        expired += len(job_ids)
+    return expired
+
+@shared_task
+def create_review_placeholders(job_id, client_id):
+    """
+    Empty client <-> worker reviews for every hired worker of a completed
+    job, in one insert. Existing reviews are left alone.
+    """
+    worker_ids = JobApplication.objects.filter(job_id=job_id, is_hired=True).values_list('worker_id', flat=True)
+    reviews = []
+    for worker_id in worker_ids:
+        reviews.append(Review(reviewer_id=client_id, reviewee_id=worker_id, job_id=job_id))
+        reviews.append(Review(reviewer_id=worker_id, reviewee_id=client_id, job_id=job_id))
+    Review.objects.bulk_create(reviews, ignore_conflicts=True)
+    return len(reviews)
+
@@ -1,11 +1,29 @@
+from unittest import skipUnless
 from django.test import TestCase
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
-from .models import Job, JobApplication
+from .models import Job, JobApplication, JobRecommendation, Location
+from .recommendations import RecommendationEngine, ranked
+from .search import match
+from .hiring import HiringError, hire_workers
+from .tasks import create_review_placeholders, mark_expired_jobs, recommend_jobs_for_user, refresh_job_recommendations
+from .signals import jobs_expired
+from services.models import Skill, SkillQuerySet
+from ratings.models import Review
+from core import bitsets, geo
+from core.db import update_returning_ids, _update_returning, _update_returning_sql
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
 from django.contrib.auth import get_user_model
+from datetime import timedelta
+from unittest import mock
+import base64
+import json
 import uuid
 
 User = get_user_model()
@@ -80,3 +98,686 @@ class JobAppTests(TestCase):
             'worker': str(self.worker_user.id)
         })
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class RecommendationEngineTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.city = Location.objects.create(city='Lagos', country='Nigeria')
+        self.worker.skills.add(self.python)
+
+        self.skill_job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+        self.skill_job.required_skills.add(self.python)
+        self.location_job = Job.objects.create(client=self.client_user, title='Local Job', location=self.city, status=Job.Status.OPEN)
+        self.other_job = Job.objects.create(client=self.client_user, title='Django Job', status=Job.Status.OPEN)
+        self.other_job.required_skills.add(self.django)
+
+    def recommended_job_ids(self, worker):
+        return set(JobRecommendation.objects.filter(worker=worker).values_list('job_id', flat=True))
+
+    def test_matches_on_skills_and_location(self):
+        self.worker.location = self.city
+        self.worker.save()
+        stats = RecommendationEngine(chunk_size=1).run()
+        self.assertEqual(self.recommended_job_ids(self.worker), {self.skill_job.id, self.location_job.id})
+        self.assertEqual(stats['workers'], 2)
+        self.assertEqual(stats['chunks'], 2)
+
+    def test_excludes_applied_and_closed_jobs(self):
+        JobApplication.objects.create(job=self.skill_job, worker=self.worker)
+        closed = Job.objects.create(client=self.client_user, title='Closed Python Job', status=Job.Status.COMPLETED)
+        closed.required_skills.add(self.python)
+        RecommendationEngine().run()
+        self.assertEqual(self.recommended_job_ids(self.worker), set())
+
+    def test_rerun_only_applies_diff(self):
+        RecommendationEngine().run()
+        original = JobRecommendation.objects.get(worker=self.worker, job=self.skill_job)
+
+        self.worker.skills.add(self.django)
+        stats = RecommendationEngine().run()
+        self.assertEqual((stats['created'], stats['deleted']), (1, 0))
+        self.assertTrue(JobRecommendation.objects.filter(pk=original.pk).exists())
+
+        self.worker.skills.remove(self.python)
+        stats = RecommendationEngine().run()
+        self.assertEqual((stats['created'], stats['deleted']), (0, 1))
+        self.assertEqual(self.recommended_job_ids(self.worker), {self.other_job.id})
+
+    def test_recommend_jobs_for_user(self):
+        recommend_jobs_for_user(self.worker)
+        self.assertEqual(self.recommended_job_ids(self.worker), {self.skill_job.id})
+
+class IncrementalRecommendationTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.other_worker = User.objects.create_user(email='other@example.com', password='pass1234')
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.worker.skills.add(self.python)
+        self.other_worker.skills.add(self.django)
+
+    def recommended_worker_ids(self, job):
+        return set(JobRecommendation.objects.filter(job=job).values_list('worker_id', flat=True))
+
+    def test_new_job_reaches_matching_workers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+            job.required_skills.add(self.python)
+        self.assertEqual(self.recommended_worker_ids(job), {self.worker.id})
+
+    def test_job_skill_change_moves_recommendations(self):
+        job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+        job.required_skills.add(self.python)
+        refresh_job_recommendations(job_ids=[str(job.id)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.required_skills.set([self.django])
+        self.assertEqual(self.recommended_worker_ids(job), {self.other_worker.id})
+
+    def test_closing_job_removes_recommendations(self):
+        job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+        job.required_skills.add(self.python)
+        refresh_job_recommendations(job_ids=[str(job.id)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job.status = Job.Status.CANCELLED
+            job.save()
+        self.assertEqual(self.recommended_worker_ids(job), set())
+
+    def test_only_scoring_changes_refresh_on_save(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+        self.assertEqual(len(callbacks), 2)  # recommendations and search index
+
+        job = Job.objects.get(pk=job.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            job.title = 'Python Developer'
+            job.save()
+        self.assertEqual(len(callbacks), 1)  # search index only
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            job.budget = 500
+            job.save()
+        self.assertEqual(len(callbacks), 2)
+
+    def test_worker_skill_change_updates_only_that_worker(self):
+        job = Job.objects.create(client=self.client_user, title='Django Job', status=Job.Status.OPEN)
+        job.required_skills.add(self.django)
+        refresh_job_recommendations(job_ids=[str(job.id)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.worker.skills.add(self.django)
+        self.assertEqual(self.recommended_worker_ids(job), {self.worker.id, self.other_worker.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.customuser_set.clear()
+        self.assertEqual(self.recommended_worker_ids(job), set())
+
+class RankedRecommendationTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.city = Location.objects.create(city='Lagos', country='Nigeria')
+        self.worker.skills.add(self.python, self.django)
+        self.worker.location = self.city
+        self.worker.save()
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.worker)
+
+    def create_job(self, title, skills=(), location=None, budget=100):
+        job = Job.objects.create(client=self.client_user, title=title, location=location, budget=budget, status=Job.Status.OPEN)
+        job.required_skills.add(*skills)
+        return job
+
+    def test_scores_rank_full_overlap_and_location_first(self):
+        best = self.create_job('Full match here', skills=[self.python, self.django], location=self.city)
+        partial = self.create_job('Half match', skills=[self.python, Skill.objects.create(name='Go')])
+        local = self.create_job('Local only', location=self.city)
+        RecommendationEngine().run()
+
+        scores = dict(JobRecommendation.objects.filter(worker=self.worker).values_list('job_id', 'score'))
+        self.assertGreater(scores[best.id], scores[partial.id])
+        self.assertGreater(scores[partial.id], scores[local.id])
+
+    def test_rescoring_updates_existing_rows(self):
+        job = self.create_job('Python Job', skills=[self.python])
+        RecommendationEngine().run()
+        recommendation = JobRecommendation.objects.get(worker=self.worker, job=job)
+
+        job.required_skills.add(Skill.objects.create(name='Go'))
+        stats = RecommendationEngine().run()
+        self.assertEqual(stats['updated'], 1)
+        rescored = JobRecommendation.objects.get(worker=self.worker, job=job)
+        self.assertEqual(rescored.pk, recommendation.pk)
+        self.assertLess(rescored.score, recommendation.score)
+
+    def test_applying_drops_recommendation(self):
+        job = self.create_job('Python Job', skills=[self.python])
+        RecommendationEngine().run()
+        JobApplication.objects.create(job=job, worker=self.worker)
+        self.assertFalse(JobRecommendation.objects.filter(worker=self.worker, job=job).exists())
+
+    def test_recommended_endpoint_pages_by_score(self):
+        for index in range(5):
+            job = self.create_job(f'Job {index}', skills=[self.python], budget=100 + index * 100)
+        RecommendationEngine().run()
+        expected = list(
+            ranked(JobRecommendation.objects.filter(worker=self.worker)).order_by('-rank', 'id').values_list('job_id', flat=True)
+        )
+
+        url = reverse('job-recommended')
+        response = self.api.get(url, {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seen = [item['job']['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.api.get(response.data['next'])
+            seen.extend(item['job']['id'] for item in response.data['results'])
+        self.assertEqual(seen, [str(job_id) for job_id in expected])
+        self.assertEqual(response.data['results'][-1]['job']['title'], 'Job 0')
+
+    def test_recommended_endpoint_rejects_bad_cursor(self):
+        response = self.api.get(reverse('job-recommended'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        cursor = base64.urlsafe_b64encode(json.dumps(['abc', 'x']).encode()).decode()
+        response = self.api.get(reverse('job-recommended'), {'cursor': cursor})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rerun_keeps_scores_of_unchanged_pairs(self):
+        job = self.create_job('Python Job', skills=[self.python], budget=100)
+        best_paid = self.create_job('Django Job', skills=[self.django], budget=5000)
+        RecommendationEngine().run()
+
+        # Neither the clock nor the other open jobs move a stored score
+        Job.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(days=30))
+        Job.objects.filter(pk=best_paid.pk).update(status=Job.Status.CANCELLED)
+        stats = RecommendationEngine().run()
+        self.assertEqual((stats['created'], stats['updated'], stats['deleted']), (0, 0, 1))
+
+    def test_rank_decays_with_job_age(self):
+        fresh = self.create_job('Fresh', skills=[self.python])
+        old = self.create_job('Old', skills=[self.python])
+        Job.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=14))
+        RecommendationEngine().run()
+
+        rows = {row.job_id: row for row in ranked(JobRecommendation.objects.filter(worker=self.worker))}
+        self.assertEqual(rows[fresh.id].score, rows[old.id].score)
+        self.assertAlmostEqual(rows[fresh.id].rank - rows[fresh.id].score, 0.1, places=4)
+        self.assertAlmostEqual(rows[old.id].rank - rows[old.id].score, 0.025, places=4)
+
+class SkillBitsTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.python = Skill.objects.create(name='Python')
+        self.django = Skill.objects.create(name='Django')
+        self.job = Job.objects.create(client=self.client_user, title='Python Job', status=Job.Status.OPEN)
+
+    def stored_bits(self, obj):
+        return bitsets.unpack(type(obj).objects.values_list('skill_bits', flat=True).get(pk=obj.pk))
+
+    def test_skills_get_dense_ordinals(self):
+        self.assertEqual(self.django.ordinal, self.python.ordinal + 1)
+
+    def test_bulk_created_skills_get_ordinals(self):
+        go, rust = Skill.objects.bulk_create([Skill(name='Go'), Skill(name='Rust')])
+        self.assertEqual((go.ordinal, rust.ordinal), (self.django.ordinal + 1, self.django.ordinal + 2))
+        self.job.required_skills.add(go, rust)
+        self.assertEqual(self.stored_bits(self.job), bitsets.from_ordinals([go.ordinal, rust.ordinal]))
+
+    def test_taken_ordinal_is_retried(self):
+        # A concurrent create took the ordinal this one read as free
+        stale = iter([self.django.ordinal])
+        next_ordinal = SkillQuerySet.next_ordinal
+        with mock.patch.object(SkillQuerySet, 'next_ordinal', lambda qs: next(stale, None) or next_ordinal(qs)):
+            go = Skill.objects.create(name='Go')
+        self.assertEqual(go.ordinal, self.django.ordinal + 1)
+        with self.assertRaises(IntegrityError):
+            Skill.objects.create(name='Go')
+
+    def test_bits_follow_m2m_changes(self):
+        self.job.required_skills.add(self.python, self.django)
+        self.worker.skills.add(self.django)
+        self.assertEqual(self.stored_bits(self.job), bitsets.from_ordinals([self.python.ordinal, self.django.ordinal]))
+        self.assertEqual(self.stored_bits(self.worker), bitsets.from_ordinals([self.django.ordinal]))
+
+        self.python.job_set.clear()
+        self.assertEqual(self.stored_bits(self.job), bitsets.from_ordinals([self.django.ordinal]))
+
+        self.django.delete()
+        self.assertEqual(self.stored_bits(self.job), 0)
+        self.assertEqual(self.stored_bits(self.worker), 0)
+
+    def test_stale_instance_save_keeps_bits(self):
+        stale = Job.objects.get(pk=self.job.pk)
+        self.job.required_skills.add(self.python)
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(self.stored_bits(self.job), bitsets.from_ordinals([self.python.ordinal]))
+
+    def test_save_keeps_deferred_fields_unloaded_and_reinserts_deleted_rows(self):
+        job = Job.objects.only('id', 'title').get(pk=self.job.pk)
+        job.title = 'Renamed'
+        with self.assertNumQueries(1):
+            job.save()
+
+        job = Job.objects.get(pk=self.job.pk)
+        Job.objects.filter(pk=job.pk).delete()
+        job.save()
+        self.assertTrue(Job.objects.filter(pk=job.pk, title='Renamed').exists())
+
+    def test_benchmark_command_agrees_with_orm(self):
+        self.job.required_skills.add(self.python)
+        self.worker.skills.add(self.python, self.django)
+        out = StringIO()
+        call_command('benchmark_skill_matching', stdout=out)
+        self.assertIn('identical', out.getvalue())
+
+class JobSearchTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.python = Skill.objects.create(name='Python')
+        self.lagos = Location.objects.create(city='Lagos', country='Nigeria')
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.client_user)
+
+    def create_job(self, title, description='', skills=(), location=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = Job.objects.create(client=self.client_user, title=title, description=description, location=location)
+            job.required_skills.add(*skills)
+        return job
+
+    def hit_ids(self, query):
+        """Ids of the jobs the ``?q=`` list endpoint returns for ``query``, in order"""
+        response = self.api.get(reverse('job-list'), {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [uuid.UUID(item['id']) for item in response.data['results']]
+
+    def test_matches_title_description_skills_and_city(self):
+        job = self.create_job('Backend developer', 'Building payment APIs', skills=[self.python], location=self.lagos)
+        for query in ('backend', 'payments', 'python', 'lagos', 'developer python'):
+            self.assertEqual(self.hit_ids(query), [job.id], query)
+        self.assertEqual(self.hit_ids('plumber'), [])
+
+    def test_title_matches_rank_above_description_matches(self):
+        mention = self.create_job('Office cleaner', 'Previous plumber experience is a plus')
+        title = self.create_job('Plumber needed', 'Fix the kitchen sink')
+        self.assertEqual(self.hit_ids('plumber'), [title.id, mention.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        job = self.create_job('Gardener')
+        with self.captureOnCommitCallbacks(execute=True):
+            job.title = 'Painter'
+            job.save()
+        self.assertEqual(self.hit_ids('gardener'), [])
+        self.assertEqual(self.hit_ids('painter'), [job.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lagos.city = 'Abuja'
+            self.lagos.save()
+            job.location = self.lagos
+            job.save()
+        self.assertEqual(self.hit_ids('abuja'), [job.id])
+
+        job.delete()
+        self.assertEqual(self.hit_ids('painter'), [])
+
+    def test_search_syntax_is_not_interpreted(self):
+        self.create_job('Driver')
+        self.assertEqual(self.hit_ids('driver" OR title:*'), [])
+
+    def test_match_narrows_and_ranks_a_queryset(self):
+        mention = self.create_job('Office cleaner', 'Previous plumber experience is a plus')
+        title = self.create_job('Plumber needed', 'Fix the kitchen sink')
+        with self.captureOnCommitCallbacks(execute=True):
+            Job.objects.create(client=self.client_user, title='Plumber', status=Job.Status.CANCELLED)
+        self.create_job('Electrician')
+
+        matches = match(Job.objects.filter(status=Job.Status.OPEN), 'plumber').order_by('-search_rank', 'id')
+        self.assertEqual([job.id for job in matches], [title.id, mention.id])
+        self.assertGreater(matches[0].search_rank, matches[1].search_rank)
+
+    def test_list_endpoint_ranks_and_highlights(self):
+        mention = self.create_job('Office cleaner', 'Previous plumber experience is a plus')
+        title = self.create_job('Plumber needed', 'Fix the kitchen sink')
+        self.create_job('Electrician')
+
+        response = self.api.get(reverse('job-list'), {'q': 'plumber'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([item['id'] for item in results], [str(title.id), str(mention.id)])
+        self.assertIn('<mark>Plumber</mark>', results[0]['highlight'])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_list_endpoint_pages_every_visible_match(self):
+        other = User.objects.create_user(email='other@example.com', password='pass1234')
+        for index in range(3):
+            # Better matches the searcher may not see
+            with self.captureOnCommitCallbacks(execute=True):
+                Job.objects.create(client=other, title='Plumber plumber plumber', status=Job.Status.CANCELLED)
+        visible = [self.create_job(f'Plumber {index}', 'plumber ' * index) for index in range(5)]
+
+        response = self.api.get(reverse('job-list'), {'q': 'plumber', 'page_size': 2})
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.api.get(response.data['next'])
+        self.assertEqual({item['id'] for item in seen}, {str(job.id) for job in visible})
+        ranks = [item['rank'] for item in seen]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertTrue(all('<mark>' in item['highlight'] for item in seen))
+
+    def test_rebuild_command_reindexes_existing_jobs(self):
+        job = Job.objects.create(client=self.client_user, title='Carpenter')
+        self.assertEqual(self.hit_ids('carpenter'), [])
+        call_command('rebuild_job_search_index', stdout=StringIO())
+        self.assertEqual(self.hit_ids('carpenter'), [job.id])
+
+class NearbyJobTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.client_user)
+        self.ikeja = Location.objects.create(city='Ikeja', country='Nigeria', latitude=6.6018, longitude=3.3515)
+        self.lekki = Location.objects.create(city='Lekki', country='Nigeria', latitude=6.4698, longitude=3.5852)
+        self.ibadan = Location.objects.create(city='Ibadan', country='Nigeria', latitude=7.3775, longitude=3.9470)
+        self.unplaced = Location.objects.create(city='Somewhere', country='Nigeria')
+        self.jobs = {
+            location.city: Job.objects.create(client=self.client_user, title=f'Job in {location.city}', location=location)
+            for location in (self.ikeja, self.lekki, self.ibadan, self.unplaced)
+        }
+
+    def test_location_geohash_follows_coordinates(self):
+        self.assertEqual(self.ikeja.geohash, geo.encode(6.6018, 3.3515))
+        self.assertEqual(self.unplaced.geohash, '')
+        self.ikeja.latitude = 6.5
+        self.ikeja.save(update_fields=['latitude'])
+        self.ikeja.refresh_from_db()
+        self.assertEqual(self.ikeja.geohash, geo.encode(6.5, 3.3515))
+
+    def test_near_filter_orders_by_distance(self):
+        response = self.api.get(reverse('job-list'), {'near': '6.5244,3.3792', 'radius_km': 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Job in Ikeja', 'Job in Lekki'])
+        self.assertAlmostEqual(response.data['results'][0]['distance_km'], 9.1, delta=0.5)
+
+        response = self.api.get(reverse('job-list'), {'near': '6.5244,3.3792', 'radius_km': 200})
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_near_combines_with_search(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jobs['Lekki'].title = 'Plumber in Lekki'
+            self.jobs['Lekki'].save()
+        response = self.api.get(reverse('job-list'), {'near': '6.5244,3.3792', 'radius_km': 30, 'q': 'plumber'})
+        self.assertEqual([item['title'] for item in response.data['results']], ['Plumber in Lekki'])
+
+    def test_near_filter_runs_in_sql_for_many_locations(self):
+        locations = Location.objects.bulk_create([
+            Location(city=f'Town {index}', country='Nigeria', latitude=6.0 + index / 1000, longitude=3.5,
+                     geohash=geo.encode(6.0 + index / 1000, 3.5))
+            for index in range(1500)
+        ])
+        Job.objects.bulk_create([
+            Job(client=self.client_user, title=f'Job in {location.city}', location=location) for location in locations
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(reverse('job-list'), {'near': '6.0,3.5', 'radius_km': 500, 'page_size': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['results']], [f'Job in Town {index}' for index in range(5)])
+        # The radius is a few range scans and a distance expression, not a list of every location
+        self.assertTrue(all(len(query['sql']) < 5000 for query in queries.captured_queries))
+
+    def test_near_filter_covers_circles_too_large_for_cells(self):
+        response = self.api.get(reverse('job-list'), {'near': '89.0,0', 'radius_km': 500})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+        response = self.api.get(reverse('job-list'), {'near': '7.0,179.9', 'radius_km': 500})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_near_is_rejected(self):
+        for params in ({'near': 'abc'}, {'near': '95,3'}, {'near': '6,3', 'radius_km': '-1'}, {'near': 'nan,3'}):
+            response = self.api.get(reverse('job-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+class HiringTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.workers = [User.objects.create_user(email=f'worker{index}@example.com', password='pass1234') for index in range(4)]
+        self.job = Job.objects.create(client=self.client_user, title='Event staff', max_workers=3)
+        for worker in self.workers:
+            JobApplication.objects.create(job=self.job, worker=worker)
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.client_user)
+        self.url = reverse('job-hire-bulk', args=[self.job.id])
+
+    def worker_ids(self, count):
+        return [str(worker.id) for worker in self.workers[:count]]
+
+    def test_bulk_hire_fills_job(self):
+        response = self.api.post(self.url, {'worker_ids': self.worker_ids(3)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hired_count'], 3)
+        self.assertEqual(response.data['status'], Job.Status.IN_PROGRESS)
+        self.assertEqual(JobApplication.objects.filter(job=self.job, is_hired=True).count(), 3)
+
+    def test_bulk_hire_is_all_or_nothing(self):
+        response = self.api.post(self.url, {'worker_ids': self.worker_ids(4)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(JobApplication.objects.filter(job=self.job, is_hired=True).exists())
+
+        response = self.api.post(self.url, {'worker_ids': self.worker_ids(1) + [str(uuid.uuid4())]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.hired_count, 0)
+
+    def test_cannot_hire_past_max_workers_or_twice(self):
+        hire_workers(self.job, [self.workers[0].id])
+        with self.assertRaises(HiringError):
+            hire_workers(self.job, [self.workers[0].id])
+        hire_workers(self.job, [self.workers[1].id, self.workers[2].id])
+        with self.assertRaises(HiringError):
+            hire_workers(self.job, [self.workers[3].id])
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.hired_count, self.job.status), (3, Job.Status.IN_PROGRESS))
+
+    def test_stale_job_instance_cannot_over_hire(self):
+        # Two requests that loaded the job before either hired
+        first = Job.objects.get(pk=self.job.pk)
+        second = Job.objects.get(pk=self.job.pk)
+        hire_workers(first, [self.workers[0].id, self.workers[1].id])
+        with self.assertRaises(HiringError):
+            hire_workers(second, [self.workers[2].id, self.workers[3].id])
+        second.title = 'Renamed'
+        second.save()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.hired_count, 2)
+
+    def test_deleting_hired_application_frees_slot(self):
+        hire_workers(self.job, [self.workers[0].id])
+        JobApplication.objects.get(job=self.job, worker=self.workers[0]).delete()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.hired_count, 0)
+
+    def test_only_owner_can_bulk_hire(self):
+        self.api.force_authenticate(user=self.workers[0])
+        response = self.api.post(self.url, {'worker_ids': self.worker_ids(1)}, format='json')
+        self.assertIn(response.status_code, (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND))
+
+    def test_applications_endpoint_cannot_hire(self):
+        application = JobApplication.objects.get(job=self.job, worker=self.workers[0])
+        response = self.api.patch(reverse('application-detail', args=[application.id]), {'is_hired': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['is_hired'])
+        application.refresh_from_db()
+        self.job.refresh_from_db()
+        self.assertFalse(application.is_hired)
+        self.assertEqual(self.job.hired_count, 0)
+
+class ExpirySweepTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        past = timezone.now() - timezone.timedelta(hours=1)
+        self.expired = [
+            Job.objects.create(client=self.client_user, title=f'Expired {index}', expiry_date=past)
+            for index in range(3)
+        ]
+        self.running = Job.objects.create(
+            client=self.client_user, title='Running', expiry_date=past, status=Job.Status.IN_PROGRESS
+        )
+        self.future = Job.objects.create(
+            client=self.client_user, title='Future', expiry_date=timezone.now() + timezone.timedelta(days=1)
+        )
+
+    def test_sweep_cancels_expired_open_jobs_and_emits_batches(self):
+        batches = []
+        def receiver(sender, job_ids, **kwargs):
+            batches.append(job_ids)
+        jobs_expired.connect(receiver)
+        self.addCleanup(jobs_expired.disconnect, receiver)
+
+        self.assertEqual(mark_expired_jobs(), 3)
+        self.assertEqual(sorted(id for batch in batches for id in batch), sorted(job.id for job in self.expired))
+        self.assertEqual(Job.objects.filter(status=Job.Status.CANCELLED).count(), 3)
+        self.assertEqual(Job.objects.get(pk=self.running.pk).status, Job.Status.IN_PROGRESS)
+        self.assertEqual(Job.objects.get(pk=self.future.pk).status, Job.Status.OPEN)
+        self.assertEqual(mark_expired_jobs(), 0)
+
+    def test_sweep_drops_recommendations_of_expired_jobs(self):
+        JobRecommendation.objects.create(worker=self.worker, job=self.expired[0])
+        JobRecommendation.objects.create(worker=self.worker, job=self.future)
+        mark_expired_jobs()
+        self.assertEqual(list(JobRecommendation.objects.values_list('job_id', flat=True)), [self.future.id])
+
+    def test_chunked_update_returns_every_id(self):
+        queryset = Job.objects.filter(status=Job.Status.OPEN, expiry_date__lt=timezone.now())
+        batches = list(update_returning_ids(queryset, batch_size=2, status=Job.Status.CANCELLED))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+    def test_update_returning_sql(self):
+        # SQLite >= 3.35 understands RETURNING too, so the PostgreSQL statement can be checked here
+        queryset = Job.objects.filter(status=Job.Status.OPEN, expiry_date__lt=timezone.now())
+        ids = _update_returning(queryset, connection, {'status': Job.Status.CANCELLED})
+        self.assertEqual(sorted(ids), sorted(job.id for job in self.expired))
+        self.assertFalse(queryset.exists())
+
+    def test_update_returning_sql_filters_across_joins(self):
+        queryset = Job.objects.filter(status=Job.Status.OPEN, client__email='client@example.com')
+        sql, params = _update_returning_sql(queryset, connection, {'status': Job.Status.CANCELLED})
+        self.assertEqual(sql.count('UPDATE'), 1)
+        self.assertTrue(sql.endswith(f' RETURNING {connection.ops.quote_name("id")}'))
+        ids = _update_returning(queryset, connection, {'status': Job.Status.CANCELLED})
+        self.assertEqual(sorted(ids), sorted(job.id for job in [*self.expired, self.future]))
+
+    @skipUnless(connection.vendor == 'postgresql', 'UPDATE ... RETURNING is used on PostgreSQL only')
+    def test_update_returning_ids_uses_returning_on_postgresql(self):
+        queryset = Job.objects.filter(status=Job.Status.OPEN, expiry_date__lt=timezone.now())
+        with CaptureQueriesContext(connection) as queries:
+            batches = list(update_returning_ids(queryset, batch_size=2, status=Job.Status.CANCELLED))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('RETURNING', queries[0]['sql'])
+
+class ReviewPlaceholderTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.workers = [User.objects.create_user(email=f'worker{index}@example.com', password='pass1234') for index in range(50)]
+        self.job = Job.objects.create(client=self.client_user, title='Festival crew', max_workers=50)
+        JobApplication.objects.bulk_create(
+            [JobApplication(job=self.job, worker=worker, is_hired=True) for worker in self.workers]
+        )
+
+    def complete(self, job):
+        with self.captureOnCommitCallbacks(execute=True):
+            job.status = Job.Status.COMPLETED
+            job.save()
+
+    def test_completion_creates_both_placeholders_per_worker(self):
+        self.complete(self.job)
+        self.assertEqual(Review.objects.filter(job=self.job, rating__isnull=True).count(), 100)
+        self.assertTrue(Review.objects.filter(reviewer=self.client_user, reviewee=self.workers[0], job=self.job).exists())
+        self.assertTrue(Review.objects.filter(reviewer=self.workers[0], reviewee=self.client_user, job=self.job).exists())
+
+    def test_only_the_transition_creates_placeholders(self):
+        self.complete(self.job)
+        Review.objects.all().delete()
+        self.complete(Job.objects.get(pk=self.job.pk))
+        self.complete(self.job)
+        self.assertFalse(Review.objects.exists())
+
+    def test_placeholders_cost_constant_queries_and_keep_existing_reviews(self):
+        Review.objects.create(reviewer=self.client_user, reviewee=self.workers[0], job=self.job, rating=5)
+        with self.assertNumQueries(2):
+            create_review_placeholders(str(self.job.pk), str(self.client_user.pk))
+        self.assertEqual(Review.objects.filter(job=self.job).count(), 100)
+        self.assertEqual(Review.objects.get(reviewer=self.client_user, reviewee=self.workers[0]).rating, 5)
+
+class JobQueryBudgetTests(TestCase):
+    """Job endpoints must cost the same number of queries whatever the page size."""
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(email='client@example.com', password='pass1234')
+        self.worker = User.objects.create_user(email='worker@example.com', password='pass1234')
+        self.skills = [Skill.objects.create(name=f'Skill {index}') for index in range(3)]
+        self.city = Location.objects.create(city='Lagos', country='Nigeria', latitude=6.5244, longitude=3.3792)
+        self.api = APIClient()
+        self.jobs = []
+
+    def create_jobs(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(count):
+                job = Job.objects.create(client=self.client_user, title=f'Cleaner {index}', location=self.city)
+                job.required_skills.add(*self.skills)
+                JobApplication.objects.create(job=job, worker=self.worker)
+                self.jobs.append(job)
+
+    def assertQueryBudget(self, queries, user, url, params=None):
+        self.api.force_authenticate(user=user)
+        for count in (2, 10):
+            self.create_jobs(count - len(self.jobs))
+            with self.assertNumQueries(queries):
+                response = self.api.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_list(self):
+        response = self.assertQueryBudget(2, self.client_user, reverse('job-list'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_list_search_and_near(self):
+        self.assertQueryBudget(3, self.client_user, reverse('job-list'), {'q': 'cleaner'})
+        self.assertQueryBudget(2, self.client_user, reverse('job-list'), {'near': '6.5,3.4', 'radius_km': 20})
+
+    def test_detail(self):
+        self.create_jobs(1)
+        self.api.force_authenticate(user=self.client_user)
+        with self.assertNumQueries(2):
+            response = self.api.get(reverse('job-detail', args=[self.jobs[0].id]))
+        self.assertEqual(len(response.data['required_skills']), 3)
+
+    def test_my(self):
+        self.assertQueryBudget(2, self.client_user, reverse('job-my'))
+
+    def test_applied(self):
+        response = self.assertQueryBudget(2, self.worker, reverse('job-applied'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_recommended(self):
+        self.api.force_authenticate(user=self.worker)
+        for count in (2, 10):
+            existing = len(self.jobs)
+            self.create_jobs(count - len(self.jobs))
+            JobRecommendation.objects.bulk_create(
+                [JobRecommendation(worker=self.worker, job=job, score=1.0) for job in self.jobs[existing:]]
+            )
+            with self.assertNumQueries(2):
+                response = self.api.get(reverse('job-recommended'), {'limit': 50})
+            self.assertEqual(len(response.data['results']), count)
@@ -1,11 +1,20 @@
+from datetime import datetime, timezone as dt_timezone
 from rest_framework import viewsets, permissions, status, throttling
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import replace_query_param
 from django.db.models import Q
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Job, Skill, Location, JobApplication, JobRecommendation
-from .serializers import JobSerializer, SkillSerializer, LocationSerializer, JobApplicationSerializer, JobRecommendationSerializer
+from .serializers import BulkHireSerializer, JobSerializer, JobSearchResultSerializer, SkillSerializer, LocationSerializer, JobApplicationSerializer, JobRecommendationSerializer, RankedJobRecommendationSerializer
+from .hiring import hire_workers
+from .recommendations import ranked
+from . import search as job_search
+from core import geo
+from core.pagination import KeysetPagination
 
 class IsJobOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -27,6 +36,37 @@ class JobCreationThrottle(throttling.UserRateThrottle):
 class ApplicationThrottle(throttling.UserRateThrottle):
     scope = 'application'
 
+# ?near= radius search bounds, in kilometres
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 500
+
+class RecommendationPagination(KeysetPagination):
+    """
+    Best ``rank`` first (see jobs.recommendations.ranked). Rank decays with
+    the clock, so every page of a walk is ranked as of the first one, carried
+    in the ``as_of`` timestamp of the next link.
+    """
+    ordering = ('-rank', 'id')
+    page_size_query_param = 'limit'
+    as_of_query_param = 'as_of'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.as_of = self.get_as_of(request)
+        return super().paginate_queryset(ranked(queryset, self.as_of), request, view)
+
+    def get_as_of(self, request):
+        value = request.query_params.get(self.as_of_query_param)
+        if not value:
+            return timezone.now()
+        try:
+            return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        link = super().get_next_link()
+        return link and replace_query_param(link, self.as_of_query_param, self.as_of.timestamp())
+
 class SkillViewSet(viewsets.ModelViewSet):
     queryset = Skill.objects.all()
     serializer_class = SkillSerializer
@@ -47,42 +87,104 @@ class JobViewSet(viewsets.ModelViewSet):
         'budget': ['gte', 'lte'],
         'location__city': ['icontains'],
         'status': ['exact'],
-        'client__ratings__rating': ['gte'],
+        'client__received_reviews__rating': ['gte'],
     }
     throttle_classes = [JobCreationThrottle]
+    # Default pagination order; ?q= and ?near= switch to relevance and distance
+    keyset_ordering = None
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Job.objects.all()
-        return Job.objects.filter(Q(client=user) | Q(status=Job.Status.OPEN))
+        queryset = Job.objects.visible_to(self.request.user).for_serialization()
+        if self.action == 'list':
+            queryset = self.filter_near(queryset)
+        if self.search_query:
+            queryset = self.search(queryset, self.search_query)
+        return queryset
+
+    @property
+    def search_query(self):
+        """Full-text ``?q=`` search, only applied when listing jobs"""
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
+    def search(self, queryset, query):
+        """Restrict ``queryset`` to the jobs matching ``query``, most relevant first"""
+        matches = job_search.match(queryset, query)
+        if matches is None:
+            # No full-text backend on this database
+            return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+        self.keyset_ordering = ('-search_rank', 'id')
+        return matches
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page and self.search_query and self.keyset_ordering == ('-search_rank', 'id'):
+            # Snippets are only worth building for the rows on this page
+            snippets = job_search.highlights(self.search_query, [job.pk for job in page])
+            self.search_hits = {job.pk: (job.search_rank, snippets.get(job.pk)) for job in page}
+        return page
+
+    def filter_near(self, queryset):
+        """``?near=lat,lng&radius_km=``: jobs located within the radius, nearest first"""
+        near = self.request.query_params.get('near')
+        if not near:
+            return queryset
+        try:
+            latitude, longitude = (float(value) for value in near.split(','))
+            radius_km = float(self.request.query_params.get('radius_km', DEFAULT_RADIUS_KM))
+        except ValueError:
+            raise ValidationError({'near': 'Expected near=<lat>,<lng> and a numeric radius_km.'})
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 0 < radius_km <= MAX_RADIUS_KM):
+            raise ValidationError({'near': f'Coordinates out of range or radius_km not within (0, {MAX_RADIUS_KM}].'})
+
+        queryset = queryset.filter(geo.nearby_q(latitude, longitude, radius_km, prefix='location__')).annotate(
+            search_distance=geo.distance_km(latitude, longitude, prefix='location__'),
+        ).filter(search_distance__lte=radius_km)
+        if not self.search_query:
+            self.keyset_ordering = ('search_distance', 'id')
+        return queryset
+
+    def get_throttles(self):
+        # Only job creation is rate limited; browsing and searching are not
+        if self.action != 'create':
+            return []
+        return super().get_throttles()
+
+    def get_serializer_class(self):
+        if self.search_query or (self.action == 'list' and 'near' in self.request.query_params):
+            return JobSearchResultSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_hits'] = getattr(self, 'search_hits', {})
+        return context
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my(self, request):
         """Jobs posted by the current user (client)"""
-        jobs = Job.objects.filter(client=request.user)
-        serializer = self.get_serializer(jobs, many=True)
-        return Response(serializer.data)
+        jobs = Job.objects.filter(client=request.user).for_serialization()
+        serializer = self.get_serializer(self.paginate_queryset(jobs), many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def recommended(self, request):
-        """Jobs recommended for the current user (worker)"""
-        user = request.user
-        recommended_jobs = Job.objects.filter(
-            required_skills__in=user.skills.all(),
-            location__in=[user.profile.location] if hasattr(user, 'profile') else [],
-            status=Job.Status.OPEN
-        ).exclude(applications__worker=user).distinct()
-        serializer = self.get_serializer(recommended_jobs, many=True)
-        return Response(serializer.data)
+        """Best-scoring recommended jobs for the current user (worker), keyset paginated"""
+        recommendations = JobRecommendation.objects.filter(worker=request.user).select_related(
+            'job__location'
+        ).prefetch_related('job__required_skills')
+        paginator = RecommendationPagination()
+        page = paginator.paginate_queryset(recommendations, request, view=self)
+        serializer = RankedJobRecommendationSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def applied(self, request):
         """Jobs the current user (worker) has applied to"""
-        applications = JobApplication.objects.filter(worker=request.user)
-        jobs = Job.objects.filter(applications__in=applications)
-        serializer = self.get_serializer(jobs, many=True)
-        return Response(serializer.data)
+        jobs = Job.objects.filter(applications__worker=request.user).for_serialization()
+        serializer = self.get_serializer(self.paginate_queryset(jobs), many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def hire(self, request, pk=None):
@@ -94,26 +196,29 @@ class JobViewSet(viewsets.ModelViewSet):
         worker_id = request.data.get('worker_id')
         if not worker_id:
             return Response({'detail': 'worker_id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = BulkHireSerializer(data={'worker_ids': [worker_id]})
+        serializer.is_valid(raise_exception=True)
 
-        try:
-            application = JobApplication.objects.get(job=job, worker__id=worker_id)
-        except JobApplication.DoesNotExist:
-            return Response({'detail': 'Application not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # Prevent hiring more than max_workers
-        hired_count = JobApplication.objects.filter(job=job, is_hired=True).count()
-        if hired_count >= job.max_workers:
-            return Response({'detail': 'Maximum number of workers already hired for this job.'}, status=status.HTTP_400_BAD_REQUEST)
+        application, = hire_workers(job, serializer.validated_data['worker_ids'])
+        return Response({'detail': f'Worker {application.worker.email} hired for job {job.title}.'})
 
-        application.is_hired = True
-        application.save()
+    @action(detail=True, methods=['post'], url_path='hire/bulk', url_name='hire-bulk', permission_classes=[IsAuthenticated])
+    def hire_bulk(self, request, pk=None):
+        """Endpoint for client to hire several applicants at once; all are hired or none"""
+        job = self.get_object()
+        if job.client != request.user and not request.user.is_staff:
+            return Response({'detail': 'Not authorized to hire for this job.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Update job status if max_workers reached
-        if hired_count + 1 >= job.max_workers:
-            job.status = Job.Status.IN_PROGRESS
-            job.save()
+        serializer = BulkHireSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        return Response({'detail': f'Worker {application.worker.email} hired for job {job.title}.'})
+        applications = hire_workers(job, serializer.validated_data['worker_ids'])
+        return Response({
+            'detail': f'{len(applications)} workers hired for job {job.title}.',
+            'hired': [application.worker_id for application in applications],
+            'hired_count': job.hired_count,
+            'status': job.status,
+        })
 
 class JobApplicationViewSet(viewsets.ModelViewSet):
     queryset = JobApplication.objects.all()
@@ -114,8 +114,8 @@ class ConversationAPITests(APITestCase):
         self.client.force_authenticate(user=self.user1)
         response = self.client.get(self.conversation_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Test Conversation')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Test Conversation')
 
     def test_list_conversations_unauthenticated(self):
         """Test listing conversations for unauthenticated user"""
@@ -211,8 +211,8 @@ class MessageAPITests(APITestCase):
         self.client.force_authenticate(user=self.user1)
         response = self.client.get(self.message_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['content'], 'Hello, this is a test message!')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['content'], 'Hello, this is a test message!')
 
     def test_list_messages_unauthenticated(self):
         """Test listing messages for unauthenticated user"""
@@ -12,3 +12,16 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"Notification for {self.user.email}"
+
+# Missed shifts are marked in bulk, so their notifications are created in bulk too
+from django.dispatch import receiver
+from shifts.signals import shifts_missed
+
+@receiver(shifts_missed)
+def notify_missed_shifts(sender, shift_ids, **kwargs):
+    from shifts.models import Shift
+    shifts = Shift.objects.filter(pk__in=shift_ids).values_list('worker_id', 'name', 'start_time')
+    Notification.objects.bulk_create([
+        Notification(user_id=worker_id, message=f'You missed your shift "{name}" scheduled at {start_time}.')
+        for worker_id, name, start_time in shifts
+    ])
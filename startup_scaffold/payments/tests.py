@@ -240,7 +240,7 @@ class PaymentAPITests(APITestCase):
         self.client.force_authenticate(user=self.client_user)
         response = self.client.get(self.payment_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_list_payments_unauthenticated(self):
         """Test listing payments for unauthenticated user"""
@@ -318,7 +318,7 @@ class PaymentMethodAPITests(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.payment_method_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_list_payment_methods_unauthenticated(self):
         """Test listing payment methods for unauthenticated user"""
@@ -414,7 +414,7 @@ class TransactionAPITests(APITestCase):
         self.client.force_authenticate(user=self.client_user)
         response = self.client.get(self.transaction_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_retrieve_transaction(self):
         """Test retrieving transaction details"""
@@ -24,7 +24,8 @@ class Review(models.Model):
         blank=True,
         on_delete=models.SET_NULL
     )
-    rating = models.DecimalField(max_digits=2, decimal_places=1)  # e.g., 4.5
+    # e.g., 4.5; empty on the placeholders created when a job is completed
+    rating = models.DecimalField(max_digits=2, decimal_places=1, null=True, blank=True)
     title = models.CharField(max_length=255, blank=True)
     content = models.TextField(blank=True)
     is_anonymous = models.BooleanField(default=False)
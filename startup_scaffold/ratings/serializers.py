@@ -20,6 +20,9 @@ class ReviewSerializer(serializers.ModelSerializer):
             'is_anonymous',
             'created_at',
         ]
+        extra_kwargs = {
+            'rating': {'required': True, 'allow_null': False},
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -64,4 +64,33 @@ class ReviewTests(APITestCase):
         self.client.login(email='client@example.com', password='pass')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_submit_review_fills_placeholder(self):
+        Review.objects.create(reviewer=self.client_user, reviewee=self.worker_user, job=self.job)
+        url = reverse('submit-review-for-job', kwargs={'job_id': self.job.id})
+        response = self.client.post(url, {'rating': 4, 'content': 'Solid work'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        review = Review.objects.get()
+        self.assertEqual((review.rating, review.content), (4, 'Solid work'))
+
+
+    def test_placeholders_are_not_listed_and_are_filled_on_create(self):
+        placeholder = Review.objects.create(reviewer=self.client_user, reviewee=self.worker_user, job=self.job)
+        response = self.client.get(reverse('review-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('review-detail', args=[placeholder.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(reverse('review-list'), {
+            'reviewer': str(self.client_user.id),
+            'reviewee': str(self.worker_user.id),
+            'job': str(self.job.id),
+            'rating': 5,
+            'content': 'Excellent',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        review = Review.objects.get()
+        self.assertEqual((review.pk, review.rating, review.content), (placeholder.pk, 5, 'Excellent'))
+        self.assertEqual([item['id'] for item in self.client.get(reverse('review-list')).data['results']], [review.id])
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions, status, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
 from django.db.models import Avg
 from .models import Review
@@ -15,6 +16,27 @@ class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        # Placeholders left when a job is completed are not reviews until rated
+        return Review.objects.filter(rating__isnull=False)
+
+    def get_placeholder(self, data):
+        """The empty review left for the current user, ``reviewee`` and ``job`` of ``data``, if any."""
+        try:
+            return Review.objects.filter(
+                reviewer=self.request.user, reviewee_id=data.get('reviewee'), job_id=data.get('job'), rating__isnull=True,
+            ).first()
+        except (ValueError, DjangoValidationError):
+            return None
+
+    def create(self, request, *args, **kwargs):
+        # Rating a completed job fills its placeholder rather than clashing with it
+        serializer = self.get_serializer(self.get_placeholder(request.data), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
     def perform_create(self, serializer):
         # Enforce business logic: no self-review, job completed, user involved
         reviewer = self.request.user
@@ -36,9 +58,9 @@ class ReviewViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)/reviews')
     def reviews_received(self, request, user_id=None):
         user = get_object_or_404(User, pk=user_id)
-        reviews = Review.objects.filter(reviewee=user)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = Review.objects.filter(reviewee=user, rating__isnull=False)
+        serializer = self.get_serializer(self.paginate_queryset(reviews), many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)/ratings/average')
     def average_rating(self, request, user_id=None):
@@ -67,7 +89,11 @@ def submit_review_for_job(request, job_id):
         data['reviewee'] = str(job.worker.id)
     data['job'] = str(job.id)
 
-    serializer = ReviewSerializer(data=data)
+    # Fill in the placeholder left when the job was completed, if there is one
+    placeholder = Review.objects.filter(
+        reviewer=user, reviewee_id=data['reviewee'], job=job, rating__isnull=True
+    ).first()
+    serializer = ReviewSerializer(placeholder, data=data)
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
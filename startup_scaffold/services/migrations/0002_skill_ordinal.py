@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 00:54
+
+from django.db import migrations, models
+
+
+def assign_ordinals(apps, schema_editor):
+    Skill = apps.get_model('services', 'Skill')
+    skills = list(Skill.objects.order_by('name'))
+    for ordinal, skill in enumerate(skills):
+        skill.ordinal = ordinal
+    Skill.objects.bulk_update(skills, ['ordinal'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='ordinal',
+            field=models.PositiveIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(assign_ordinals, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,58 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
+
+# Attempts at a free ordinal when concurrent creates take the same one
+ORDINAL_ATTEMPTS = 5
+
+class SkillQuerySet(models.QuerySet):
+    def next_ordinal(self):
+        last = Skill.objects.using(self.db).aggregate(last=models.Max('ordinal'))['last']
+        return 0 if last is None else last + 1
+
+    def ordinals_taken(self, ordinals):
+        return Skill.objects.using(self.db).filter(ordinal__in=ordinals).exists()
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Hands consecutive ordinals to the skills without one, retrying if they were taken meanwhile."""
+        objs = list(objs)
+        pending = [obj for obj in objs if obj.ordinal is None]
+        for attempt in range(ORDINAL_ATTEMPTS):
+            start = self.next_ordinal() if pending else None
+            for offset, obj in enumerate(pending):
+                obj.ordinal = start + offset
+            try:
+                with transaction.atomic(using=self.db):
+                    return super().bulk_create(objs, *args, **kwargs)
+            except IntegrityError:
+                if attempt == ORDINAL_ATTEMPTS - 1 or not self.ordinals_taken([obj.ordinal for obj in pending]):
+                    raise
 
 class Skill(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100, unique=True)
+    # Dense bit position used by the skill bitsets on jobs and users
+    ordinal = models.PositiveIntegerField(unique=True, null=True, editable=False)
+
+    objects = SkillQuerySet.as_manager()
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.ordinal is not None:
+            return super().save(*args, **kwargs)
+        # The unique constraint settles concurrent creates: the loser retries
+        # with the next free ordinal instead of failing
+        for attempt in range(ORDINAL_ATTEMPTS):
+            self.ordinal = Skill.objects.next_ordinal()
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == ORDINAL_ATTEMPTS - 1 or not Skill.objects.ordinals_taken([self.ordinal]):
+                    self.ordinal = None
+                    raise
+
 class Service(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
@@ -23,3 +68,12 @@ class Service(models.Model):
 
     def __str__(self):
         return self.name
+
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+@receiver(pre_save, sender=Skill)
+def assign_fixture_ordinal(sender, instance, raw, **kwargs):
+    # loaddata saves raw, bypassing Skill.save
+    if raw and instance.ordinal is None:
+        instance.ordinal = Skill.objects.next_ordinal()
@@ -107,7 +107,7 @@ class ServiceAPITests(APITestCase):
         self.client.force_authenticate(user=self.customer)
         response = self.client.get(self.service_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_list_services_unauthenticated(self):
         """Test listing services for unauthenticated user"""
@@ -185,7 +185,7 @@ class ServiceCategoryAPITests(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.get(self.category_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_category_as_admin(self):
         """Test creating category as admin"""
@@ -1,9 +1,14 @@
 from rest_framework import viewsets
+from django.db.models import Prefetch
+from jobs.models import Job
 from .models import Service
 from .serializers import ServiceSerializer
 from rest_framework.permissions import IsAuthenticated
 
 class ServiceViewSet(viewsets.ModelViewSet):
-    queryset = Service.objects.all()
+    queryset = Service.objects.prefetch_related(
+        'skills',
+        Prefetch('jobs', queryset=Job.objects.for_serialization()),
+    )
     serializer_class = ServiceSerializer
     permission_classes = [IsAuthenticated]
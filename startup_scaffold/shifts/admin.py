@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import Shift
+from .models import Shift, ShiftTemplate
 
 @admin.register(Shift)
 class ShiftAdmin(admin.ModelAdmin):
     list_display = ('id', 'job', 'worker', 'start_time', 'end_time', 'status', 'is_confirmed')
     list_filter = ('status', 'is_confirmed')
     search_fields = ('name', 'worker__email')
+
+@admin.register(ShiftTemplate)
+class ShiftTemplateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job', 'worker', 'name', 'dtstart', 'rrule', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'worker__email')
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shifts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['status', 'is_confirmed', 'start_time'], name='shifts_status_start_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-18 03:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_job_status_expiry_index'),
+        ('shifts', '0002_shift_status_start_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shift',
+            name='occurrence',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ShiftTemplate',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('notes', models.TextField(blank=True)),
+                ('dtstart', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('rrule', models.CharField(max_length=500)),
+                ('is_active', models.BooleanField(default=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shift_templates', to='jobs.job')),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shift_templates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shifts', to='shifts.shifttemplate'),
+        ),
+        migrations.AddConstraint(
+            model_name='shift',
+            constraint=models.UniqueConstraint(fields=('template', 'occurrence'), name='shifts_unique_template_occurrence'),
+        ),
+    ]
@@ -3,6 +3,20 @@ from django.db import models
 from core.models import TimeStampedModel, UUIDModel
 from jobs.models import Job
 
+class ShiftTemplate(UUIDModel, TimeStampedModel):
+    """A recurring shift; its occurrences are expanded on demand by shifts.recurrence"""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='shift_templates')
+    worker = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shift_templates')
+    name = models.CharField(max_length=255)
+    notes = models.TextField(blank=True)
+    dtstart = models.DateTimeField()  # start of the first occurrence
+    duration = models.DurationField()
+    rrule = models.CharField(max_length=500)  # RFC 5545 RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE,FR
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} | {self.worker.email} | {self.rrule}"
+
 class Shift(UUIDModel, TimeStampedModel):
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='shifts')
     worker = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shifts')
@@ -25,6 +39,19 @@ class Shift(UUIDModel, TimeStampedModel):
     geofence_lng = models.FloatField(null=True, blank=True)
     geofence_radius_meters = models.FloatField(null=True, blank=True)  # allowed radius in meters
 
+    # Set on shifts materialized from an occurrence of a template
+    template = models.ForeignKey(ShiftTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='shifts')
+    occurrence = models.DateTimeField(null=True, blank=True, editable=False)  # start of that occurrence
+
+    class Meta:
+        indexes = [
+            # Missed shift sweep: confirmed shifts still scheduled past their start
+            models.Index(fields=['status', 'is_confirmed', 'start_time'], name='shifts_status_start_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'occurrence'], name='shifts_unique_template_occurrence'),
+        ]
+
     def __str__(self):
         return f"{self.name} | {self.worker.email} | {self.start_time.strftime('%Y-%m-%d %H:%M')}"
 
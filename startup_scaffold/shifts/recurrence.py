@@ -0,0 +1,116 @@
+"""
+Recurring shifts.
+
+A ``ShiftTemplate`` stores one RFC 5545 recurrence rule, e.g.
+``FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=20271231T000000Z``, instead of a
+``Shift`` row per occurrence. Occurrences are expanded on demand for the
+window a view asks for. Expansion runs in the local time zone, so
+occurrences keep their wall-clock start across DST changes. An occurrence
+gets a ``Shift`` row, with ``template`` and ``occurrence`` set, only when it
+is confirmed or about to be attended. From then on that row stands in for
+it in every expanded view.
+"""
+import re
+from datetime import timedelta
+from dateutil.rrule import rrulestr
+from django.utils import timezone
+from .models import Shift
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+# Longest window occurrences are expanded for in one request
+MAX_WINDOW = timedelta(days=366)
+# Window of the calendar feed's occurrences when it asks for none
+DEFAULT_PAST = timedelta(days=30)
+DEFAULT_AHEAD = timedelta(days=180)
+
+
+def parse_rule(text, dtstart):
+    """The dateutil rule of the RRULE ``text`` from ``dtstart``; raises ``ValueError`` if invalid."""
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    if '\n' in text:
+        raise ValueError('Only a single RRULE line is supported.')
+    frequency = re.search(r'(?:^|;)FREQ=([A-Z]+)', text.upper())
+    if not frequency or frequency[1] not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}.")
+    try:
+        return rrulestr(text, dtstart=timezone.localtime(dtstart))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid recurrence rule: {e}')
+
+
+def occurrence_starts(template, start, end):
+    """Starts of the occurrences of ``template`` overlapping ``[start, end)``."""
+    rule = parse_rule(template.rrule, template.dtstart)
+    return rule.between(start - template.duration, end, inc=False)
+
+
+def is_occurrence(template, start):
+    rule = parse_rule(template.rrule, template.dtstart)
+    return bool(rule.between(start, start, inc=True))
+
+
+def occurrence_shift(template, start):
+    """The unsaved ``Shift`` of the occurrence of ``template`` starting at ``start``."""
+    return Shift(
+        id=None,
+        job_id=template.job_id,
+        worker_id=template.worker_id,
+        template=template,
+        occurrence=start,
+        name=template.name,
+        notes=template.notes,
+        start_time=start,
+        end_time=start + template.duration,
+    )
+
+
+def expand(shifts, templates, start, end):
+    """
+    The ``shifts`` overlapping ``[start, end)`` together with the unsaved
+    shifts of the occurrences of ``templates`` there that have no row yet,
+    by start time. At most three queries, whatever the number of templates.
+    """
+    templates = list(templates.filter(is_active=True, dtstart__lt=end))
+    rows = list(shifts.filter(start_time__lt=end, end_time__gt=start))
+    materialized = set()
+    if templates:
+        longest = max(template.duration for template in templates)
+        materialized = set(Shift.objects.filter(
+            template__in=templates, occurrence__gt=start - longest, occurrence__lt=end,
+        ).values_list('template_id', 'occurrence'))
+    for template in templates:
+        for occurrence in occurrence_starts(template, start, end):
+            if (template.pk, occurrence) not in materialized:
+                rows.append(occurrence_shift(template, occurrence))
+    return sorted(rows, key=lambda shift: shift.start_time)
+
+
+def occurrences(templates, start, end):
+    """The unsaved shifts of the occurrences of ``templates`` overlapping ``[start, end)`` that have no row yet."""
+    return expand(Shift.objects.none(), templates, start, end)
+
+
+def materialize(template, occurrence, **values):
+    """
+    The ``Shift`` of the occurrence of ``template`` starting at
+    ``occurrence``, created with ``values`` if it has no row yet; returns
+    ``(shift, created)``. Raises ``ValueError`` if there is no such
+    occurrence, or if a new row would overlap another shift of the worker.
+    """
+    from .scheduling import conflict_message, find_conflicts
+
+    if not template.is_active or not is_occurrence(template, occurrence):
+        raise ValueError('Not an occurrence of this template.')
+    shift = occurrence_shift(template, occurrence)
+    if not Shift.objects.filter(template=template, occurrence=occurrence).exists():
+        # The template's occurrences, this one among them, were checked against each other when it was saved
+        conflicts = find_conflicts([(shift.worker_id, shift.start_time, shift.end_time)], exclude_templates=[template.pk])
+        if conflicts:
+            raise ValueError(conflict_message(conflicts[0]))
+    defaults = {
+        field: getattr(shift, field)
+        for field in ('job_id', 'worker_id', 'name', 'notes', 'start_time', 'end_time')
+    }
+    return Shift.objects.get_or_create(template=template, occurrence=occurrence, defaults={**defaults, **values})
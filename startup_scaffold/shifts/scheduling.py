@@ -0,0 +1,118 @@
+"""
+Shift conflict detection.
+
+Two shifts of a worker conflict when their times overlap; a shift may start
+exactly when another ends. The stored shifts of every worker concerned are
+loaded in one query over the window the new shifts span. Each worker's
+shifts, stored and new, are then sorted by start time and swept once,
+keeping the shift that ends last so far. A shift overlaps an earlier one
+exactly when it starts before that end, so checking a whole roster is
+O(n log n) with a single round trip. Overlaps within the roster itself are
+found as well as overlaps with stored shifts, and with the occurrences of
+the workers' shift templates that have no row yet, which take one more
+query for the templates and one for their materialized occurrences.
+"""
+from collections import defaultdict, namedtuple
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from jobs.models import Job
+from .models import Shift, ShiftTemplate
+from .recurrence import occurrences
+
+MAX_BULK_SHIFTS = 5000
+
+# ``index`` of the new shift that overlaps; the other is either the new shift
+# ``other_index``, the stored shift ``shift_id`` or an occurrence of the
+# shift template ``template_id``
+Conflict = namedtuple('Conflict', 'index other_index shift_id template_id', defaults=(None,))
+_Interval = namedtuple('_Interval', 'start end index shift_id template_id', defaults=(None,))
+
+
+def _conflict(interval, other):
+    if interval.index is not None:
+        return Conflict(interval.index, other.index, other.shift_id, other.template_id)
+    if other.index is not None:
+        return Conflict(other.index, None, interval.shift_id, interval.template_id)
+    # Two existing shifts: not ours to report
+    return None
+
+
+def find_conflicts(shifts, exclude=(), exclude_templates=()):
+    """
+    Overlaps of ``shifts``, ``(worker_id, start_time, end_time)`` tuples,
+    with each other, with the stored shifts of their workers other than
+    ``exclude`` and with the occurrences of their workers' templates other
+    than ``exclude_templates``. Every new shift that overlaps another gets
+    at least one ``Conflict``; they are sorted by ``index``.
+    """
+    if not shifts:
+        return []
+    by_worker = defaultdict(list)
+    for index, (worker_id, start, end) in enumerate(shifts):
+        by_worker[worker_id].append(_Interval(start, end, index, None))
+    window_start, window_end = min(start for _, start, _ in shifts), max(end for _, _, end in shifts)
+    stored = Shift.objects.filter(
+        worker_id__in=list(by_worker), start_time__lt=window_end, end_time__gt=window_start,
+    ).exclude(pk__in=exclude).values_list('worker_id', 'start_time', 'end_time', 'pk')
+    for worker_id, start, end, pk in stored.iterator():
+        by_worker[worker_id].append(_Interval(start, end, None, pk))
+    templates = ShiftTemplate.objects.filter(worker_id__in=list(by_worker)).exclude(pk__in=exclude_templates)
+    for shift in occurrences(templates, window_start, window_end):
+        by_worker[shift.worker_id].append(_Interval(shift.start_time, shift.end_time, None, None, shift.template_id))
+
+    conflicts = []
+    for intervals in by_worker.values():
+        intervals.sort(key=lambda interval: (interval.start, interval.end))
+        latest = None
+        for interval in intervals:
+            if latest is not None and interval.start < latest.end:
+                conflict = _conflict(interval, latest)
+                if conflict:
+                    conflicts.append(conflict)
+            if latest is None or interval.end > latest.end:
+                latest = interval
+    return sorted(conflicts, key=lambda conflict: conflict.index)
+
+
+def conflict_message(conflict):
+    if conflict.other_index is not None:
+        return f'This shift overlaps with shift {conflict.other_index} of the roster.'
+    if conflict.template_id is not None:
+        return f'This shift overlaps with an occurrence of shift template {conflict.template_id}.'
+    return f'This shift overlaps with another scheduled shift ({conflict.shift_id}).'
+
+
+def schedule_shifts(items):
+    """
+    Create the shifts ``items`` (validated ``BulkShiftSerializer`` items) in
+    one transaction: either every shift is created or none is. Raises a
+    ``ValidationError`` listing the errors of each item otherwise. Returns
+    the shifts created.
+    """
+    User = get_user_model()
+    errors = [{} for _ in items]
+    with transaction.atomic():
+        # Locking the workers keeps concurrent rosters for them from slipping in overlaps
+        workers = set(User.objects.select_for_update().filter(
+            pk__in={item['worker'] for item in items},
+        ).values_list('pk', flat=True))
+        jobs = set(Job.objects.filter(pk__in={item['job'] for item in items}).values_list('pk', flat=True))
+        for index, item in enumerate(items):
+            if item['job'] not in jobs:
+                errors[index]['job'] = [f'Invalid pk "{item["job"]}" - object does not exist.']
+            if item['worker'] not in workers:
+                errors[index]['worker'] = [f'Invalid pk "{item["worker"]}" - object does not exist.']
+
+        for conflict in find_conflicts([(item['worker'], item['start_time'], item['end_time']) for item in items]):
+            errors[conflict.index].setdefault(api_settings.NON_FIELD_ERRORS_KEY, []).append(conflict_message(conflict))
+        if any(errors):
+            raise serializers.ValidationError({'shifts': errors})
+
+        return Shift.objects.bulk_create([
+            Shift(job_id=item['job'], worker_id=item['worker'], **{
+                field: value for field, value in item.items() if field not in ('job', 'worker')
+            })
+            for item in items
+        ], batch_size=1000)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import Shift
+from datetime import timedelta
+from .models import Shift, ShiftTemplate
+from .recurrence import MAX_WINDOW, occurrence_starts, parse_rule
+from .scheduling import MAX_BULK_SHIFTS, find_conflicts
 from django.utils.timezone import make_aware
 from django.utils import timezone
 
@@ -10,7 +13,8 @@ class ShiftSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Shift
-        fields = ('id', 'job', 'worker', 'name', 'start_time', 'end_time', 'is_confirmed', 'is_completed', 'status', 'notes', 'worker_feedback', 'duration', 'created_at', 'updated_at')
+        fields = ('id', 'job', 'worker', 'name', 'start_time', 'end_time', 'is_confirmed', 'is_completed', 'status', 'notes', 'worker_feedback', 'duration', 'template', 'occurrence', 'created_at', 'updated_at')
+        read_only_fields = ('template',)
 
     def validate(self, data):
         # Ensure start_time and end_time are timezone-aware
@@ -27,14 +31,69 @@ class ShiftSerializer(serializers.ModelSerializer):
         end_time = data.get('end_time') or getattr(self.instance, 'end_time', None)
 
         if worker and start_time and end_time:
-            overlapping = Shift.objects.filter(
-                worker=worker,
-                start_time__lt=end_time,
-                end_time__gt=start_time,
-            )
-            if self.instance:
-                overlapping = overlapping.exclude(id=self.instance.id)
-            if overlapping.exists():
+            exclude = [self.instance.id] if self.instance else []
+            if find_conflicts([(worker.pk, start_time, end_time)], exclude=exclude):
                 raise serializers.ValidationError("This shift overlaps with another scheduled shift.")
         return data
 
+class BulkShiftItemSerializer(serializers.Serializer):
+    """One shift of a roster; jobs and workers are checked for the whole roster at once"""
+    job = serializers.UUIDField()
+    worker = serializers.UUIDField()
+    name = serializers.CharField(max_length=255)
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    is_confirmed = serializers.BooleanField(default=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError("end_time must be after start_time.")
+        return data
+
+class BulkShiftSerializer(serializers.Serializer):
+    shifts = BulkShiftItemSerializer(many=True, allow_empty=False, max_length=MAX_BULK_SHIFTS)
+
+class ShiftTemplateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShiftTemplate
+        fields = ('id', 'job', 'worker', 'name', 'notes', 'dtstart', 'duration', 'rrule', 'is_active', 'created_at', 'updated_at')
+
+    def validate(self, data):
+        duration = data.get('duration', getattr(self.instance, 'duration', None))
+        if duration is not None and duration <= timedelta(0):
+            raise serializers.ValidationError({'duration': 'duration must be positive.'})
+        dtstart = data.get('dtstart') or getattr(self.instance, 'dtstart', None)
+        rrule = data.get('rrule') or getattr(self.instance, 'rrule', None)
+        try:
+            parse_rule(rrule, dtstart)
+        except ValueError as e:
+            raise serializers.ValidationError({'rrule': str(e)})
+
+        # The occurrences of the coming year must not double-book the worker
+        worker = data.get('worker') or getattr(self.instance, 'worker', None)
+        if data.get('is_active', getattr(self.instance, 'is_active', True)) and worker and duration:
+            template = ShiftTemplate(dtstart=dtstart, duration=duration, rrule=rrule)
+            start = max(dtstart, timezone.now())
+            starts = occurrence_starts(template, start, start + MAX_WINDOW)
+            exclude, exclude_templates = (), ()
+            if self.instance:
+                # Its materialized occurrences and its own current ones are being replaced
+                exclude, exclude_templates = self.instance.shifts.values_list('pk', flat=True), [self.instance.pk]
+            conflicts = find_conflicts(
+                [(worker.pk, occurrence, occurrence + duration) for occurrence in starts],
+                exclude=exclude, exclude_templates=exclude_templates,
+            )
+            if conflicts:
+                conflict, at = conflicts[0], starts[conflicts[0].index].isoformat()
+                if conflict.other_index is not None:
+                    message = f'The occurrence at {at} overlaps with another occurrence of this template.'
+                elif conflict.template_id is not None:
+                    message = f'The occurrence at {at} overlaps with an occurrence of shift template {conflict.template_id}.'
+                else:
+                    message = f'The occurrence at {at} overlaps with another scheduled shift ({conflict.shift_id}).'
+                raise serializers.ValidationError(message)
+        return data
+
+class OccurrenceSerializer(serializers.Serializer):
+    occurrence = serializers.DateTimeField()
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by shifts.tasks.mark_missed_shifts for each batch of shifts it marks
+# missed, with ``shift_ids``. The shifts are updated in bulk, so no post_save
+# is sent for them.
+shifts_missed = Signal()
@@ -1,11 +1,14 @@
 from celery import shared_task
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from django.db.models import Exists, OuterRef
+from core.db import update_returning_ids
 from .models import Shift
+from .signals import shifts_missed
 from django.core.mail import send_mail
 from django.conf import settings
-from attendance.models import Attendance, DailyAttendanceReport
-from django.db.models import Q, Sum
+from attendance.models import Attendance
+from attendance.reports import generate_daily_reports
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -24,15 +27,28 @@ def send_shift_reminders():
             recipient_list=[shift.worker.email],
         )
 
+def missed_shifts(threshold_time):
+    """Confirmed shifts still scheduled that started before ``threshold_time`` without any attendance."""
+    return Shift.objects.filter(
+        status='scheduled', is_confirmed=True, start_time__lt=threshold_time,
+    ).filter(~Exists(Attendance.objects.filter(shift=OuterRef('pk'))))
+
 @shared_task
 def mark_missed_shifts():
+    """
+    Mark the shifts nobody attended past ``SHIFT_MISSED_THRESHOLD_MINUTES``
+    missed in one anti-join update, over the (status, is_confirmed,
+    start_time) index, and announce them with ``shifts_missed`` per batch.
+    Returns the ids of the shifts marked.
+    """
     now = timezone.now()
     threshold_minutes = getattr(settings, 'SHIFT_MISSED_THRESHOLD_MINUTES', 0)
     threshold_time = now - timedelta(minutes=threshold_minutes)
-    shifts = Shift.objects.filter(start_time__lt=threshold_time, status='scheduled', is_confirmed=True)
-    for shift in shifts:
-        shift.status = 'missed'
-        shift.save()
+    missed = []
+    for shift_ids in update_returning_ids(missed_shifts(threshold_time), status='missed', updated_at=now):
+        shifts_missed.send(sender=Shift, shift_ids=shift_ids)
+        missed.extend(str(shift_id) for shift_id in shift_ids)
+    return missed
 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -72,55 +88,15 @@ def generate_transaction_id():
     return str(uuid.uuid4())
 
 @shared_task
-def generate_daily_attendance_reports():
-    today = timezone.now().date()
-    users = User.objects.all()
-    for user in users:
-        attendances = Attendance.objects.filter(user=user, check_in__date=today)
-        if attendances.exists():
-            total_worked = attendances.aggregate(total=Sum('check_out') - Sum('check_in'))['total']
-            was_late = any(att.check_in > att.shift.start_time for att in attendances if att.shift)
-            late_minutes = 0
-            for att in attendances:
-                if att.shift and att.check_in > att.shift.start_time:
-                    late_delta = att.check_in - att.shift.start_time
-                    late_minutes += int(late_delta.total_seconds() // 60)
-            checked_in = attendances.filter(check_in__isnull=False).exists()
-            checked_out = attendances.filter(check_out__isnull=False).exists()
-            DailyAttendanceReport.objects.update_or_create(
-                user=user,
-                date=today,
-                defaults={
-                    'total_worked_hours': total_worked or timedelta(0),
-                    'was_late': was_late,
-                    'late_minutes': late_minutes,
-                    'was_absent': False,
-                    'checked_in': checked_in,
-                    'checked_out': checked_out,
-                }
-            )
-        else:
-            DailyAttendanceReport.objects.update_or_create(
-                user=user,
-                date=today,
-                defaults={
-                    'total_worked_hours': timedelta(0),
-                    'was_late': False,
-                    'late_minutes': 0,
-                    'was_absent': True,
-                    'checked_in': False,
-                    'checked_out': False,
-                }
-            )
+def generate_daily_attendance_reports(day=None):
+    """
+    Reconcile the daily attendance reports of every user for ``day`` (ISO
+    date, default today); check-ins and check-outs keep them current meanwhile.
+    """
+    day = date.fromisoformat(day) if day else timezone.localdate()
+    return generate_daily_reports(day)
 
 @shared_task
 def mark_no_show_attendances():
-    now = timezone.now()
-    threshold_minutes = getattr(settings, 'SHIFT_MISSED_THRESHOLD_MINUTES', 0)
-    threshold_time = now - timedelta(minutes=threshold_minutes)
-    shifts = Shift.objects.filter(start_time__lt=threshold_time, status='scheduled', is_confirmed=True)
-    for shift in shifts:
-        attendance_exists = Attendance.objects.filter(shift=shift).exists()
-        if not attendance_exists:
-            shift.status = 'missed'
-            shift.save()
+    """Same sweep as ``mark_missed_shifts``: missed means no attendance was recorded."""
+    return mark_missed_shifts()
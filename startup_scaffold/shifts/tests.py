@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.utils import timezone
-from datetime import timedelta
+from datetime import timedelta, timezone as datetime_timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
@@ -68,3 +68,347 @@ class ShiftTests(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(any(event['title'] == 'Calendar Shift' for event in response.data))
+
+
+class ShiftSchedulingTests(TestCase):
+    def setUp(self):
+        from jobs.models import Job
+        self.client = APIClient()
+        self.staff = User.objects.create_user(email='staff@example.com', password='testpass', is_staff=True)
+        self.worker = User.objects.create_user(email='worker@example.com', password='testpass')
+        self.other = User.objects.create_user(email='other@example.com', password='testpass')
+        self.job = Job.objects.create(client=self.staff, title='Warehouse')
+        self.monday = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=7)
+        self.client.force_authenticate(user=self.staff)
+
+    def item(self, worker, start_hours, end_hours, **extra):
+        return {
+            'job': str(self.job.id),
+            'worker': str(worker.id),
+            'name': 'Roster shift',
+            'start_time': (self.monday + timedelta(hours=start_hours)).isoformat(),
+            'end_time': (self.monday + timedelta(hours=end_hours)).isoformat(),
+            **extra,
+        }
+
+    def test_find_conflicts_checks_stored_and_new_shifts_in_two_queries(self):
+        stored = Shift.objects.create(
+            job=self.job, worker=self.worker, name='Stored',
+            start_time=self.monday, end_time=self.monday + timedelta(hours=4),
+        )
+        at = lambda hours: self.monday + timedelta(hours=hours)
+        shifts = [
+            (self.worker.id, at(4), at(6)),    # starts as the stored shift ends, overlaps shift 1
+            (self.worker.id, at(3), at(5)),    # overlaps the stored shift and shift 0
+            (self.other.id, at(0), at(8)),
+            (self.other.id, at(8), at(9)),
+            (self.other.id, at(1), at(2)),     # inside shift 2
+        ]
+        from .scheduling import find_conflicts
+        # Stored shifts, and the workers' templates: there are none
+        with self.assertNumQueries(2):
+            conflicts = find_conflicts(shifts)
+        self.assertEqual({conflict.index for conflict in conflicts}, {0, 1, 4})
+        self.assertIn((0, 1, None, None), conflicts)
+        self.assertIn((1, None, stored.id, None), conflicts)
+        self.assertIn((4, 2, None, None), conflicts)
+        self.assertEqual(find_conflicts([(self.worker.id, at(1), at(2))], exclude=[stored.id]), [])
+
+    def test_bulk_endpoint_creates_the_roster(self):
+        roster = [self.item(self.worker, day * 24, day * 24 + 8) for day in range(5)]
+        roster.append(self.item(self.other, 0, 8, is_confirmed=True, notes='Opening'))
+        response = self.client.post(reverse('shift-bulk'), {'shifts': roster}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['shifts']), 6)
+        self.assertEqual(Shift.objects.filter(worker=self.worker).count(), 5)
+        self.assertTrue(Shift.objects.get(worker=self.other).is_confirmed)
+
+    def test_bulk_endpoint_creates_nothing_when_any_shift_conflicts(self):
+        Shift.objects.create(
+            job=self.job, worker=self.other, name='Stored',
+            start_time=self.monday, end_time=self.monday + timedelta(hours=4),
+        )
+        roster = [
+            self.item(self.worker, 0, 8),
+            self.item(self.worker, 7, 9),
+            self.item(self.other, 2, 6),
+            self.item(self.other, 6, 5),
+        ]
+        response = self.client.post(reverse('shift-bulk'), {'shifts': roster}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Shift.objects.count(), 1)
+        self.assertIn('end_time must be after start_time', str(response.data))
+
+        response = self.client.post(reverse('shift-bulk'), {'shifts': roster[:3]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('overlaps with shift 0 of the roster', str(response.data))
+        self.assertIn('overlaps with another scheduled shift', str(response.data))
+        self.assertEqual(Shift.objects.count(), 1)
+
+    def test_bulk_endpoint_is_staff_only(self):
+        self.client.force_authenticate(user=self.worker)
+        response = self.client.post(reverse('shift-bulk'), {'shifts': [self.item(self.worker, 0, 8)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_single_shift_conflicts_still_rejected(self):
+        shift = Shift.objects.create(
+            job=self.job, worker=self.worker, name='Stored',
+            start_time=self.monday, end_time=self.monday + timedelta(hours=4),
+        )
+        response = self.client.post(reverse('shift-list'), self.item(self.worker, 2, 6), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(
+            reverse('shift-detail', args=[shift.id]), {'end_time': self.item(self.worker, 0, 5)['end_time']}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class MissedShiftTests(TestCase):
+    def setUp(self):
+        from jobs.models import Job
+        self.worker = User.objects.create_user(email='worker@example.com', password='testpass')
+        self.job = Job.objects.create(client=self.worker, title='Warehouse')
+
+    def shift(self, started_minutes_ago, **extra):
+        start_time = timezone.now() - timedelta(minutes=started_minutes_ago)
+        return Shift.objects.create(
+            job=self.job, worker=self.worker, name='Shift', start_time=start_time,
+            end_time=start_time + timedelta(hours=2), **{'is_confirmed': True, **extra},
+        )
+
+    def test_only_unattended_confirmed_shifts_are_marked_and_notified(self):
+        from attendance.models import Attendance
+        from notifications.models import Notification
+        from .signals import shifts_missed
+        from .tasks import mark_missed_shifts, mark_no_show_attendances
+        missed = self.shift(20)
+        attended = self.shift(40)
+        Attendance.objects.create(user=self.worker, shift=attended, check_in=attended.start_time)
+        unconfirmed = self.shift(20, is_confirmed=False)
+        upcoming = self.shift(-60)
+        announced = []
+        receiver = lambda sender, shift_ids, **kwargs: announced.extend(shift_ids)
+        shifts_missed.connect(receiver)
+        self.addCleanup(shifts_missed.disconnect, receiver)
+
+        self.assertEqual(mark_missed_shifts(), [str(missed.id)])
+        self.assertEqual(announced, [missed.id])
+        statuses = dict(Shift.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[missed.id], 'missed')
+        self.assertEqual({statuses[shift.id] for shift in (attended, unconfirmed, upcoming)}, {'scheduled'})
+        notification = Notification.objects.get(user=self.worker)
+        self.assertIn('You missed your shift "Shift"', notification.message)
+
+        self.assertEqual(mark_no_show_attendances(), [])
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class ShiftCalendarTests(TestCase):
+    def setUp(self):
+        from jobs.models import Job
+        self.client = APIClient()
+        self.worker = User.objects.create_user(email='worker@example.com', password='testpass')
+        self.other = User.objects.create_user(email='other@example.com', password='testpass')
+        self.job = Job.objects.create(client=self.worker, title='Warehouse')
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.shift = self.create_shift(self.worker, 'Morning', self.start)
+        self.create_shift(self.worker, 'Next week', self.start + timedelta(days=7))
+        self.create_shift(self.other, 'Not mine', self.start)
+        self.client.force_authenticate(user=self.worker)
+
+    def create_shift(self, worker, name, start_time):
+        return Shift.objects.create(
+            job=self.job, worker=worker, name=name, start_time=start_time, end_time=start_time + timedelta(hours=4),
+        )
+
+    def feed(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_feed_streams_the_users_shifts(self):
+        response = self.client.get(reverse('shift-calendar'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar')
+        feed = self.feed(response)
+        self.assertTrue(feed.startswith('BEGIN:VCALENDAR\r\n') and feed.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(feed.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:shift-{self.shift.id}@myattendanceapp', feed)
+        self.assertNotIn('Not mine', feed)
+        self.assertIn(f"DTSTAMP:{self.shift.updated_at.astimezone(datetime_timezone.utc):%Y%m%dT%H%M%SZ}", feed)
+
+        import icalendar
+        events = icalendar.Calendar.from_ical(feed).walk('VEVENT')
+        self.assertEqual([str(event['summary']) for event in events], ['Morning', 'Next week'])
+
+    def test_feed_window(self):
+        day = self.start.date()
+        feed = self.feed(self.client.get(reverse('shift-calendar'), {'from': day.isoformat(), 'to': day.isoformat()}))
+        self.assertIn('SUMMARY:Morning', feed)
+        self.assertNotIn('Next week', feed)
+        response = self.client.get(reverse('shift-calendar'), {'from': 'tomorrow'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.client.get(reverse('shift-calendar'))
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('shift-calendar'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(reverse('shift-calendar'), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.create_shift(self.worker, 'Added', self.start + timedelta(days=2)).delete()
+        Shift.objects.filter(name='Next week').delete()
+        response = self.client.get(reverse('shift-calendar'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.feed(response).count('BEGIN:VEVENT'), 1)
+
+
+class ShiftTemplateTests(TestCase):
+    def setUp(self):
+        from datetime import datetime
+        from jobs.models import Job
+        from .models import ShiftTemplate
+        self.client = APIClient()
+        self.worker = User.objects.create_user(email='worker@example.com', password='testpass')
+        self.job = Job.objects.create(client=self.worker, title='Warehouse')
+        # Monday 2 November 2026, 09:00
+        self.monday = timezone.make_aware(datetime(2026, 11, 2, 9))
+        self.template = ShiftTemplate.objects.create(
+            job=self.job, worker=self.worker, name='Front desk', dtstart=self.monday,
+            duration=timedelta(hours=8), rrule='FREQ=WEEKLY;BYDAY=MO,WE,FR',
+        )
+        self.client.force_authenticate(user=self.worker)
+
+    def window(self, days=14):
+        return {'from': '2026-11-02', 'to': (self.monday + timedelta(days=days - 1)).date().isoformat()}
+
+    def test_occurrences_expand_lazily_without_rows(self):
+        from .models import ShiftTemplate
+        from .recurrence import expand
+        with self.assertNumQueries(3):
+            shifts = expand(
+                Shift.objects.all(), ShiftTemplate.objects.all(), self.monday, self.monday + timedelta(days=14),
+            )
+        self.assertEqual([shift.start_time.weekday() for shift in shifts], [0, 2, 4] * 2)
+        self.assertTrue(all(shift.id is None and shift.template_id == self.template.id for shift in shifts))
+        self.assertEqual(shifts[1].end_time, self.monday + timedelta(days=2, hours=8))
+        self.assertFalse(Shift.objects.exists())
+        # An occurrence still running at the start of the window is part of it
+        shifts = expand(Shift.objects.all(), ShiftTemplate.objects.all(), self.monday + timedelta(hours=4), self.monday + timedelta(days=1))
+        self.assertEqual([shift.start_time for shift in shifts], [self.monday])
+
+    def test_confirming_an_occurrence_materializes_it_once(self):
+        wednesday = self.monday + timedelta(days=2)
+        url = reverse('shifttemplate-confirm', args=[self.template.id])
+        response = self.client.post(url, {'occurrence': wednesday.isoformat()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        shift = Shift.objects.get()
+        self.assertEqual((shift.template_id, shift.occurrence, shift.start_time), (self.template.id, wednesday, wednesday))
+        self.assertTrue(shift.is_confirmed)
+        response = self.client.post(url, {'occurrence': wednesday.isoformat()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Shift.objects.count(), 1)
+
+        response = self.client.post(url, {'occurrence': (wednesday + timedelta(days=1)).isoformat()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Not an occurrence', str(response.data))
+
+        response = self.client.get(reverse('shifttemplate-occurrences', args=[self.template.id]), self.window(7))
+        self.assertEqual([row['id'] for row in response.data], [None, str(shift.id), None])
+
+    def test_my_shifts_window_includes_occurrences(self):
+        stored = Shift.objects.create(
+            job=self.job, worker=self.worker, name='One-off',
+            start_time=self.monday + timedelta(days=1), end_time=self.monday + timedelta(days=1, hours=4),
+        )
+        response = self.client.get(reverse('shift-my-shifts'), self.window(7))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['next'])
+        rows = response.data['results']
+        self.assertEqual([row['name'] for row in rows], ['Front desk', 'One-off', 'Front desk', 'Front desk'])
+        self.assertEqual(rows[1]['id'], str(stored.id))
+        self.assertEqual(rows[0]['template'], self.template.id)
+        self.assertEqual(self.client.get(reverse('shift-my-shifts'), {'from': '2026-11-02'}).status_code, status.HTTP_400_BAD_REQUEST)
+        # Without a window it stays the paginated list of stored shifts
+        response = self.client.get(reverse('shift-my-shifts'))
+        self.assertEqual([row['id'] for row in response.data['results']], [str(stored.id)])
+
+    def test_calendar_includes_occurrences_with_stable_uids(self):
+        uid = f'UID:shift-template-{self.template.id}-20261104T090000Z@myattendanceapp'
+        response = self.client.get(reverse('shift-calendar'), self.window(7))
+        feed = b''.join(response.streaming_content).decode().replace('\r\n ', '')
+        self.assertEqual(feed.count('BEGIN:VEVENT'), 3)
+        self.assertIn(uid, feed)
+        etag = response['ETag']
+
+        self.client.post(
+            reverse('shifttemplate-materialize', args=[self.template.id]),
+            {'occurrence': (self.monday + timedelta(days=2)).isoformat()}, format='json',
+        )
+        response = self.client.get(reverse('shift-calendar'), self.window(7), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        feed = b''.join(response.streaming_content).decode().replace('\r\n ', '')
+        self.assertEqual(feed.count('BEGIN:VEVENT'), 3)
+        self.assertEqual(feed.count(uid), 1)
+
+    def test_template_rules_are_validated(self):
+        data = {
+            'job': str(self.job.id), 'worker': str(self.worker.id), 'name': 'Nights',
+            'dtstart': (self.monday + timedelta(hours=9)).isoformat(), 'duration': '08:00:00',
+        }
+        for rule in ('FREQ=HOURLY', 'FREQ=WEEKLY;BYDAY=XX', 'FREQ=DAILY;UNTIL=20270101T000000'):
+            response = self.client.post(reverse('shifttemplate-list'), {**data, 'rrule': rule}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, rule)
+        response = self.client.post(reverse('shifttemplate-list'), {**data, 'rrule': 'RRULE:FREQ=DAILY;COUNT=10'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_templates_cannot_double_book_the_worker(self):
+        from .models import ShiftTemplate
+        # Occurrences ahead of now, so the coming year's check covers them
+        monday = self.monday + timedelta(weeks=max(0, (timezone.now() - self.monday).days // 7 + 1))
+        ShiftTemplate.objects.filter(pk=self.template.pk).update(dtstart=monday)
+        stored = Shift.objects.create(
+            job=self.job, worker=self.worker, name='One-off',
+            start_time=monday + timedelta(days=1), end_time=monday + timedelta(days=1, hours=4),
+        )
+        data = {
+            'job': str(self.job.id), 'worker': str(self.worker.id), 'name': 'Tuesdays',
+            'dtstart': monday.isoformat(), 'duration': '08:00:00',
+        }
+        response = self.client.post(reverse('shifttemplate-list'), {**data, 'rrule': 'FREQ=WEEKLY;BYDAY=TU'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(stored.id), str(response.data))
+        response = self.client.post(reverse('shifttemplate-list'), {**data, 'rrule': 'FREQ=WEEKLY;BYDAY=WE'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.template.id), str(response.data))
+        response = self.client.post(reverse('shifttemplate-list'), {**data, 'rrule': 'FREQ=DAILY', 'duration': '30:00:00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Editing a template is not held against its own occurrences
+        response = self.client.patch(reverse('shifttemplate-detail', args=[self.template.id]), {'name': 'Reception'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Shifts scheduled after the template must not overlap its occurrences either
+        response = self.client.post(reverse('shift-list'), {
+            'job': str(self.job.id), 'worker': str(self.worker.id), 'name': 'Overtime',
+            'start_time': (monday + timedelta(days=2, hours=7)).isoformat(),
+            'end_time': (monday + timedelta(days=2, hours=10)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_materializing_checks_overlaps(self):
+        wednesday = self.monday + timedelta(days=2)
+        Shift.objects.create(
+            job=self.job, worker=self.worker, name='One-off',
+            start_time=wednesday + timedelta(hours=6), end_time=wednesday + timedelta(hours=10),
+        )
+        response = self.client.post(
+            reverse('shifttemplate-materialize', args=[self.template.id]), {'occurrence': wednesday.isoformat()}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('overlaps', str(response.data['occurrence']))
+        response = self.client.post(
+            reverse('shifttemplate-materialize', args=[self.template.id]), {'occurrence': self.monday.isoformat()}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
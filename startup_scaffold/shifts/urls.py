@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ShiftViewSet
+from .views import ShiftTemplateViewSet, ShiftViewSet
 
 router = DefaultRouter()
+# Before the shifts, whose detail route would match templates/
+router.register(r'templates', ShiftTemplateViewSet)
 router.register(r'', ShiftViewSet)
 
 urlpatterns = [
@@ -1,11 +1,28 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-from .models import Shift
-from .serializers import ShiftSerializer
+from datetime import date, timedelta
+from django.utils import timezone
+from attendance.reports import day_bounds
+from .models import Shift, ShiftTemplate
+from . import recurrence
+from .recurrence import DEFAULT_AHEAD, DEFAULT_PAST, MAX_WINDOW, expand
+from .scheduling import schedule_shifts
+from .serializers import BulkShiftSerializer, OccurrenceSerializer, ShiftSerializer, ShiftTemplateSerializer
+
+def parse_window(params):
+    """Aware ``(start, end)`` of the ``from`` and ``to`` ISO dates of ``params``, ``None`` where absent"""
+    start = day_bounds(date.fromisoformat(params['from']))[0] if 'from' in params else None
+    end = day_bounds(date.fromisoformat(params['to']))[1] if 'to' in params else None
+    if start and end and start >= end:
+        raise ValueError('from must not be after to.')
+    return start, end
+
+WINDOW_ERROR = f'from and to must be ISO dates, from not after to and at most {MAX_WINDOW.days} days apart.'
 
 class ShiftViewSet(viewsets.ModelViewSet):
     queryset = Shift.objects.all()
@@ -20,10 +37,40 @@ class ShiftViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='my')
     def my_shifts(self, request):
+        """
+        The user's shifts, a page at a time; with ``?from=&to=`` ISO dates, those
+        of that window together with the occurrences of the user's shift
+        templates, by start time, in one page
+        """
         user = request.user
         shifts = Shift.objects.filter(worker=user)
-        serializer = self.get_serializer(shifts, many=True)
-        return Response(serializer.data)
+        if 'from' in request.query_params or 'to' in request.query_params:
+            try:
+                start, end = parse_window(request.query_params)
+            except ValueError:
+                start = None
+            if start is None or end is None or end - start > MAX_WINDOW:
+                return Response({'detail': WINDOW_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+            rows = expand(shifts, ShiftTemplate.objects.filter(worker=user), start, end)
+            # The window bounds the rows, so they are a single page
+            return Response({'next': None, 'results': self.get_serializer(rows, many=True).data})
+        serializer = self.get_serializer(self.paginate_queryset(shifts), many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk', url_name='bulk')
+    def bulk_schedule(self, request):
+        """Staff endpoint to schedule a whole roster at once; all shifts are created or none"""
+        if not (request.user.is_staff or request.user.is_superuser):
+            return Response({'detail': 'Not authorized to schedule rosters.'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = BulkShiftSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        shifts = schedule_shifts(serializer.validated_data['shifts'])
+        return Response({
+            'detail': f'{len(shifts)} shifts scheduled.',
+            'shifts': ShiftSerializer(shifts, many=True).data,
+        }, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['patch'], url_path='confirm')
     def confirm_shift(self, request, pk=None):
@@ -37,34 +84,99 @@ class ShiftViewSet(viewsets.ModelViewSet):
     def missed_shifts(self, request):
         user = request.user
         shifts = Shift.objects.filter(worker=user, status='missed')
-        serializer = self.get_serializer(shifts, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(self.paginate_queryset(shifts), many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'], url_path='calendar')
     def calendar(self, request):
-        import icalendar
-        from django.http import HttpResponse
-        from datetime import datetime
+        """
+        iCalendar subscription feed of the user's shifts (every shift for staff),
+        optionally within ``?from=&to=`` ISO dates. Shift template occurrences
+        are included within that window, at most a year of it, or from a month
+        ago to six months ahead.
+        """
+        from django.http import StreamingHttpResponse
+        from django.utils.cache import get_conditional_response, quote_etag
+        from django.utils.http import http_date
+        from .calendar import feed_chunks, feed_validators
 
         user = request.user
         if user.is_staff or user.is_superuser:
-            shifts = Shift.objects.all()
+            shifts, templates = Shift.objects.all(), ShiftTemplate.objects.all()
         else:
-            shifts = Shift.objects.filter(worker=user)
-
-        cal = icalendar.Calendar()
-        cal.add('prodid', '-//My Attendance App//mxm.dk//')
-        cal.add('version', '2.0')
-
-        for shift in shifts:
-            event = icalendar.Event()
-            event.add('summary', shift.name)
-            event.add('dtstart', shift.start_time)
-            event.add('dtend', shift.end_time)
-            event.add('dtstamp', datetime.now())
-            event['uid'] = f'shift-{shift.id}@myattendanceapp'
-            cal.add_component(event)
-
-        response = HttpResponse(cal.to_ical(), content_type='text/calendar')
-        response['Content-Disposition'] = 'attachment; filename="shifts.ics"'
+            shifts, templates = Shift.objects.filter(worker=user), ShiftTemplate.objects.filter(worker=user)
+        try:
+            start, end = parse_window(request.query_params)
+        except ValueError:
+            return Response({'detail': 'from and to must be ISO dates.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start:
+            shifts = shifts.filter(end_time__gt=start)
+        if end:
+            shifts = shifts.filter(start_time__lt=end)
+
+        today = day_bounds(timezone.localdate())[0]
+        occurrence_start = start or today - DEFAULT_PAST
+        occurrence_end = min(end or today + DEFAULT_AHEAD, occurrence_start + MAX_WINDOW)
+        window = f'{occurrence_start.isoformat()}/{occurrence_end.isoformat()}'
+
+        etag, last_modified = feed_validators(shifts, templates, window)
+        etag = quote_etag(etag)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            events = feed_chunks(shifts, recurrence.occurrences(templates, occurrence_start, occurrence_end))
+            response = StreamingHttpResponse(events, content_type='text/calendar')
+            response['Content-Disposition'] = 'attachment; filename="shifts.ics"'
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
         return response
+
+class ShiftTemplateViewSet(viewsets.ModelViewSet):
+    queryset = ShiftTemplate.objects.all()
+    serializer_class = ShiftTemplateSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff or user.is_superuser:
+            return ShiftTemplate.objects.all()
+        return ShiftTemplate.objects.filter(worker=user)
+
+    @action(detail=True, methods=['get'], url_path='occurrences')
+    def occurrences(self, request, pk=None):
+        """The template's shifts within ``?from=&to=`` ISO dates (default: the next 30 days), materialized or not"""
+        template = self.get_object()
+        try:
+            start, end = parse_window(request.query_params)
+        except ValueError:
+            return Response({'detail': WINDOW_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+        start = start or timezone.now()
+        end = end or start + timedelta(days=30)
+        if end - start > MAX_WINDOW:
+            return Response({'detail': WINDOW_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+        rows = expand(template.shifts.all(), ShiftTemplate.objects.filter(pk=template.pk), start, end)
+        return Response(ShiftSerializer(rows, many=True).data)
+
+    def _materialize(self, template, request, **values):
+        serializer = OccurrenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            return recurrence.materialize(template, serializer.validated_data['occurrence'], **values)
+        except ValueError as e:
+            raise ValidationError({'occurrence': [str(e)]})
+
+    @action(detail=True, methods=['post'], url_path='materialize')
+    def materialize(self, request, pk=None):
+        """Create the shift of the occurrence starting at ``occurrence``, e.g. to check in to it"""
+        shift, created = self._materialize(self.get_object(), request)
+        return Response(ShiftSerializer(shift).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='confirm')
+    def confirm(self, request, pk=None):
+        """The worker confirms the occurrence starting at ``occurrence``, which creates its shift"""
+        template = get_object_or_404(ShiftTemplate, pk=pk, worker=request.user)
+        shift, created = self._materialize(template, request, is_confirmed=True)
+        if not shift.is_confirmed:
+            shift.is_confirmed = True
+            shift.save()
+        return Response(ShiftSerializer(shift).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
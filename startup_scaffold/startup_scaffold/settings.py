@@ -134,6 +134,32 @@ USE_TZ = True
 
 SHIFT_MISSED_THRESHOLD_MINUTES = 10
 
+# Celery
+CELERY_BROKER_URL = env('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = env('REDIS_URL', default='redis://localhost:6379/0')
+# Run tasks inline when no worker is running (local development and tests)
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=DEBUG)
+
+# Cache: Redis through django-redis when CACHE_URL is set, process memory otherwise
+CACHE_URL = env('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_URL,
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds the cached dashboard metrics may go without a full recount
+DASHBOARD_METRICS_MAX_STALENESS = env.int('DASHBOARD_METRICS_MAX_STALENESS', default=600)
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
@@ -141,6 +167,26 @@ SHIFT_MISSED_THRESHOLD_MINUTES = 10
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# The 'archive' storage holds rows moved out of the database (see core.archive).
+# Point ARCHIVE_STORAGE_BACKEND at an S3-compatible backend such as
+# storages.backends.s3.S3Storage to keep them off the application host.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'archive': {
+        'BACKEND': env('ARCHIVE_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': {'location': env('ARCHIVE_LOCATION', default=str(BASE_DIR / 'archive'))},
+    },
+}
+
+# Rows older than this are archived, by the timestamp field given per model
+ARCHIVE_RETENTION_DAYS = env.int('ARCHIVE_RETENTION_DAYS', default=730)
+ARCHIVE_MODELS = {
+    'attendance.Attendance': 'check_in',
+    'notifications.Notification': 'created_at',
+    'messaging.Message': 'timestamp',
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -162,6 +208,7 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
 }
 
 SWAGGER_SETTINGS = {
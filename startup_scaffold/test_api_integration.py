@@ -283,7 +283,7 @@ class APIIntegrationTests(APITestCase):
         # Verify rating was created
         response = self.client.get(reverse('rating-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_permissions_and_security(self):
         """Test API permissions and security"""